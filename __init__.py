@@ -13,6 +13,11 @@
  This script initializes the plugin, making it known to QGIS.
 """
 
+import logging
+
+# Modules log under this package; nothing is shown until the dock or the CLI adds a handler
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
 
 # noinspection PyPep8Naming
 def classFactory(iface):  # pylint: disable=invalid-name
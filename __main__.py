@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""Entry point for ``python -m image_mask_viewer``; see cli.py."""
+
+import sys
+
+from .cli import main
+
+
+sys.exit(main())
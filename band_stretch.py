@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Sample-based contrast stretch for multispectral images.
+
+Per-band 2nd / 98th percentiles are computed from a decimated read of at
+most SAMPLE_SIZE pixels on the longest side.  GDAL answers such a read
+from the closest overview when the raster has them (see overviews.py)
+and otherwise only decodes the sampled rows, so a tile never costs a
+full-raster statistics scan.  Results are cached per image path in
+``band_stretch.json`` in the output directory with a MaskStatsCache and
+applied directly to the 4-3-2 renderer (see layer_styles.py).
+"""
+
+import statistics
+
+import numpy as np
+from osgeo import gdal
+
+from .mask_stats import file_stamp
+from .thumbnails import thumbnail_shape
+
+
+STRETCH_CACHE_NAME = 'band_stretch.json'
+STRETCH_FIELDS = ['bands', 'low', 'high']
+
+STRETCH_PERCENTILES = (2, 98)
+
+# Longest side of the decimated read the percentiles are taken from
+SAMPLE_SIZE = 512
+
+# Tiles sampled across the queue for the dataset-wide stretch
+DATASET_SAMPLE_TILES = 32
+
+
+def compute_band_stretch(path, bands=(4, 3, 2), sample_size=SAMPLE_SIZE):
+    """Return ``(stamp, stats)`` with the stretch of the given bands of an image.
+
+    ``stats`` has the STRETCH_FIELDS; ``bands`` is empty when the image
+    has fewer bands than requested, since it is not drawn as 4-3-2.
+    Nodata and non-finite pixels are left out of the percentiles.
+    """
+    stamp = file_stamp(path)
+    dataset = gdal.Open(path, gdal.GA_ReadOnly)
+    # Runs in the QGIS process, so errors are checked instead of enabling gdal.UseExceptions()
+    if dataset is None:
+        raise RuntimeError(gdal.GetLastErrorMsg() or f"Cannot open {path}")
+    if dataset.RasterCount < max(bands):
+        return stamp, {'bands': [], 'low': [], 'high': []}
+    width, height = thumbnail_shape(dataset.RasterXSize, dataset.RasterYSize, sample_size)
+    low, high = [], []
+    for number in bands:
+        band = dataset.GetRasterBand(number)
+        values = band.ReadAsArray(buf_xsize=width, buf_ysize=height,
+                                  resample_alg=gdal.GRIORA_NearestNeighbour)
+        if values is None:
+            raise RuntimeError(gdal.GetLastErrorMsg() or f"Cannot read band {number} of {path}")
+        values = values.ravel()
+        nodata = band.GetNoDataValue()
+        valid = np.isfinite(values) if values.dtype.kind == 'f' else np.ones(values.shape, bool)
+        if nodata is not None:
+            valid &= values != nodata
+        values = values[valid]
+        if values.size == 0:
+            return stamp, {'bands': [], 'low': [], 'high': []}
+        band_low, band_high = np.percentile(values, STRETCH_PERCENTILES)
+        low.append(float(band_low))
+        high.append(float(max(band_high, band_low + 1e-6)))
+    return stamp, {'bands': list(bands), 'low': low, 'high': high}
+
+
+def combine_stretches(stretches, bands=(4, 3, 2)):
+    """Merge per-file stretches into a dataset-wide one (per-band median), or None."""
+    stretches = [s for s in stretches if s is not None and s['bands'] == list(bands)]
+    if not stretches:
+        return None
+    return {
+        'bands': list(bands),
+        'low': [statistics.median(s['low'][i] for s in stretches) for i in range(len(bands))],
+        'high': [statistics.median(s['high'][i] for s in stretches) for i in range(len(bands))],
+    }
@@ -0,0 +1,73 @@
+"""Benchmark the recursive directory walk with different thread counts.
+
+Usage::
+
+    python benchmarks/bench_directory_walk.py [--size 100000] [--levels 2]
+        [--workers 1 2 4 8 16 32] [--root DIR] [--tree IMAGE MASK MASK_VEG]
+
+Runs ``find_triplets(recursive=True)`` over a nested synthetic tree (see
+synthetic.py) for each worker count and prints the walk time,
+directories per second and the speedup over one worker.  A local disk answers scandir from the
+page cache, so the gain is small there; pass ``--tree`` with an existing
+image / mask / mask_veg tree on the slow (network) filesystem to see the
+effect of keeping several listings in flight.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+
+from plugin_import import load_plugin_package
+from synthetic import MASK_SUFFIX, MASK_VEG_SUFFIX, generate_tree
+
+load_plugin_package()
+from image_mask_viewer.pairing import find_triplets  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--levels', type=int, default=2)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--root', help="keep the synthetic tree here (default: temporary)")
+    parser.add_argument('--tree', nargs=3, metavar=('IMAGE', 'MASK', 'MASK_VEG'),
+                        help="walk an existing tree instead of a synthetic one")
+    parser.add_argument('--mask-suffix', default=MASK_SUFFIX)
+    parser.add_argument('--mask-veg-suffix', default=MASK_VEG_SUFFIX)
+    args = parser.parse_args()
+
+    root = None
+    if args.tree:
+        dirs = args.tree
+    else:
+        root = args.root or tempfile.mkdtemp(prefix='image_mask_walk_')
+        params = generate_tree(os.path.join(root, f"{args.size}_{args.levels}"), args.size,
+                               levels=args.levels)
+        dirs = [params['dirs'][role] for role in ('image', 'mask', 'mask_veg')]
+
+    print(f"{'workers':>8} {'best s':>10} {'median s':>10} {'dirs/s':>10} {'speedup':>8}")
+    baseline = None
+    try:
+        for workers in args.workers:
+            times = []
+            for _ in range(args.repeat):
+                stats = {}
+                pairs, _ = find_triplets(*dirs, args.mask_suffix, args.mask_veg_suffix,
+                                         recursive=True, workers=workers, walk_stats=stats)
+                times.append(stats['seconds'])
+            best = min(times)
+            baseline = baseline or best
+            print(f"{workers:>8} {best:>10.4f} {statistics.median(times):>10.4f} "
+                  f"{stats['directories'] / best:>10.0f} {baseline / best:>7.2f}x")
+        print(f"{stats['directories']} directories, {stats['files']} files, "
+              f"{len(pairs)} triplets")
+    finally:
+        if root is not None and args.root is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
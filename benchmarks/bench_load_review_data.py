@@ -0,0 +1,88 @@
+"""Benchmark review log loading at 10k/100k/1M rows.
+
+Usage::
+
+    python benchmarks/bench_load_review_data.py [--sizes 10000 100000 1000000]
+
+Each size writes a synthetic snapshot (new format, ~10% duplicate keys)
+and an old-format log into a temporary directory and times
+``load_review_records`` on both.
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from plugin_import import load_plugin_package
+
+load_plugin_package()
+from image_mask_viewer.review_log import REVIEW_LOG_COLUMNS, load_review_records  # noqa: E402
+
+STATUSES = ['correct', 'incorrect', 'not_reviewed']
+
+
+def write_new_format(path, rows, seed=0):
+    rng = random.Random(seed)
+    unique = max(int(rows * 0.9), 1)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(REVIEW_LOG_COLUMNS)
+        for i in range(rows):
+            n = i if i < unique else rng.randrange(unique)
+            writer.writerow([
+                f"2024-01-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:{i % 60:02d}.{i % 1000000:06d}",
+                f"tile_{n:07d}.tif",
+                f"tile_{n:07d}_rf_classified.tif",
+                f"tile_{n:07d}_vegmask_ndvi.tif",
+                'mask_veg' if n % 2 else 'mask',
+                rng.choice(STATUSES),
+                ''
+            ])
+
+
+def write_old_format(path, rows, seed=1):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['timestamp', 'image_file', 'mask_file', 'decision', 'notes'])
+        for i in range(rows):
+            writer.writerow([
+                f"2023-06-01T00:00:{i % 60:02d}",
+                f"tile_{i:07d}.tif",
+                f"tile_{i:07d}_mask.tif",
+                rng.choice(STATUSES),
+                ''
+            ])
+
+
+def time_load(path, repeat):
+    best = float('inf')
+    records = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = len(load_review_records(path))
+        best = min(best, time.perf_counter() - start)
+    return best, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'format':>8} {'records':>10} {'seconds':>9} {'rows/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            for fmt, writer in (('new', write_new_format), ('old', write_old_format)):
+                path = os.path.join(tmp, f"review_log_{fmt}_{size}.csv")
+                writer(path, size)
+                seconds, records = time_load(path, args.repeat)
+                print(f"{size:>10} {fmt:>8} {records:>10} {seconds:>9.3f} {size / seconds:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""Benchmark the review hot paths on synthetic trees at 1k/10k/100k/1M triplets.
+
+Usage::
+
+    python benchmarks/bench_review_paths.py [--sizes 1000 10000] [--root DIR]
+        [--output results.json] [--compare previous.json]
+
+Stages, named after the dock methods they back:
+
+* ``find_pairs`` - full directory scan and triplet join (find_triplets).
+* ``find_pairs_cached`` - the same scan answered from scan_manifest.json.
+* ``load_review_data`` - review_log.csv plus journals into review_data.
+* ``update_pair_statuses`` - status merge and StatusIndex rebuild.
+* ``filter_pairs`` - status filter, foreground filter and queue order.
+* ``record_decision`` - one decision through the CSV store (per click).
+* ``save_review_data`` - compaction of the snapshot and journal.
+
+Trees are generated with synthetic.py; pass ``--root`` to keep them
+between runs, since writing a million-triplet tree takes a while.
+Results (best and median seconds per stage and size) are written as JSON;
+``--compare`` prints the ratio against an earlier results file.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from plugin_import import load_plugin_package
+from synthetic import generate_tree
+
+load_plugin_package()
+from image_mask_viewer.pairing import find_triplets  # noqa: E402
+from image_mask_viewer.review_log import journal_paths, load_review_records  # noqa: E402
+from image_mask_viewer.review_queue import filter_by_foreground, order_pairs  # noqa: E402
+from image_mask_viewer.review_store import CSV_NAME, CsvReviewStore  # noqa: E402
+from image_mask_viewer.scan_manifest import scan_with_manifest  # noqa: E402
+from image_mask_viewer.status_index import StatusIndex, merge_review_statuses  # noqa: E402
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Single decisions timed per repeat of record_decision
+CLICKS = 200
+
+
+def measure(fn, repeat, setup=None):
+    """Run fn repeat times and return ``(seconds list, last result)``."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def bench_size(root, size, repeat):
+    params = generate_tree(root, size)
+    dirs = params['dirs']
+    scan_args = (dirs['image'], dirs['mask'], dirs['mask_veg'],
+                 params['mask_suffix'], params['mask_veg_suffix'])
+    results = {}
+
+    times, (pairs, _) = measure(lambda: find_triplets(*scan_args), repeat)
+    assert len(pairs) == params['triplets'], "find_triplets returned the wrong triplet count"
+    results['find_pairs'] = times
+
+    with tempfile.TemporaryDirectory() as manifest_dir:
+        scan_with_manifest(manifest_dir, *scan_args)
+        times, (_, _, mode) = measure(lambda: scan_with_manifest(manifest_dir, *scan_args), repeat)
+        assert mode == 'cached', f"manifest scan was {mode}"
+        results['find_pairs_cached'] = times
+
+    csv_path = os.path.join(dirs['output'], CSV_NAME)
+    times, review_data = measure(
+        lambda: load_review_records(csv_path, journal_paths(csv_path)), repeat)
+    results['load_review_data'] = times
+
+    def reset_statuses():
+        for pair in pairs:
+            pair['status'] = 'not_reviewed'
+
+    def update_statuses():
+        merge_review_statuses(pairs, review_data)
+        return StatusIndex(pairs)
+
+    results['update_pair_statuses'], _ = measure(update_statuses, repeat, setup=reset_statuses)
+
+    rng = random.Random(size)
+    foreground = {pair['mask_path']: rng.random() for pair in pairs if rng.random() < 0.9}
+
+    def stats_for(pair, field):
+        return foreground.get(pair['mask_path'])
+
+    def filter_queue():
+        queue = [p for p in pairs if p['status'] == 'not_reviewed']
+        queue = filter_by_foreground(queue, stats_for, 0.99, hide_empty=True)
+        return order_pairs(queue, 'empty_first', stats_for)
+
+    results['filter_pairs'], _ = measure(filter_queue, repeat)
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        def copy_log():
+            for name in os.listdir(store_dir):
+                os.remove(os.path.join(store_dir, name))
+            for path in [csv_path] + journal_paths(csv_path):
+                shutil.copy(path, store_dir)
+
+        def open_store():
+            copy_log()
+            store = CsvReviewStore(store_dir, reviewer='bench')
+            store.load()
+            return store
+
+        store = open_store()
+        keys = [(p['image_file'], p['mask_file'], p['mask_veg_file'], 'mask')
+                for p in pairs[:CLICKS]]
+
+        def clicks():
+            for key in keys:
+                store.record(key, {'status': 'correct', 'mask_type': 'mask', 'notes': '',
+                                   'timestamp': datetime.datetime.now().isoformat()})
+
+        times, _ = measure(clicks, repeat)
+        results['record_decision'] = [seconds / max(len(keys), 1) for seconds in times]
+        store.close()
+
+        stores = []
+
+        def prepare_compact():
+            stores.append(open_store())
+
+        results['save_review_data'], _ = measure(lambda: stores[-1].compact(), repeat,
+                                                 setup=prepare_compact)
+        for store in stores:
+            store.close()
+
+    return params, results
+
+
+def summarize(size, params, results):
+    rows = []
+    for stage, times in results.items():
+        rows.append({
+            'size': size,
+            'stage': stage,
+            'triplets': params['triplets'],
+            'best': min(times),
+            'median': statistics.median(times),
+            'runs': len(times),
+        })
+    return rows
+
+
+def compare(rows, previous_path):
+    with open(previous_path) as f:
+        previous = {(row['size'], row['stage']): row for row in json.load(f)['results']}
+    print(f"\nCompared with {previous_path} (best of runs, new / old):")
+    for row in rows:
+        old = previous.get((row['size'], row['stage']))
+        if old is None or not old['best']:
+            continue
+        ratio = row['best'] / old['best']
+        flag = '  slower' if ratio > 1.1 else '  faster' if ratio < 0.9 else ''
+        print(f"{row['size']:>9} {row['stage']:<22} {ratio:>6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--root', help="keep the synthetic trees here (default: temporary)")
+    parser.add_argument('--output', default='bench_review_paths.json')
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix='image_mask_bench_')
+    rows = []
+    print(f"{'size':>9} {'stage':<22} {'best s':>10} {'median s':>10}")
+    try:
+        for size in args.sizes:
+            params, results = bench_size(os.path.join(root, str(size)), size, args.repeat)
+            for row in summarize(size, params, results):
+                rows.append(row)
+                print(f"{size:>9} {row['stage']:<22} {row['best']:>10.6f} {row['median']:>10.6f}")
+    finally:
+        if args.root is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'version': RESULTS_VERSION,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'results': rows,
+        }, f, indent=2)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        compare(rows, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+"""Import the plugin's Qt-free modules without installing it into QGIS."""
+
+import importlib.util
+import os
+import sys
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = 'image_mask_viewer'
+
+
+def load_plugin_package():
+    """Register the repository root as the ``image_mask_viewer`` package."""
+    if PACKAGE_NAME in sys.modules:
+        return sys.modules[PACKAGE_NAME]
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME, os.path.join(PLUGIN_DIR, '__init__.py'),
+        submodule_search_locations=[PLUGIN_DIR])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = package
+    spec.loader.exec_module(package)
+    return package
@@ -0,0 +1,214 @@
+"""Synthetic directory trees and review logs for the benchmarks.
+
+Usage::
+
+    python benchmarks/synthetic.py DIR --size 100000 [--missing-mask 0.01 --missing-veg 0.02]
+
+A tree holds ``images/``, ``masks/`` and ``masks_veg/`` with the plugin's
+default suffixes, plus an ``output/`` directory with a review log.  Each
+file is a tiny payload (a 1x1 GeoTIFF or PNG), so trees of a million
+triplets stay small on disk; pairing never reads the payload anyway.
+With ``--levels N`` tiles are spread over N levels of FANOUT
+subdirectories (``03/11/tile_0000123.tif``), mirrored in the mask trees,
+for the recursive walk.
+A ``synthetic.json`` file records the parameters, and generate_tree()
+reuses a tree whose parameters match instead of writing it again.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import struct
+import zlib
+
+from plugin_import import load_plugin_package
+
+load_plugin_package()
+from image_mask_viewer.review_log import REVIEW_LOG_COLUMNS, journal_path_for  # noqa: E402
+from image_mask_viewer.review_store import CSV_NAME  # noqa: E402
+
+MASK_SUFFIX = '_rf_classified'
+MASK_VEG_SUFFIX = '_vegmask_ndvi'
+STATUSES = ['correct', 'incorrect']
+PARAMS_NAME = 'synthetic.json'
+
+# Subdirectories per level of a nested tree
+FANOUT = 16
+
+
+def tiny_geotiff():
+    """Return a 1x1 uint8 GeoTIFF (pixel scale and tie point, no CRS)."""
+    # Little-endian header, first IFD right after it
+    entries = []
+    extra = b''
+    offset_base = 8 + 2 + 12 * 11 + 4
+
+    def entry(tag, kind, count, value):
+        entries.append(struct.pack('<HHI', tag, kind, count) + value)
+
+    scale = struct.pack('<3d', 1.0, 1.0, 0.0)
+    tiepoint = struct.pack('<6d', 0.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+    pixel_offset = offset_base
+    extra += b'\x01\x00'  # pixel value + padding to keep doubles aligned
+    scale_offset = offset_base + len(extra)
+    extra += scale
+    tiepoint_offset = offset_base + len(extra)
+    extra += tiepoint
+
+    entry(256, 3, 1, struct.pack('<HH', 1, 0))  # ImageWidth
+    entry(257, 3, 1, struct.pack('<HH', 1, 0))  # ImageLength
+    entry(258, 3, 1, struct.pack('<HH', 8, 0))  # BitsPerSample
+    entry(259, 3, 1, struct.pack('<HH', 1, 0))  # Compression: none
+    entry(262, 3, 1, struct.pack('<HH', 1, 0))  # Photometric: min-is-black
+    entry(273, 4, 1, struct.pack('<I', pixel_offset))  # StripOffsets
+    entry(277, 3, 1, struct.pack('<HH', 1, 0))  # SamplesPerPixel
+    entry(278, 3, 1, struct.pack('<HH', 1, 0))  # RowsPerStrip
+    entry(279, 4, 1, struct.pack('<I', 1))  # StripByteCounts
+    entry(33550, 12, 3, struct.pack('<I', scale_offset))  # ModelPixelScale
+    entry(33922, 12, 6, struct.pack('<I', tiepoint_offset))  # ModelTiepoint
+    header = b'II' + struct.pack('<HI', 42, 8)
+    ifd = struct.pack('<H', len(entries)) + b''.join(entries) + struct.pack('<I', 0)
+    return header + ifd + extra
+
+
+def tiny_png():
+    """Return a 1x1 grayscale PNG."""
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data
+                + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(b'\x00\x01'))
+            + chunk(b'IEND', b''))
+
+
+PAYLOADS = {'.tif': tiny_geotiff, '.png': tiny_png}
+
+
+def tile_name(i, levels=0):
+    """Relative path of tile i without extension, ``levels`` directories deep."""
+    parts = [f"{(i // FANOUT ** level) % FANOUT:02d}" for level in range(levels)]
+    return '/'.join(parts + [f"tile_{i:07d}"])
+
+
+def write_files(directory, names, payload):
+    os.makedirs(directory, exist_ok=True)
+    created = set()
+    for name in names:
+        path = os.path.join(directory, name)
+        parent = os.path.dirname(path)
+        if parent not in created:
+            os.makedirs(parent, exist_ok=True)
+            created.add(parent)
+        with open(path, 'wb') as f:
+            f.write(payload)
+
+
+def write_review_log(output_dir, triplets, reviewed, journal_fraction, seed=0):
+    """Write review_log.csv and a reviewer journal for a share of the triplets.
+
+    Returns the number of records written.  journal_fraction of the
+    decisions go to the journal of reviewer ``bench`` instead of the
+    snapshot, as if that session had not compacted yet.
+    """
+    rng = random.Random(seed)
+    csv_path = os.path.join(output_dir, CSV_NAME)
+    sample = rng.sample(triplets, int(len(triplets) * reviewed))
+    split = int(len(sample) * (1 - journal_fraction))
+    count = 0
+    for path, rows in ((csv_path, sample[:split]),
+                       (journal_path_for(csv_path, 'bench'), sample[split:])):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(REVIEW_LOG_COLUMNS)
+            for i, (image_file, mask_file, mask_veg_file) in enumerate(rows):
+                writer.writerow([
+                    f"2024-01-{1 + i % 28:02d} {i % 24:02d}:{i % 60:02d}:{(i // 60) % 60:02d}",
+                    image_file, mask_file, mask_veg_file,
+                    'mask_veg' if i % 3 else 'mask',
+                    rng.choice(STATUSES), '', 'bench'
+                ])
+                count += 1
+    return count
+
+
+def generate_tree(root, size, missing_mask=0.01, missing_veg=0.01, reviewed=0.5,
+                  journal_fraction=0.05, extension='.tif', seed=0, levels=0):
+    """Create (or reuse) a synthetic tree and return its parameters dict.
+
+    The dict has the directory paths under ``dirs`` and the expected
+    ``triplets`` count, which the benchmarks check their results against.
+    """
+    params = {
+        'size': size, 'missing_mask': missing_mask, 'missing_veg': missing_veg,
+        'reviewed': reviewed, 'journal_fraction': journal_fraction,
+        'extension': extension, 'seed': seed, 'levels': levels,
+    }
+    params_path = os.path.join(root, PARAMS_NAME)
+    if os.path.exists(params_path):
+        with open(params_path) as f:
+            existing = json.load(f)
+        if {key: existing.get(key) for key in params} == params:
+            return existing
+
+    rng = random.Random(seed)
+    dirs = {role: os.path.join(root, name) for role, name in
+            (('image', 'images'), ('mask', 'masks'), ('mask_veg', 'masks_veg'),
+             ('output', 'output'))}
+    payload = PAYLOADS[extension]()
+    images, masks, masks_veg, triplets = [], [], [], []
+    for i in range(size):
+        base = tile_name(i, levels)
+        image_file = base + extension
+        images.append(image_file)
+        has_mask = rng.random() >= missing_mask
+        has_veg = rng.random() >= missing_veg
+        if has_mask:
+            masks.append(base + MASK_SUFFIX + extension)
+        if has_veg:
+            masks_veg.append(base + MASK_VEG_SUFFIX + extension)
+        if has_mask and has_veg:
+            triplets.append((image_file, base + MASK_SUFFIX + extension,
+                             base + MASK_VEG_SUFFIX + extension))
+
+    write_files(dirs['image'], images, payload)
+    write_files(dirs['mask'], masks, payload)
+    write_files(dirs['mask_veg'], masks_veg, payload)
+    os.makedirs(dirs['output'], exist_ok=True)
+    for name in os.listdir(dirs['output']):
+        os.remove(os.path.join(dirs['output'], name))
+    records = write_review_log(dirs['output'], triplets, reviewed, journal_fraction, seed)
+
+    params.update({'dirs': dirs, 'triplets': len(triplets), 'records': records,
+                   'mask_suffix': MASK_SUFFIX, 'mask_veg_suffix': MASK_VEG_SUFFIX})
+    with open(params_path, 'w') as f:
+        json.dump(params, f, indent=2)
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('root')
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--missing-mask', type=float, default=0.01)
+    parser.add_argument('--missing-veg', type=float, default=0.01)
+    parser.add_argument('--reviewed', type=float, default=0.5,
+                        help="fraction of triplets with a decision in the review log")
+    parser.add_argument('--journal-fraction', type=float, default=0.05,
+                        help="fraction of the decisions left in an uncompacted journal")
+    parser.add_argument('--extension', choices=sorted(PAYLOADS), default='.tif')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--levels', type=int, default=0,
+                        help=f"nest tiles this many levels of {FANOUT} subdirectories deep")
+    args = parser.parse_args()
+    params = generate_tree(args.root, args.size, args.missing_mask, args.missing_veg,
+                           args.reviewed, args.journal_fraction, args.extension, args.seed,
+                           args.levels)
+    print(f"{params['size']} images, {params['triplets']} triplets, "
+          f"{params['records']} review records in {args.root}")
+
+
+if __name__ == '__main__':
+    main()
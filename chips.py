@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Chip grids for reviewing large scenes window by window.
+
+chip_grid splits a raster into a grid of pixel windows of at most
+chip_size on each side, using only the dataset header (size and
+geotransform), so a 40k x 40k scene costs no pixel reads.  Chips are
+sized evenly across the scene rather than leaving a thin last row or
+column.  Each chip carries its map extent, which the dock sets as the
+canvas extent to move between chips without reloading the layers.
+
+Decisions for a chip are stored under the triplet's key with the window
+appended to the image file name (see chip_key in status_index.py).
+"""
+
+import math
+
+from osgeo import gdal
+
+from .mask_stats import UNGEOREFERENCED_TRANSFORM
+
+
+DEFAULT_CHIP_SIZE = 2048
+
+
+def chip_windows(width, height, chip_size=DEFAULT_CHIP_SIZE):
+    """Return ``(xoff, yoff, xsize, ysize)`` windows covering the raster row by row."""
+    columns = max(math.ceil(width / chip_size), 1)
+    rows = max(math.ceil(height / chip_size), 1)
+    xs = [round(i * width / columns) for i in range(columns + 1)]
+    ys = [round(j * height / rows) for j in range(rows + 1)]
+    return [(xs[i], ys[j], xs[i + 1] - xs[i], ys[j + 1] - ys[j])
+            for j in range(rows) for i in range(columns)]
+
+
+def window_extent(geotransform, window):
+    """Return the map extent ``(xmin, ymin, xmax, ymax)`` of a pixel window."""
+    x0, pixel_width, row_rotation, y0, column_rotation, pixel_height = geotransform
+    xoff, yoff, xsize, ysize = window
+    corners = [(xoff, yoff), (xoff + xsize, yoff), (xoff, yoff + ysize),
+               (xoff + xsize, yoff + ysize)]
+    xs = [x0 + px * pixel_width + py * row_rotation for px, py in corners]
+    ys = [y0 + px * column_rotation + py * pixel_height for px, py in corners]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def chip_grid(path, chip_size=DEFAULT_CHIP_SIZE):
+    """Return the chips of a raster as dicts with ``window`` and map ``extent``."""
+    dataset = gdal.Open(path, gdal.GA_ReadOnly)
+    # GDAL errors are checked as in compute_band_stretch
+    if dataset is None:
+        raise RuntimeError(gdal.GetLastErrorMsg() or f"Cannot open {path}")
+    geotransform = dataset.GetGeoTransform(can_return_null=True) or UNGEOREFERENCED_TRANSFORM
+    return [{'window': window, 'extent': window_extent(geotransform, window)}
+            for window in chip_windows(dataset.RasterXSize, dataset.RasterYSize, chip_size)]
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Command line interface for pairing, status reports and triplet manifests.
+
+Only the Qt-free modules are imported, so it runs on machines without
+QGIS, e.g. a batch node preparing a review round::
+
+    python -m image_mask_viewer scan IMAGES MASKS MASKS_VEG -o OUTPUT --out triplets.csv
+    python -m image_mask_viewer report IMAGES MASKS MASKS_VEG -o OUTPUT
+
+``scan`` writes one row per triplet with its review status; ``report``
+prints the status counts.  Both read the review log in the output
+directory (review_log.csv plus journals, or review_log.sqlite) without
+modifying it, and reuse or update ``scan_manifest.json`` there like the
+dock does.  Progress goes to stderr so the manifest can go to stdout.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+from .pairing import DEFAULT_WALK_WORKERS, find_triplets
+from .review_log import journal_paths, load_review_records
+from .review_store import CSV_NAME, SQLITE_NAME, STORE_BACKENDS, SqliteReviewStore
+from .scan_manifest import MANIFEST_NAME, scan_with_manifest
+from .status_index import STATUSES, merge_review_statuses, pair_key, split_chip_key
+
+
+DEFAULT_MASK_SUFFIX = '_rf_classified'
+DEFAULT_MASK_VEG_SUFFIX = '_vegmask_ndvi'
+
+OUTPUT_FORMATS = ['csv', 'json', 'jsonl']
+
+MANIFEST_COLUMNS = ['image_path', 'mask_path', 'mask_veg_path', 'image_file', 'mask_file',
+                    'mask_veg_file', 'status', 'mask_status', 'mask_veg_status']
+
+# Progress lines when stderr is not a terminal (batch logs)
+LOG_EVERY = 100000
+
+
+class Progress:
+    """Triplet counter printed to stderr while the image directory is read."""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.count = 0
+        self.logged = 0
+        self.start = time.perf_counter()
+        self.interactive = sys.stderr.isatty()
+
+    def chunk(self, triplets):
+        self.count += len(triplets)
+        if self.quiet:
+            return
+        if self.interactive:
+            print(f"\rMatched {self.count} triplets", end='', file=sys.stderr, flush=True)
+        elif self.count - self.logged >= LOG_EVERY:
+            self.logged = self.count
+            print(f"Matched {self.count} triplets", file=sys.stderr, flush=True)
+
+    def done(self, message):
+        if self.quiet:
+            return
+        if self.interactive and self.count:
+            print(file=sys.stderr)
+        print(f"{message} ({time.perf_counter() - self.start:.1f}s)", file=sys.stderr, flush=True)
+
+
+def load_reviews(output_dir, store):
+    """Read the review log of an output directory without writing to it."""
+    if output_dir is None:
+        return {}
+    if store == 'sqlite':
+        if not os.path.exists(os.path.join(output_dir, SQLITE_NAME)):
+            raise FileNotFoundError(f"No {SQLITE_NAME} in {output_dir}")
+        review_store = SqliteReviewStore(output_dir)
+        try:
+            return review_store.load()
+        finally:
+            review_store.close()
+    csv_path = os.path.join(output_dir, CSV_NAME)
+    return load_review_records(csv_path, journal_paths(csv_path))
+
+
+def scan_pairs(args, progress):
+    """Match triplets and merge their review statuses.
+
+    Returns ``(pairs, incomplete, review_data)``.
+    """
+    review_data = load_reviews(args.output_dir, args.store)
+    dirs = (args.image_dir, args.mask_dir, args.mask_veg_dir,
+            args.mask_suffix, args.mask_veg_suffix)
+    walk_stats = {}
+    if args.output_dir is not None and not args.no_manifest and not args.recursive:
+        pairs, incomplete, mode = scan_with_manifest(args.output_dir, *dirs,
+                                                     on_chunk=progress.chunk)
+    else:
+        pairs, incomplete = find_triplets(*dirs, on_chunk=progress.chunk,
+                                          recursive=args.recursive, workers=args.workers,
+                                          walk_stats=walk_stats)
+        mode = 'recursive' if args.recursive else 'full'
+    walk_text = ""
+    if walk_stats.get('seconds'):
+        walk_text = (f", {walk_stats['directories']} directories at "
+                     f"{walk_stats['directories'] / walk_stats['seconds']:.0f}/s")
+    merge_review_statuses(pairs, review_data)
+    progress.done(f"Found {len(pairs)} triplets, {len(incomplete)} incomplete images "
+                  f"({mode} scan{walk_text})")
+    return pairs, incomplete, review_data
+
+
+def count_statuses(pairs):
+    counts = dict.fromkeys(STATUSES, 0)
+    for pair in pairs:
+        counts[pair['status']] = counts.get(pair['status'], 0) + 1
+    return counts
+
+
+def count_chip_reviews(review_data):
+    """Return ``(chips, triplets)`` with a chip decision other than not_reviewed."""
+    chips, triplets = set(), set()
+    for key, record in review_data.items():
+        triplet_key, window = split_chip_key(key[:3])
+        if window is not None and record['status'] != 'not_reviewed':
+            chips.add((triplet_key, window))
+            triplets.add(triplet_key)
+    return len(chips), len(triplets)
+
+
+def manifest_rows(pairs, review_data):
+    """Yield MANIFEST_COLUMNS dicts, with the decision of each mask type."""
+    for pair in pairs:
+        key = pair_key(pair)
+        row = {column: pair[column] for column in MANIFEST_COLUMNS[:7]}
+        for mask_type in ('mask', 'mask_veg'):
+            record = review_data.get(key + (mask_type,))
+            row[f'{mask_type}_status'] = record['status'] if record is not None else ''
+        yield row
+
+
+def write_manifest(rows, f, output_format):
+    """Stream rows as CSV, a JSON array or JSON lines."""
+    if output_format == 'csv':
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    elif output_format == 'jsonl':
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+    else:
+        # Written row by row so a million triplets are never one string in memory
+        f.write('[')
+        for i, row in enumerate(rows):
+            f.write(',\n' if i else '\n')
+            f.write(json.dumps(row))
+        f.write('\n]\n')
+
+
+def run_scan(args):
+    progress = Progress(args.quiet)
+    pairs, _, review_data = scan_pairs(args, progress)
+    if args.status:
+        pairs = [pair for pair in pairs if pair['status'] in args.status]
+    output_format = args.format
+    if output_format is None:
+        extension = os.path.splitext(args.out or '')[1].lstrip('.').lower()
+        output_format = extension if extension in OUTPUT_FORMATS else 'csv'
+
+    if args.out in (None, '-'):
+        write_manifest(manifest_rows(pairs, review_data), sys.stdout, output_format)
+    else:
+        tmp_path = args.out + '.tmp'
+        with open(tmp_path, 'w', newline='') as f:
+            write_manifest(manifest_rows(pairs, review_data), f, output_format)
+        os.replace(tmp_path, args.out)
+        if not args.quiet:
+            print(f"Wrote {len(pairs)} triplets to {args.out}", file=sys.stderr)
+    return 0
+
+
+def run_report(args):
+    progress = Progress(args.quiet)
+    pairs, incomplete, review_data = scan_pairs(args, progress)
+    counts = count_statuses(pairs)
+    chips, chip_triplets = count_chip_reviews(review_data)
+    if args.json:
+        json.dump({'total': len(pairs), 'incomplete': len(incomplete), 'statuses': counts,
+                   'chips_reviewed': chips, 'chip_triplets': chip_triplets},
+                  sys.stdout, indent=2)
+        print()
+        return 0
+    total = len(pairs)
+    print(f"Triplets:      {total}")
+    for status, count in counts.items():
+        percent = 100.0 * count / total if total else 0.0
+        print(f"  {status.replace('_', ' '):<13}{count:>10}  {percent:5.1f}%")
+    if chips:
+        print(f"Chips:         {chips} reviewed in {chip_triplets} triplets")
+    print(f"Incomplete:    {len(incomplete)}")
+    if args.list_incomplete:
+        for image_file in incomplete:
+            print(f"  {image_file}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m image_mask_viewer',
+        description="Pair images with their masks and report review status without QGIS.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('image_dir')
+    common.add_argument('mask_dir')
+    common.add_argument('mask_veg_dir')
+    common.add_argument('-o', '--output-dir',
+                        help=f"review output directory ({CSV_NAME}, {MANIFEST_NAME})")
+    common.add_argument('--mask-suffix', default=DEFAULT_MASK_SUFFIX)
+    common.add_argument('--mask-veg-suffix', default=DEFAULT_MASK_VEG_SUFFIX)
+    common.add_argument('--store', choices=STORE_BACKENDS, default='csv',
+                        help="review store to read decisions from")
+    common.add_argument('--no-manifest', action='store_true',
+                        help=f"list every directory instead of reusing {MANIFEST_NAME}")
+    common.add_argument('-r', '--recursive', action='store_true',
+                        help="walk subdirectories and match files by relative path "
+                             f"(does not use {MANIFEST_NAME})")
+    common.add_argument('--workers', type=int, default=DEFAULT_WALK_WORKERS,
+                        help="directories listed at once with --recursive "
+                             "(default: %(default)s)")
+    common.add_argument('-q', '--quiet', action='store_true', help="no progress on stderr")
+    common.add_argument('-v', '--verbose', action='count', default=0,
+                        help="log info (-v) or debug (-vv) messages to stderr")
+
+    scan = commands.add_parser('scan', parents=[common],
+                               help="write the triplets with their review status")
+    scan.add_argument('--out', help="output file (default: stdout)")
+    scan.add_argument('--format', choices=OUTPUT_FORMATS,
+                      help="output format (default: from --out extension, else csv)")
+    scan.add_argument('--status', action='append', choices=STATUSES,
+                      help="only write triplets with this status (repeatable)")
+    scan.set_defaults(func=run_scan)
+
+    report = commands.add_parser('report', parents=[common], help="print review status counts")
+    report.add_argument('--json', action='store_true', help="print the counts as JSON")
+    report.add_argument('--list-incomplete', action='store_true',
+                        help="list images missing a mask or mask_veg")
+    report.set_defaults(func=run_report)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=max(logging.WARNING - 10 * args.verbose, logging.DEBUG),
+                        format="%(levelname)s %(name)s: %(message)s")
+    for directory in (args.image_dir, args.mask_dir, args.mask_veg_dir):
+        if not os.path.isdir(directory):
+            print(f"Not a directory: {directory}", file=sys.stderr)
+            return 2
+    if args.output_dir is not None and not os.path.isdir(args.output_dir):
+        print(f"Not a directory: {args.output_dir}", file=sys.stderr)
+        return 2
+    try:
+        result = args.func(args)
+        sys.stdout.flush()
+        return result
+    except BrokenPipeError:
+        # The reader (e.g. head) went away; point stdout at devnull so the
+        # interpreter's final flush does not report the broken pipe again
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
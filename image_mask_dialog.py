@@ -19,7 +19,9 @@ from qgis.core import QgsRasterLayer, QgsProject, Qgis
 from qgis.PyQt.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, 
                                  QLabel, QLineEdit, QPushButton, 
                                  QListWidget, QGroupBox, QMessageBox,
-                                 QListWidgetItem, QAbstractItemView)
+                                 QListWidgetItem, QAbstractItemView, QCheckBox)
+
+from .pairing import iter_directory, list_directory, match_pairs, walk_trees
 
 
 class ImageMaskDialog(QDialog):
@@ -77,6 +79,11 @@ class ImageMaskDialog(QDialog):
         suffix_layout.addWidget(self.suffix_edit)
         dir_layout.addLayout(suffix_layout)
         
+        self.recursive_cb = QCheckBox("Include subdirectories")
+        self.recursive_cb.setToolTip("Match images and masks by their path relative to each "
+                                     "directory plus the suffix")
+        dir_layout.addWidget(self.recursive_cb)
+        
         dir_group.setLayout(dir_layout)
         main_layout.addWidget(dir_group)
         
@@ -166,47 +173,23 @@ class ImageMaskDialog(QDialog):
             QMessageBox.warning(self, "Warning", "Mask directory does not exist!")
             return
             
-        # Get all image files
-        image_extensions = ['.tif', '.tiff', '.jpg', '.jpeg', '.png', '.bmp']
-        image_files = []
-        
-        for file in os.listdir(image_dir):
-            if any(file.lower().endswith(ext) for ext in image_extensions):
-                # Skip files that already have the mask suffix
-                if mask_suffix and mask_suffix in file:
-                    continue
-                image_files.append(file)
-                
         # Match with masks
+        if self.recursive_cb.isChecked():
+            image_names, mask_names = walk_trees([image_dir, mask_dir])
+        else:
+            image_names, mask_names = iter_directory(image_dir), list_directory(mask_dir)
+        pairs = match_pairs(image_names, mask_names, mask_suffix)
         pairs_found = 0
-        for image_file in sorted(image_files):
+        for image_file, mask_name in pairs:
             image_path = os.path.join(image_dir, image_file)
-            
-            # Try to find corresponding mask
-            base_name = os.path.splitext(image_file)[0]
-            ext = os.path.splitext(image_file)[1]
-            
-            # Try different mask naming patterns
-            possible_masks = [
-                base_name + mask_suffix + ext,  # basename_mask.ext
-                base_name + mask_suffix + '.tif',  # basename_mask.tif
-                base_name + mask_suffix + '.png',  # basename_mask.png
-            ]
-            
-            mask_found = False
-            for mask_name in possible_masks:
+            if mask_name is not None:
                 mask_path = os.path.join(mask_dir, mask_name)
-                if os.path.exists(mask_path):
-                    # Add to list
-                    item = QListWidgetItem(f"✓ {image_file} → {mask_name}")
-                    item.setData(QtCore.Qt.UserRole, (image_path, mask_path))
-                    self.file_list.addItem(item)
-                    self.current_pairs.append((image_path, mask_path))
-                    pairs_found += 1
-                    mask_found = True
-                    break
-                    
-            if not mask_found:
+                item = QListWidgetItem(f"✓ {image_file} → {mask_name}")
+                item.setData(QtCore.Qt.UserRole, (image_path, mask_path))
+                self.file_list.addItem(item)
+                self.current_pairs.append((image_path, mask_path))
+                pairs_found += 1
+            else:
                 # Add image without mask
                 item = QListWidgetItem(f"✗ {image_file} (no mask found)")
                 item.setData(QtCore.Qt.UserRole, (image_path, None))
@@ -214,7 +197,7 @@ class ImageMaskDialog(QDialog):
                 self.file_list.addItem(item)
                 
         # Update status
-        self.status_label.setText(f"Found {pairs_found} image-mask pairs out of {len(image_files)} images")
+        self.status_label.setText(f"Found {pairs_found} image-mask pairs out of {len(pairs)} images")
         
         # Enable/disable buttons
         self.add_all_btn.setEnabled(pairs_found > 0)
@@ -1,19 +1,69 @@
+import getpass
+import logging
 import os
-import csv
-import pandas as pd
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from qgis.PyQt import QtWidgets, QtCore
 from qgis.PyQt.QtCore import pyqtSignal, Qt
-from qgis.core import (QgsRasterLayer, QgsProject, Qgis, QgsMultiBandColorRenderer, 
-                      QgsLayerTreeLayer, QgsSingleBandPseudoColorRenderer, 
-                      QgsColorRampShader, QgsRasterShader, QgsGradientColorRamp)
+from qgis.PyQt.QtGui import QFontDatabase, QKeySequence
+from qgis.core import (QgsRasterLayer, QgsProject, Qgis,
+                      QgsRectangle, QgsCoordinateTransform, 
+                      QgsLayerTreeLayer, QgsGradientColorRamp,
+                      QgsDataProvider, QgsApplication, QgsTask, QgsMessageLog)
 from qgis.PyQt.QtWidgets import (QDockWidget, QVBoxLayout, QHBoxLayout, 
                                  QLabel, QLineEdit, QPushButton, 
                                  QGroupBox, QMessageBox, QWidget,
                                  QProgressBar, QSpacerItem, QSizePolicy,
                                  QCheckBox, QRadioButton, QButtonGroup,
-                                 QSpinBox)
+                                 QSpinBox, QComboBox, QShortcut)
+from .mask_stats import (AGREEMENT_CACHE_NAME, AGREEMENT_FIELDS, MaskStatsCache,
+                         compute_pair_stats, pair_jobs, stale_pair_jobs)
+from .chips import DEFAULT_CHIP_SIZE, chip_grid
+from .band_stretch import (DATASET_SAMPLE_TILES, STRETCH_CACHE_NAME, STRETCH_FIELDS,
+                           combine_stretches)
+from .instrumentation import STAGES, RenderCounter, StageTimings
+from .layer_resources import DEFAULT_GDAL_CACHE_MB, DEFAULT_GDAL_THREADS, LayerResources
+from .layer_styles import RendererTemplates
+from .overviews import build_overviews, overview_jobs
+from .pairing import DEFAULT_WALK_WORKERS
+from .pool_task import ProcessPoolTask
+from .scan_task import ScanTask
+from .stretch_task import StretchTask
+from .status_index import StatusIndex, chip_key, pair_key, review_status
+from .thumbnail_grid import ThumbnailGrid
+from .thumbnails import ThumbnailCache, render_thumbnail, thumbnail_jobs
+from .triplet_prefetch import TRIPLET_ROLES, TripletPrefetcher, create_triplet_layers
+from .review_queue import QUEUE_ORDERS, filter_by_foreground, order_pairs
+from .review_store import CsvReviewStore, open_review_store
+
+log = logging.getLogger(__name__)
+
+# Navigation requests closer together than this are coalesced into one tile load
+NAVIGATION_SETTLE_MS = 120
+
+# Seconds between writes of band_stretch.json while stretches are being sampled
+STRETCH_SAVE_INTERVAL = 60
+
+# Tab of the QGIS Log Messages panel
+LOG_TAG = "Image Mask Viewer"
+
+LOG_LEVELS = [("Warnings", logging.WARNING), ("Info", logging.INFO), ("Debug", logging.DEBUG)]
+
+
+class MessageLogHandler(logging.Handler):
+    """Forward the plugin's log records to the QGIS message log."""
+
+    def emit(self, record):
+        if record.levelno >= logging.ERROR:
+            level = Qgis.Critical
+        elif record.levelno >= logging.WARNING:
+            level = Qgis.Warning
+        else:
+            level = Qgis.Info
+        # logMessage may be called from worker threads
+        QgsMessageLog.logMessage(self.format(record), LOG_TAG, level=level, notifyUser=False)
 
 
 class ImageMaskDock(QDockWidget):
@@ -29,9 +79,61 @@ class ImageMaskDock(QDockWidget):
         self.mask_veg_suffix = "_vegmask_ndvi"
         self.all_pairs = []
         self.filtered_pairs = []
+        self.status_index = StatusIndex()  # key -> pair plus per-status membership
         self.current_index = 0
         self.csv_path = ""
+        self.review_data = {}
+        self.review_store = None  # CSV or SQLite backend for review decisions
         self.current_triplet_layers = []  # Track current triplet layers
+        self.renderers = RendererTemplates()  # Built once, cloned onto every layer
+        # Prefetched triplets are styled when they arrive, off the navigation path
+        self.resources = LayerResources()  # Owns every layer the dock creates
+        self.prefetcher = TripletPrefetcher(prepare=self.prepare_triplet)
+        self.band_stretch = None  # Cached per-image contrast stretch
+        self.dataset_stretch = None  # Median stretch of a sample of tiles, once computed
+        self.dataset_sample = None  # Image paths the dataset stretch is combined from
+        self.stretch_task = None  # Samples stretches off the GUI thread
+        self.stretch_queue = []  # Image paths waiting for the next pass
+        self.stretch_pending = set()  # Queued or being sampled
+        self.stretch_failed = set()
+        self.stretch_saved = time.monotonic()
+        self.layer_slots = {}  # role -> long-lived layer in persistent slots mode
+        self.image_layer = None  # Image layer of the tile on the canvas
+        self.chip_grids = {}  # image path -> chips, in chip review mode
+        self.chip_index = 0  # Chip of the current tile; negative counts from the end
+        self.scan_task = None
+        self.overview_task = None
+        self.overview_done = set()  # Raster paths whose overviews are finished
+        self.overview_counts = {}
+        self.snapshot_task = None
+        self.mask_stats = None  # Cached per-mask statistics for queue ordering
+        self.agreement_stats = None  # Cached mask / mask_veg agreement per pair
+        self.stats_task = None
+        self.stats_counts = {}
+        self.thumbnails = None  # Packed thumbnail cache for the contact sheet
+        self.thumbnail_task = None
+        self.thumbnail_counts = {}
+        # Merges decisions other reviewers append to the shared output directory
+        self.sync_timer = QtCore.QTimer(self)
+        self.sync_timer.setInterval(10000)
+        # Coalesces key repeat and spinbox scrubbing into one load of the latest tile
+        self.navigation_timer = QtCore.QTimer(self)
+        self.navigation_timer.setSingleShot(True)
+        self.navigation_timer.setInterval(NAVIGATION_SETTLE_MS)
+        self.navigation_pending = False
+        self.navigation_skipped = 0
+        # Stage timings and logging for the Diagnostics panel
+        self.timings = StageTimings()
+        self.render_started = None  # perf_counter of the tile swap awaiting a canvas render
+        self.render_counts = RenderCounter()
+        self.zoom_target = None  # (extent, crs) the canvas was last zoomed to for a tile
+        self.diagnostics_timer = QtCore.QTimer(self)
+        self.diagnostics_timer.setInterval(1000)
+        self.package_logger = logging.getLogger(__package__)
+        self.log_handler = MessageLogHandler()
+        self.log_handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+        self.package_logger.addHandler(self.log_handler)
+        self.package_logger.setLevel(logging.WARNING)
         
         self.setupUi()
         self.connectSignals()
@@ -94,6 +196,54 @@ class ImageMaskDock(QDockWidget):
         suffix_layout.addWidget(self.veg_suffix_edit)
         dir_layout.addLayout(suffix_layout)
         
+        # Nested tile layouts such as region/zoom/x/y.tif, with masks in mirrored trees
+        recursive_layout = QHBoxLayout()
+        self.recursive_cb = QCheckBox("Include subdirectories")
+        self.recursive_cb.setToolTip("Walk the three directory trees and match files by their "
+                                     "path relative to each tree plus the suffix")
+        recursive_layout.addWidget(self.recursive_cb)
+        recursive_layout.addWidget(QLabel("Walk threads:"))
+        self.walk_workers_spinbox = QSpinBox()
+        self.walk_workers_spinbox.setRange(1, 64)
+        self.walk_workers_spinbox.setValue(DEFAULT_WALK_WORKERS)
+        self.walk_workers_spinbox.setToolTip("Directories listed at once; raise it for network "
+                                             "filesystems, where each listing mostly waits")
+        recursive_layout.addWidget(self.walk_workers_spinbox)
+        dir_layout.addLayout(recursive_layout)
+        
+        # Reviewer id, used for the per-reviewer journal
+        reviewer_layout = QHBoxLayout()
+        reviewer_layout.addWidget(QLabel("Reviewer:"))
+        try:
+            default_reviewer = getpass.getuser()
+        except (OSError, KeyError):
+            default_reviewer = ""
+        self.reviewer_edit = QLineEdit(default_reviewer)
+        self.reviewer_edit.setToolTip("Decisions are journaled per reviewer, so several reviewers "
+                                      "can share one output directory")
+        reviewer_layout.addWidget(self.reviewer_edit)
+        dir_layout.addLayout(reviewer_layout)
+        
+        # Review log mode
+        log_layout = QHBoxLayout()
+        log_layout.addWidget(QLabel("Store:"))
+        self.store_combo = QComboBox()
+        self.store_combo.addItem("CSV", 'csv')
+        self.store_combo.addItem("SQLite", 'sqlite')
+        self.store_combo.setToolTip("CSV keeps review_log.csv; SQLite keeps review_log.sqlite "
+                                    "(imported from review_log.csv on first use)")
+        log_layout.addWidget(self.store_combo)
+        self.journal_cb = QCheckBox("Append-only journal")
+        self.journal_cb.setChecked(True)
+        self.journal_cb.setToolTip("Append each decision to review_log.journal.<reviewer>.<host>.csv "
+                                   "instead of rewriting review_log.csv on every click")
+        log_layout.addWidget(self.journal_cb)
+        self.compact_btn = QPushButton("Compact Log")
+        self.compact_btn.setEnabled(False)
+        self.compact_btn.setToolTip("Bring review_log.csv up to date with every decision")
+        log_layout.addWidget(self.compact_btn)
+        dir_layout.addLayout(log_layout)
+        
         self.load_btn = QPushButton("Load Triplets")
         self.load_btn.setStyleSheet("QPushButton { background-color: #4CAF50; color: white; padding: 8px; }")
         dir_layout.addWidget(self.load_btn)
@@ -109,6 +259,47 @@ class ImageMaskDock(QDockWidget):
         self.show_reviewed_cb.setEnabled(False)
         filter_layout.addWidget(self.show_reviewed_cb)
         
+        # Queue order and statistics filters for the selected mask type
+        order_layout = QHBoxLayout()
+        order_layout.addWidget(QLabel("Order:"))
+        self.order_combo = QComboBox()
+        for key, label, _, _ in QUEUE_ORDERS:
+            self.order_combo.addItem(label, key)
+        self.order_combo.setToolTip("Orders other than file name use the mask statistics of the "
+                                    "selected mask type; tiles without statistics come last")
+        order_layout.addWidget(self.order_combo)
+        filter_layout.addLayout(order_layout)
+        
+        stats_filter_layout = QHBoxLayout()
+        self.hide_full_cb = QCheckBox("Hide foreground >")
+        stats_filter_layout.addWidget(self.hide_full_cb)
+        self.max_foreground_spinbox = QSpinBox()
+        self.max_foreground_spinbox.setRange(1, 100)
+        self.max_foreground_spinbox.setValue(99)
+        self.max_foreground_spinbox.setSuffix("%")
+        stats_filter_layout.addWidget(self.max_foreground_spinbox)
+        self.hide_empty_cb = QCheckBox("Hide empty")
+        stats_filter_layout.addWidget(self.hide_empty_cb)
+        filter_layout.addLayout(stats_filter_layout)
+        
+        stats_layout = QHBoxLayout()
+        self.stats_btn = QPushButton("Compute Mask Stats")
+        self.stats_btn.setEnabled(False)
+        self.stats_btn.setToolTip("Compute foreground, component and nodata statistics for every "
+                                  "mask and the mask / mask_veg agreement in the background; "
+                                  "results are cached in mask_stats.json and mask_agreement.json")
+        stats_layout.addWidget(self.stats_btn)
+        self.stats_label = QLabel("")
+        self.stats_label.setStyleSheet("QLabel { color: #666; }")
+        stats_layout.addWidget(self.stats_label)
+        filter_layout.addLayout(stats_layout)
+        
+        self.zoom_disagreement_cb = QCheckBox("Zoom to disagreement")
+        self.zoom_disagreement_cb.setChecked(True)
+        self.zoom_disagreement_cb.setToolTip("Zoom to where mask and mask_veg disagree instead of "
+                                             "the full tile, once agreement has been computed")
+        filter_layout.addWidget(self.zoom_disagreement_cb)
+        
         # Go to index
         goto_layout = QHBoxLayout()
         goto_layout.addWidget(QLabel("Go to Index:"))
@@ -124,9 +315,169 @@ class ImageMaskDock(QDockWidget):
         goto_layout.addWidget(self.goto_btn)
         filter_layout.addLayout(goto_layout)
         
+        # Chip review of large scenes
+        chip_layout = QHBoxLayout()
+        self.chip_cb = QCheckBox("Review in chips of")
+        self.chip_cb.setToolTip("Step through each image in a grid of windows and record a "
+                                "decision per window, without reloading the layers")
+        chip_layout.addWidget(self.chip_cb)
+        self.chip_size_spinbox = QSpinBox()
+        self.chip_size_spinbox.setRange(256, 16384)
+        self.chip_size_spinbox.setSingleStep(256)
+        self.chip_size_spinbox.setValue(DEFAULT_CHIP_SIZE)
+        self.chip_size_spinbox.setSuffix(" px")
+        chip_layout.addWidget(self.chip_size_spinbox)
+        filter_layout.addLayout(chip_layout)
+        
         filter_group.setLayout(filter_layout)
         layout.addWidget(filter_group)
         
+        # Performance options
+        perf_group = QGroupBox("Performance")
+        perf_layout = QVBoxLayout()
+        
+        prefetch_layout = QHBoxLayout()
+        prefetch_layout.addWidget(QLabel("Prefetch ahead:"))
+        self.prefetch_ahead_spinbox = QSpinBox()
+        self.prefetch_ahead_spinbox.setRange(0, 20)
+        self.prefetch_ahead_spinbox.setValue(self.prefetcher.ahead)
+        prefetch_layout.addWidget(self.prefetch_ahead_spinbox)
+        prefetch_layout.addWidget(QLabel("behind:"))
+        self.prefetch_behind_spinbox = QSpinBox()
+        self.prefetch_behind_spinbox.setRange(0, 20)
+        self.prefetch_behind_spinbox.setValue(self.prefetcher.behind)
+        prefetch_layout.addWidget(self.prefetch_behind_spinbox)
+        perf_layout.addLayout(prefetch_layout)
+        
+        self.manifest_cb = QCheckBox("Reuse scan manifest")
+        self.manifest_cb.setChecked(True)
+        self.manifest_cb.setToolTip("Keep scan_manifest.json in the output directory and only "
+                                    "re-list directories that changed since the last load")
+        perf_layout.addWidget(self.manifest_cb)
+        
+        self.slots_cb = QCheckBox("Persistent layer slots")
+        self.slots_cb.setToolTip("Keep one image, mask and mask_veg layer and swap their data "
+                                 "source on navigation instead of removing and re-adding layers")
+        perf_layout.addWidget(self.slots_cb)
+        
+        stretch_layout = QHBoxLayout()
+        stretch_layout.addWidget(QLabel("Contrast:"))
+        self.stretch_combo = QComboBox()
+        self.stretch_combo.addItem("Per tile (cached)", 'tile')
+        self.stretch_combo.addItem("Dataset-wide (cached)", 'dataset')
+        self.stretch_combo.addItem("No stretch", 'none')
+        self.stretch_combo.setToolTip("2-98% stretch for 4-3-2 images from a downsampled read, "
+                                      "cached in band_stretch.json in the output directory")
+        stretch_layout.addWidget(self.stretch_combo)
+        perf_layout.addLayout(stretch_layout)
+        
+        gdal_layout = QHBoxLayout()
+        gdal_layout.addWidget(QLabel("GDAL cache (MB):"))
+        self.gdal_cache_spinbox = QSpinBox()
+        self.gdal_cache_spinbox.setRange(16, 16384)
+        self.gdal_cache_spinbox.setValue(DEFAULT_GDAL_CACHE_MB)
+        self.gdal_cache_spinbox.setToolTip("Block cache budget GDAL may use while reviewing")
+        gdal_layout.addWidget(self.gdal_cache_spinbox)
+        gdal_layout.addWidget(QLabel("threads:"))
+        self.gdal_threads_spinbox = QSpinBox()
+        self.gdal_threads_spinbox.setRange(0, 64)
+        self.gdal_threads_spinbox.setSpecialValueText("Default")
+        self.gdal_threads_spinbox.setValue(DEFAULT_GDAL_THREADS)
+        self.gdal_threads_spinbox.setToolTip("GDAL_NUM_THREADS for decoding compressed rasters")
+        gdal_layout.addWidget(self.gdal_threads_spinbox)
+        perf_layout.addLayout(gdal_layout)
+        
+        overview_layout = QHBoxLayout()
+        self.overview_btn = QPushButton("Build Overviews")
+        self.overview_btn.setEnabled(False)
+        self.overview_btn.setToolTip("Build pyramids for all images and masks in the background, "
+                                     "starting from the current tile")
+        overview_layout.addWidget(self.overview_btn)
+        self.internal_overviews_cb = QCheckBox("Internal")
+        self.internal_overviews_cb.setToolTip("Write overviews into the rasters instead of .ovr files")
+        overview_layout.addWidget(self.internal_overviews_cb)
+        perf_layout.addLayout(overview_layout)
+        
+        self.overview_label = QLabel("")
+        self.overview_label.setStyleSheet("QLabel { color: #666; }")
+        perf_layout.addWidget(self.overview_label)
+        
+        self.prefetch_label = QLabel(self.prefetcher.stats_text())
+        self.prefetch_label.setStyleSheet("QLabel { color: #666; }")
+        perf_layout.addWidget(self.prefetch_label)
+        
+        perf_group.setLayout(perf_layout)
+        layout.addWidget(perf_group)
+        
+        # Diagnostics: collapsed unless checked
+        self.diagnostics_group = QGroupBox("Diagnostics")
+        self.diagnostics_group.setCheckable(True)
+        self.diagnostics_group.setChecked(False)
+        diagnostics_group_layout = QVBoxLayout()
+        self.diagnostics_widget = QWidget()
+        diagnostics_layout = QVBoxLayout()
+        diagnostics_layout.setContentsMargins(0, 0, 0, 0)
+        
+        log_level_layout = QHBoxLayout()
+        log_level_layout.addWidget(QLabel("Log level:"))
+        self.log_level_combo = QComboBox()
+        for label, level in LOG_LEVELS:
+            self.log_level_combo.addItem(label, level)
+        self.log_level_combo.setToolTip(f"Messages go to the '{LOG_TAG}' tab of the Log Messages panel")
+        log_level_layout.addWidget(self.log_level_combo)
+        diagnostics_layout.addLayout(log_level_layout)
+        
+        self.resources_label = QLabel(self.resources.stats_text())
+        self.resources_label.setWordWrap(True)
+        diagnostics_layout.addWidget(self.resources_label)
+        
+        self.timings_label = QLabel("No timings yet")
+        self.timings_label.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.timings_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        diagnostics_layout.addWidget(self.timings_label)
+        
+        timings_btn_layout = QHBoxLayout()
+        self.export_timings_btn = QPushButton("Export...")
+        self.export_timings_btn.setToolTip("Save per-stage p50/p95 and the recent samples as JSON or CSV")
+        timings_btn_layout.addWidget(self.export_timings_btn)
+        self.reset_timings_btn = QPushButton("Reset")
+        timings_btn_layout.addWidget(self.reset_timings_btn)
+        diagnostics_layout.addLayout(timings_btn_layout)
+        
+        self.diagnostics_widget.setLayout(diagnostics_layout)
+        self.diagnostics_widget.setVisible(False)
+        diagnostics_group_layout.addWidget(self.diagnostics_widget)
+        self.diagnostics_group.setLayout(diagnostics_group_layout)
+        layout.addWidget(self.diagnostics_group)
+        
+        # Contact sheet
+        grid_group = QGroupBox("Contact Sheet")
+        grid_layout = QVBoxLayout()
+        
+        thumbnail_layout = QHBoxLayout()
+        self.thumbnail_btn = QPushButton("Build Thumbnails")
+        self.thumbnail_btn.setEnabled(False)
+        self.thumbnail_btn.setToolTip("Render image + mask thumbnails in the background into "
+                                      "thumbnails.pack in the output directory")
+        thumbnail_layout.addWidget(self.thumbnail_btn)
+        self.grid_cb = QCheckBox("Show Grid")
+        self.grid_cb.setToolTip("Show the review queue as a grid of thumbnails; double-click a "
+                                "tile to open it")
+        thumbnail_layout.addWidget(self.grid_cb)
+        grid_layout.addLayout(thumbnail_layout)
+        
+        self.thumbnail_label = QLabel("")
+        self.thumbnail_label.setStyleSheet("QLabel { color: #666; }")
+        grid_layout.addWidget(self.thumbnail_label)
+        
+        self.grid_view = ThumbnailGrid()
+        self.grid_view.setMinimumHeight(320)
+        self.grid_view.setVisible(False)
+        grid_layout.addWidget(self.grid_view)
+        
+        grid_group.setLayout(grid_layout)
+        layout.addWidget(grid_group)
+        
         # Review section
         review_group = QGroupBox("Review")
         review_layout = QVBoxLayout()
@@ -195,6 +546,38 @@ class ImageMaskDock(QDockWidget):
         review_btn_layout.addWidget(self.unreview_btn)
         review_layout.addLayout(review_btn_layout)
         
+        # Bulk decisions for a grid selection or a range of the queue
+        bulk_layout = QHBoxLayout()
+        bulk_layout.addWidget(QLabel("Bulk:"))
+        self.bulk_decision_combo = QComboBox()
+        self.bulk_decision_combo.addItem("Correct", 'correct')
+        self.bulk_decision_combo.addItem("Incorrect", 'incorrect')
+        self.bulk_decision_combo.addItem("Reset", 'not_reviewed')
+        bulk_layout.addWidget(self.bulk_decision_combo)
+        bulk_layout.addWidget(QLabel("for"))
+        self.bulk_scope_combo = QComboBox()
+        self.bulk_scope_combo.addItem("Grid selection", 'selection')
+        self.bulk_scope_combo.addItem("Queue range", 'range')
+        bulk_layout.addWidget(self.bulk_scope_combo)
+        review_layout.addLayout(bulk_layout)
+        
+        bulk_range_layout = QHBoxLayout()
+        bulk_range_layout.addWidget(QLabel("From:"))
+        self.bulk_from_spinbox = QSpinBox()
+        self.bulk_from_spinbox.setRange(1, 1)
+        bulk_range_layout.addWidget(self.bulk_from_spinbox)
+        bulk_range_layout.addWidget(QLabel("to:"))
+        self.bulk_to_spinbox = QSpinBox()
+        self.bulk_to_spinbox.setRange(1, 1)
+        bulk_range_layout.addWidget(self.bulk_to_spinbox)
+        self.bulk_btn = QPushButton("Apply")
+        self.bulk_btn.setEnabled(False)
+        self.bulk_btn.setToolTip("Record the decision for every selected tile (or queue range) "
+                                 "for the mask type chosen above, in one batch")
+        bulk_range_layout.addWidget(self.bulk_btn)
+        review_layout.addLayout(bulk_range_layout)
+        self.bulk_scope_changed()
+        
         review_group.setLayout(review_layout)
         layout.addWidget(review_group)
         
@@ -214,13 +597,60 @@ class ImageMaskDock(QDockWidget):
         self.browse_mask_veg_btn.clicked.connect(self.browse_mask_veg_directory)
         self.browse_output_btn.clicked.connect(self.browse_output_directory)
         self.load_btn.clicked.connect(self.load_pairs)
+        self.compact_btn.clicked.connect(self.compact_review_log)
+        self.store_combo.currentIndexChanged.connect(self.store_backend_changed)
+        self.journal_cb.toggled.connect(self.journal_mode_changed)
+        self.sync_timer.timeout.connect(self.sync_reviewers)
         self.show_reviewed_cb.toggled.connect(self.filter_pairs)
+        self.order_combo.currentIndexChanged.connect(self.queue_options_changed)
+        self.hide_full_cb.toggled.connect(self.queue_options_changed)
+        self.max_foreground_spinbox.valueChanged.connect(self.max_foreground_changed)
+        self.hide_empty_cb.toggled.connect(self.queue_options_changed)
+        self.mask_veg_radio.toggled.connect(self.mask_type_changed)
+        self.stats_btn.clicked.connect(self.toggle_stats_pass)
+        self.thumbnail_btn.clicked.connect(self.toggle_thumbnail_build)
+        self.grid_cb.toggled.connect(self.toggle_grid)
+        self.grid_view.pairActivated.connect(self.grid_pair_activated)
         self.goto_btn.clicked.connect(self.goto_index)
+        self.goto_spinbox.valueChanged.connect(self.goto_value_changed)
+        self.chip_cb.toggled.connect(self.chip_mode_changed)
+        self.chip_size_spinbox.valueChanged.connect(self.chip_mode_changed)
+        self.navigation_timer.timeout.connect(self.navigation_settled)
+        self.prefetch_ahead_spinbox.valueChanged.connect(self.update_prefetch_window)
+        self.prefetch_behind_spinbox.valueChanged.connect(self.update_prefetch_window)
+        self.slots_cb.toggled.connect(self.toggle_layer_slots)
+        self.stretch_combo.currentIndexChanged.connect(self.stretch_mode_changed)
+        self.gdal_cache_spinbox.valueChanged.connect(self.gdal_settings_changed)
+        self.gdal_threads_spinbox.valueChanged.connect(self.gdal_settings_changed)
+        self.overview_btn.clicked.connect(self.toggle_overview_build)
+        self.diagnostics_group.toggled.connect(self.toggle_diagnostics)
+        self.diagnostics_timer.timeout.connect(self.update_diagnostics)
+        self.log_level_combo.currentIndexChanged.connect(self.log_level_changed)
+        self.export_timings_btn.clicked.connect(self.export_timings)
+        self.reset_timings_btn.clicked.connect(self.reset_timings)
+        self.iface.mapCanvas().mapCanvasRefreshed.connect(self.canvas_refreshed)
+        self.iface.mapCanvas().renderStarting.connect(self.render_counts.render)
         self.prev_btn.clicked.connect(self.previous_pair)
         self.next_btn.clicked.connect(self.next_pair)
         self.correct_btn.clicked.connect(lambda: self.review_current('correct'))
         self.incorrect_btn.clicked.connect(lambda: self.review_current('incorrect'))
         self.unreview_btn.clicked.connect(lambda: self.review_current('not_reviewed'))
+        self.bulk_scope_combo.currentIndexChanged.connect(self.bulk_scope_changed)
+        self.bulk_btn.clicked.connect(self.apply_bulk_decision)
+        
+        # Review shortcuts, active while the dock or one of its widgets has focus
+        shortcuts = [
+            (Qt.Key_Right, self.next_pair),
+            (Qt.Key_Left, self.previous_pair),
+            (Qt.Key_Space, lambda: self.review_current('correct')),
+            (Qt.Key_X, lambda: self.review_current('incorrect')),
+            (Qt.Key_R, lambda: self.review_current('not_reviewed')),
+            (Qt.Key_M, self.toggle_mask_type),
+        ]
+        for key, slot in shortcuts:
+            shortcut = QShortcut(QKeySequence(key), self)
+            shortcut.setContext(Qt.WidgetWithChildrenShortcut)
+            shortcut.activated.connect(slot)
         
     def browse_image_directory(self):
         directory = QtWidgets.QFileDialog.getExistingDirectory(
@@ -247,6 +677,10 @@ class ImageMaskDock(QDockWidget):
             self.output_dir_edit.setText(directory)
             
     def load_pairs(self):
+        if self.scan_task is not None:
+            self.scan_task.cancel()
+            return
+            
         self.image_dir = self.image_dir_edit.text()
         self.mask_dir = self.mask_dir_edit.text()
         self.mask_veg_dir = self.mask_veg_dir_edit.text()
@@ -263,190 +697,221 @@ class ImageMaskDock(QDockWidget):
             return
             
         os.makedirs(self.output_dir, exist_ok=True)
-        
-        # Setup CSV with new structure
-        self.csv_path = os.path.join(self.output_dir, 'review_log.csv')
-        if not os.path.exists(self.csv_path):
-            with open(self.csv_path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['timestamp', 'image_file', 'mask_file', 'mask_veg_file', 'mask_type', 'status', 'notes'])
-        
-        self.load_review_data()
-        self.find_pairs()
-        self.update_pair_statuses()
-        self.filter_pairs()
-        
+        self.prefetcher.clear()
+        self.chip_grids.clear()
+        self.apply_gdal_settings()
+        self.resources.reset_memory()
+        self.sync_timer.stop()
+        
+        if self.review_store is not None:
+            self.review_store.close()
+        try:
+            self.review_store = open_review_store(
+                self.store_combo.currentData(), self.output_dir, self.journal_cb.isChecked(),
+                reviewer=self.reviewer_edit.text())
+        except Exception as e:
+            QMessageBox.warning(self, "Warning", f"Could not open review store: {e}")
+            self.review_store = None
+            return
+        self.csv_path = self.review_store.csv_path
+        if self.stats_task is not None:
+            self.stats_task.cancel()
+        self.mask_stats = MaskStatsCache(self.output_dir)
+        self.agreement_stats = MaskStatsCache(self.output_dir, AGREEMENT_CACHE_NAME, AGREEMENT_FIELDS)
+        if self.thumbnail_task is not None:
+            self.thumbnail_task.cancel()
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+        self.thumbnails = ThumbnailCache(self.output_dir)
+        self.grid_view.thumbnail_model.set_cache(self.thumbnails)
+        self.save_band_stretch()
+        if self.stretch_task is not None:
+            self.stretch_task.cancel()
+            self.stretch_task = None
+        self.stretch_queue = []
+        self.stretch_pending.clear()
+        self.stretch_failed.clear()
+        self.band_stretch = MaskStatsCache(self.output_dir, STRETCH_CACHE_NAME, STRETCH_FIELDS)
+        self.dataset_stretch = None
+        self.dataset_sample = None
+        
+        # Start empty; review data and pairs stream in from the scan task
+        self.review_data = {}
+        self.all_pairs = []
+        self.filtered_pairs = []
+        self.status_index.rebuild([])
+        self.current_index = 0
+        self.clear_display()
+        self.show_reviewed_cb.setEnabled(False)
+        self.overview_btn.setEnabled(False)
+        self.stats_btn.setEnabled(False)
+        self.thumbnail_btn.setEnabled(False)
+        
+        self.scan_task = ScanTask({
+            'image_dir': self.image_dir,
+            'mask_dir': self.mask_dir,
+            'mask_veg_dir': self.mask_veg_dir,
+            'output_dir': self.output_dir,
+            'mask_suffix': self.mask_suffix,
+            'mask_veg_suffix': self.mask_veg_suffix,
+            'review_store': self.review_store,
+            'use_manifest': self.manifest_cb.isChecked(),
+            'recursive': self.recursive_cb.isChecked(),
+            'walk_workers': self.walk_workers_spinbox.value(),
+            'caches': [self.mask_stats, self.agreement_stats, self.thumbnails, self.band_stretch],
+            'timings': self.timings,
+        }, on_finished=self.scan_finished)
+        self.scan_task.reviewDataLoaded.connect(self.review_data_loaded)
+        self.scan_task.pairsFound.connect(self.pairs_found)
+        QgsApplication.taskManager().addTask(self.scan_task)
+        
+        self.load_btn.setText("Cancel Scan")
+        self.progress_bar.setMaximum(0)  # Busy indicator until the first triplets arrive
+        self.status_label.setText("Loading review log...")
+        
+    def review_data_loaded(self, review_data):
+        """Adopt the review data loaded by the scan task."""
+        self.review_data = review_data
+        log.info("Loaded %d review records from %s", len(self.review_data), self.review_store.description)
+        self.compact_btn.setEnabled(True)
+        self.status_label.setText("Scanning...")
+        
+    def pairs_found(self, pairs):
+        """Append a chunk of streamed pairs; the first chunk starts the review."""
+        first_chunk = not self.filtered_pairs
+        self.all_pairs.extend(pairs)
+        for pair in pairs:
+            self.status_index.add(pair)
+        self.filtered_pairs.extend(self.queue_filter(pairs))
+            
+        self.update_status_counts()
+        self.show_reviewed_cb.setEnabled(True)
         if self.filtered_pairs:
-            self.current_index = 0
-            self.load_current_pair()
+            if first_chunk:
+                self.load_current_pair()
             self.update_ui()
+            self.update_goto_controls()
             
-        # Always enable show_reviewed checkbox if we have any pairs
+    def scan_finished(self, task, result):
+        self.scan_task = None
+        # Sample again across the complete queue
+        self.dataset_stretch = None
+        self.dataset_sample = None
+        self.load_btn.setText("Load Triplets")
+        
+        if task.error is not None:
+            log.error("Error loading triplets: %s", task.error)
+            self.iface.messageBar().pushMessage(
+                "Error", f"Loading triplets failed: {task.error}",
+                level=Qgis.Critical, duration=5)
+        if task.incomplete:
+            log.warning("Incomplete triplets for %d images, e.g. %s", len(task.incomplete), task.incomplete[0])
+        log.info("Total triplets found: %d (scan: %s)", len(self.all_pairs), task.mode)
+        walk = task.walk_stats
+        walk_text = ""
+        if walk.get('seconds'):
+            walk_text = (f" | Walked {walk['directories']} directories, "
+                         f"{walk['directories'] / walk['seconds']:.0f}/s")
+        
+        # Streamed chunks arrive in directory order; sort while keeping the current pair
+        current_pair = self.filtered_pairs[self.current_index] if self.filtered_pairs else None
+        self.all_pairs.sort(key=lambda pair: pair['image_file'])
+        self.filtered_pairs = self.visible_pairs()
+        self.current_index = next((i for i, pair in enumerate(self.filtered_pairs)
+                                   if pair is current_pair), 0)
+        
+        self.update_status_counts()
+        if not self.filtered_pairs:
+            self.clear_display()
+        else:
+            if current_pair is None or self.filtered_pairs[self.current_index] is not current_pair:
+                self.load_current_pair()
+            self.update_ui()
+        self.update_goto_controls()
+        
         self.show_reviewed_cb.setEnabled(len(self.all_pairs) > 0)
+        self.overview_btn.setEnabled(len(self.all_pairs) > 0)
+        self.stats_btn.setEnabled(len(self.all_pairs) > 0)
+        self.thumbnail_btn.setEnabled(len(self.all_pairs) > 0)
+        self.update_stats_label()
+        self.update_thumbnail_label()
+        if isinstance(self.review_store, CsvReviewStore):
+            self.sync_timer.start()
+        if walk_text:
+            self.status_label.setText(self.status_label.text() + walk_text)
+        if not result and task.error is None:
+            self.status_label.setText(self.status_label.text() + " | Scan cancelled")
+            
+    def queue_filter(self, pairs):
+        """Apply the review status and mask statistics filters to pairs."""
+        if not self.show_reviewed_cb.isChecked():
+            pairs = [p for p in pairs if p['status'] == 'not_reviewed']
+        max_foreground = (self.max_foreground_spinbox.value() / 100.0
+                          if self.hide_full_cb.isChecked() else None)
+        return filter_by_foreground(pairs, self.pair_stat, max_foreground,
+                                    self.hide_empty_cb.isChecked())
+        
+    def visible_pairs(self):
+        """Return the pairs that pass the current filters, in queue order."""
+        return order_pairs(self.queue_filter(self.all_pairs), self.order_combo.currentData(),
+                           self.pair_stat)
+        
+    def pair_stat(self, pair, field):
+        """Return a cached statistic of the pair's selected mask or agreement, or None."""
+        if self.mask_stats is None:
+            return None
+        if field in AGREEMENT_FIELDS:
+            return self.agreement_stats.value(pair['mask_path'], field)
+        path = pair['mask_veg_path'] if self.mask_veg_radio.isChecked() else pair['mask_path']
+        return self.mask_stats.value(path, field)
+        
+    def queue_stats_active(self):
+        return (self.order_combo.currentData() != 'name' or self.hide_full_cb.isChecked()
+                or self.hide_empty_cb.isChecked())
+        
+    def queue_options_changed(self):
+        """Re-order the queue and start again from its first tile."""
+        if self.scan_task is not None or not self.all_pairs:
+            return
+        self.current_index = 0
+        self.filter_pairs()
         
-        # Enable go to index controls
-        if self.filtered_pairs:
-            self.goto_spinbox.setEnabled(True)
-            self.goto_btn.setEnabled(True)
-            self.goto_spinbox.setMaximum(len(self.filtered_pairs))
-            self.goto_spinbox.setValue(1)
-        else:
-            self.goto_spinbox.setEnabled(False)
-            self.goto_btn.setEnabled(False)
+    def max_foreground_changed(self):
+        if self.hide_full_cb.isChecked():
+            self.queue_options_changed()
             
-    def load_review_data(self):
-        self.review_data = {}
-        if os.path.exists(self.csv_path):
-            try:
-                print(f"Loading CSV from: {self.csv_path}")
-                df = pd.read_csv(self.csv_path)
-                print(f"CSV columns: {list(df.columns)}")
-                print(f"CSV shape: {df.shape}")
-                
-                if not df.empty and 'image_file' in df.columns:
-                    # Handle both old and new CSV formats
-                    if 'mask_type' in df.columns:
-                        # New format with mask_type
-                        for _, row in df.iterrows():
-                            key = (row['image_file'], row.get('mask_file', ''), row.get('mask_veg_file', ''), row['mask_type'])
-                            self.review_data[key] = {
-                                'status': row['status'],
-                                'timestamp': row['timestamp'],
-                                'mask_type': row['mask_type'],
-                                'notes': row.get('notes', '')
-                            }
-                            print(f"Loaded: {key} -> {row['status']}")
-                    else:
-                        # Old format - convert to new format
-                        status_col = 'status' if 'status' in df.columns else 'decision'
-                        for _, row in df.iterrows():
-                            # Assume old entries are for regular masks
-                            key = (row['image_file'], row['mask_file'], '', 'mask')
-                            self.review_data[key] = {
-                                'status': row[status_col],
-                                'timestamp': row['timestamp'],
-                                'mask_type': 'mask',
-                                'notes': row.get('notes', '')
-                            }
-                    print(f"Total loaded {len(self.review_data)} review records from CSV")
-                else:
-                    print("CSV is empty or missing required columns")
-            except Exception as e:
-                print(f"Error loading review data: {e}")
-                import traceback
-                traceback.print_exc()
-                
-    def find_pairs(self):
-        self.all_pairs = []
-        image_extensions = ['.tif', '.tiff', '.jpg', '.jpeg', '.png', '.bmp']
-        
-        image_files = [f for f in os.listdir(self.image_dir) 
-                      if any(f.lower().endswith(ext) for ext in image_extensions)
-                      and self.mask_suffix not in f
-                      and self.mask_veg_suffix not in f]
-        
-        for image_file in sorted(image_files):
-            image_path = os.path.join(self.image_dir, image_file)
-            base_name = os.path.splitext(image_file)[0]
-            ext = os.path.splitext(image_file)[1]
-            
-            # Find regular mask
-            mask_found = False
-            mask_path = None
-            mask_file = None
-            
-            possible_masks = [
-                base_name + self.mask_suffix + ext,
-                base_name + self.mask_suffix + '.tif',
-                base_name + self.mask_suffix + '.png',
-            ]
-            
-            for mask_name in possible_masks:
-                mask_test_path = os.path.join(self.mask_dir, mask_name)
-                if os.path.exists(mask_test_path):
-                    mask_path = mask_test_path
-                    mask_file = mask_name
-                    mask_found = True
-                    break
-            
-            # Find mask_veg
-            mask_veg_found = False
-            mask_veg_path = None
-            mask_veg_file = None
-            
-            possible_mask_vegs = [
-                base_name + self.mask_veg_suffix + ext,
-                base_name + self.mask_veg_suffix + '.tif',
-                base_name + self.mask_veg_suffix + '.png',
-            ]
-            
-            for mask_veg_name in possible_mask_vegs:
-                mask_veg_test_path = os.path.join(self.mask_veg_dir, mask_veg_name)
-                if os.path.exists(mask_veg_test_path):
-                    mask_veg_path = mask_veg_test_path
-                    mask_veg_file = mask_veg_name
-                    mask_veg_found = True
-                    break
-            
-            # Only add if we have both mask and mask_veg
-            if mask_found and mask_veg_found:
-                print(f"Found triplet: {image_file} + {mask_file} + {mask_veg_file}")
-                self.all_pairs.append({
-                    'image_path': image_path,
-                    'mask_path': mask_path,
-                    'mask_veg_path': mask_veg_path,
-                    'image_file': image_file,
-                    'mask_file': mask_file,
-                    'mask_veg_file': mask_veg_file,
-                    'status': 'not_reviewed'  # Will be updated later
-                })
-            else:
-                print(f"Incomplete triplet for {image_file}: mask={mask_found}, mask_veg={mask_veg_found}")
-                
-        print(f"Total triplets found: {len(self.all_pairs)}")
-                    
-    def update_pair_statuses(self):
-        """Update pair statuses from loaded review data."""
-        print(f"Updating statuses for {len(self.all_pairs)} pairs")
-        print(f"Review data contains {len(self.review_data)} entries")
-        
-        for pair in self.all_pairs:
-            # Check both mask types for this triplet
-            mask_key = (pair['image_file'], pair['mask_file'], pair['mask_veg_file'], 'mask')
-            mask_veg_key = (pair['image_file'], pair['mask_file'], pair['mask_veg_file'], 'mask_veg')
-            
-            # If either has been reviewed, mark as reviewed (prefer mask_veg)
-            if mask_veg_key in self.review_data:
-                pair['status'] = self.review_data[mask_veg_key]['status']
-                print(f"  Updated from mask_veg: {pair['status']}")
-            elif mask_key in self.review_data:
-                pair['status'] = self.review_data[mask_key]['status']
-                print(f"  Updated from mask: {pair['status']}")
-            else:
-                print(f"  No review data found for: {pair['image_file']}")
-                
-        print("Status update complete")
+    def mask_type_changed(self):
+        """Re-apply order and filters that use the selected mask's statistics."""
+        order_field = next(field for key, _, field, _ in QUEUE_ORDERS
+                           if key == self.order_combo.currentData())
+        uses_mask_type = (self.hide_full_cb.isChecked() or self.hide_empty_cb.isChecked()
+                          or (order_field is not None and order_field not in AGREEMENT_FIELDS))
+        if uses_mask_type and self.scan_task is None and self.all_pairs:
+            self.refresh_queue()
+        elif self.filtered_pairs:
+            self.update_ui()
+            
+    def refresh_queue(self):
+        """Re-apply order and filters while staying on the current tile."""
+        current_pair = self.filtered_pairs[self.current_index] if self.filtered_pairs else None
+        self.filtered_pairs = self.visible_pairs()
+        if current_pair is not None and not any(p is current_pair for p in self.filtered_pairs):
+            self.filtered_pairs.insert(0, current_pair)
+        self.current_index = next((i for i, pair in enumerate(self.filtered_pairs)
+                                   if pair is current_pair), 0)
+        if self.filtered_pairs:
+            self.update_ui()
+        self.update_goto_controls()
         
+
     def filter_pairs(self):
-        if self.show_reviewed_cb.isChecked():
-            self.filtered_pairs = self.all_pairs.copy()
-        else:
-            self.filtered_pairs = [p for p in self.all_pairs if p['status'] == 'not_reviewed']
+        self.filtered_pairs = self.visible_pairs()
             
         # Reset index if current is out of bounds
         if self.current_index >= len(self.filtered_pairs):
             self.current_index = 0
             
-        # Update counts
-        total_pairs = len(self.all_pairs)
-        unreviewed_pairs = len([p for p in self.all_pairs if p['status'] == 'not_reviewed'])
-        correct_pairs = len([p for p in self.all_pairs if p['status'] == 'correct'])
-        incorrect_pairs = len([p for p in self.all_pairs if p['status'] == 'incorrect'])
-        
-        self.status_label.setText(
-            f"Total: {total_pairs} | Unreviewed: {unreviewed_pairs} | "
-            f"Correct: {correct_pairs} | Incorrect: {incorrect_pairs}"
-        )
+        self.update_status_counts()
         
         if self.filtered_pairs:
             self.load_current_pair()
@@ -454,7 +919,25 @@ class ImageMaskDock(QDockWidget):
         else:
             self.clear_display()
             
-        # Update go to index controls
+        self.update_goto_controls()
+        
+    def update_status_counts(self):
+        """Show per-status counts from the status index."""
+        index = self.status_index
+        scanning = " | Scanning..." if self.scan_task is not None else ""
+        self.status_label.setText(
+            f"Total: {len(index)} | Unreviewed: {index.count('not_reviewed')} | "
+            f"Correct: {index.count('correct')} | Incorrect: {index.count('incorrect')}{scanning}"
+        )
+        
+    def update_goto_controls(self):
+        """Sync the go to index controls (and the grid and bulk range) with filtered_pairs."""
+        self.sync_grid()
+        self.bulk_btn.setEnabled(bool(self.filtered_pairs))
+        self.bulk_from_spinbox.setMaximum(max(len(self.filtered_pairs), 1))
+        self.bulk_to_spinbox.setMaximum(max(len(self.filtered_pairs), 1))
+        # Syncing the spinbox is not a navigation request
+        self.goto_spinbox.blockSignals(True)
         if self.filtered_pairs:
             self.goto_spinbox.setEnabled(True)
             self.goto_btn.setEnabled(True)
@@ -468,9 +951,14 @@ class ImageMaskDock(QDockWidget):
             self.goto_spinbox.setEnabled(False)
             self.goto_btn.setEnabled(False)
             self.goto_spinbox.setMaximum(1)
+        self.goto_spinbox.blockSignals(False)
             
     def clear_display(self):
+        self.navigation_timer.stop()
+        self.navigation_pending = False
         self.clear_current_triplet()
+        self.render_started = None
+        self.zoom_target = None
         self.current_file_label.setText("No pairs to review")
         self.status_indicator.setText("")
         self.status_indicator.setStyleSheet("QLabel { padding: 5px; border-radius: 3px; }")
@@ -486,74 +974,739 @@ class ImageMaskDock(QDockWidget):
         
     def clear_current_triplet(self):
         """Remove only the current triplet layers, preserve other layers."""
-        for layer in self.current_triplet_layers[:]:  # Create copy to iterate safely
-            try:
-                if layer is not None:
-                    layer_id = layer.id()
-                    if QgsProject.instance().mapLayer(layer_id):
-                        QgsProject.instance().removeMapLayer(layer_id)
-            except RuntimeError:
-                # Layer already deleted, skip
-                pass
+        self.resources.release(QgsProject.instance(), self.current_triplet_layers)
         self.current_triplet_layers.clear()
+        self.layer_slots.clear()
+        self.image_layer = None
         
+    def toggle_layer_slots(self, enabled):
+        """Switch between persistent slots and fresh layers per tile."""
+        self.clear_current_triplet()
+        if enabled:
+            # Prefetched layers are not used when slots swap their data source
+            self.prefetcher.clear()
+        if self.filtered_pairs:
+            self.load_current_pair()
+            
     def load_current_pair(self):
         if not self.filtered_pairs or self.current_index >= len(self.filtered_pairs):
             return
             
+        current_pair = self.filtered_pairs[self.current_index]
+        # Whatever was queued is superseded by this load
+        self.navigation_pending = False
+        self.render_counts.swap()
+        self.render_started = time.perf_counter()
+        with self.frozen_canvas():
+            if self.slots_cb.isChecked():
+                self.load_pair_into_slots(current_pair)
+            else:
+                self.load_pair_layers(current_pair)
+        self.check_memory()
+        
+    @contextmanager
+    def frozen_canvas(self):
+        """Hold canvas rendering while a tile is swapped and render once at the end.
+        
+        Removing the old layers, adding the new ones, visibility changes and
+        the zoom each ask the canvas for a refresh; frozen, they cost nothing.
+        """
+        canvas = self.iface.mapCanvas()
+        if canvas.isFrozen():
+            yield
+            return
+        canvas.freeze(True)
+        try:
+            yield
+        finally:
+            canvas.freeze(False)
+            canvas.refresh()
+            
+    def load_pair_layers(self, current_pair):
+        """Swap in a fresh (or prefetched) triplet for a tile."""
         # Clear only previous triplet layers
         self.clear_current_triplet()
         
-        current_pair = self.filtered_pairs[self.current_index]
-        image_path = current_pair['image_path']
-        mask_path = current_pair['mask_path']
-        mask_veg_path = current_pair['mask_veg_path']
-        base_name = os.path.splitext(current_pair['image_file'])[0]
-        
-        # Load image
-        image_layer = QgsRasterLayer(image_path, f"{base_name}_image")
+        # Use the prefetched (already styled) triplet when ready, otherwise open it now
+        with self.timings.time('layer_construction'):
+            layers = self.prefetcher.take(current_pair) if self.prefetcher.enabled else None
+            prefetched = layers is not None
+            if not prefetched:
+                layers = self.resources.track_triplet(create_triplet_layers(current_pair))
+        image_layer = layers['image']
+        
+        # Style before adding, so each layer is drawn once with its final renderer
+        with self.timings.time('renderer_setup'):
+            if not prefetched:
+                self.style_triplet(layers)
+                    
+        project = QgsProject.instance()
+        with self.timings.time('add_map_layer'):
+            for role, path_key in TRIPLET_ROLES:
+                layer = layers[role]
+                if not layer.isValid():
+                    log.warning("Failed to load %s: %s", role, current_pair[path_key])
+                    continue
+                project.addMapLayer(layer)
+                self.current_triplet_layers.append(layer)
+                if role != 'image':
+                    # Only the mask_veg overlay starts visible
+                    layer_tree_layer = project.layerTreeRoot().findLayer(layer.id())
+                    if layer_tree_layer:
+                        layer_tree_layer.setItemVisibilityChecked(role == 'mask_veg')
+                    log.debug("Loaded %s: %s", role, current_pair[path_key])
+                    
+        # Zoom to image layer
         if image_layer.isValid():
-            self.configure_image_bands(image_layer)
-            QgsProject.instance().addMapLayer(image_layer)
-            self.current_triplet_layers.append(image_layer)
-            
-        # Load mask (initially hidden)
-        mask_layer = QgsRasterLayer(mask_path, f"{base_name}_mask")
-        if mask_layer.isValid():
-            QgsProject.instance().addMapLayer(mask_layer)
-            mask_layer.setOpacity(0.6)
-            self.configure_mask_symbology(mask_layer)
-            self.current_triplet_layers.append(mask_layer)
-            # Hide mask layer using layer tree
-            root = QgsProject.instance().layerTreeRoot()
-            layer_tree_layer = root.findLayer(mask_layer.id())
-            if layer_tree_layer:
-                layer_tree_layer.setItemVisibilityChecked(False)
-            print(f"Loaded mask: {mask_path}")
+            self.image_layer = image_layer
+            with self.timings.time('zoom'):
+                self.zoom_to_pair(current_pair, image_layer)
         else:
-            print(f"Failed to load mask: {mask_path}")
-            
-        # Load mask_veg (initially visible)
-        mask_veg_layer = QgsRasterLayer(mask_veg_path, f"{base_name}_mask_veg")
-        if mask_veg_layer.isValid():
-            QgsProject.instance().addMapLayer(mask_veg_layer)
-            mask_veg_layer.setOpacity(0.6)
-            self.configure_mask_symbology(mask_veg_layer)
-            self.current_triplet_layers.append(mask_veg_layer)
-            # Ensure mask_veg layer is visible
-            root = QgsProject.instance().layerTreeRoot()
-            layer_tree_layer = root.findLayer(mask_veg_layer.id())
-            if layer_tree_layer:
-                layer_tree_layer.setItemVisibilityChecked(True)
-            print(f"Loaded mask_veg: {mask_veg_path}")
+            self.render_started = None
+            
+        # Warm up the neighbours while the reviewer looks at this one
+        self.prefetcher.prefetch(self.filtered_pairs, self.current_index)
+        self.prefetch_label.setText(self.prefetcher.stats_text())
+            
+    def load_pair_into_slots(self, pair):
+        """Point the long-lived slot layers at a new triplet.
+        
+        Slots that already exist only change their data source, which keeps
+        their renderer, opacity and layer tree visibility.  Missing slots
+        (first tile, or removed by the user) are created and styled once.
+        """
+        base_name = os.path.splitext(pair['image_file'])[0]
+        project = QgsProject.instance()
+        spans = self.timings.spans()  # One sample per stage for the whole triplet
+        
+        for role, path_key in TRIPLET_ROLES:
+            path = pair[path_key]
+            name = f"{base_name}_{role}"
+            layer = self.layer_slots.pop(role, None)
+            try:
+                if layer is not None and not project.mapLayer(layer.id()):
+                    layer = None
+            except RuntimeError:
+                layer = None  # Removed by the user
+                
+            if layer is not None:
+                with spans.time('layer_construction'):
+                    layer.setDataSource(path, name, 'gdal', QgsDataProvider.ProviderOptions())
+                    layer.setName(name)
+                if not layer.isValid():
+                    log.warning("Failed to load %s: %s", role, path)
+                with spans.time('renderer_setup'):
+                    fits = role != 'image' or self.image_slot_renderer_fits(layer)
+                if not fits:
+                    # Band count changed under a 4-3-2 renderer; rebuild this slot
+                    project.removeMapLayer(layer.id())
+                    layer = None
+                    
+            if layer is None:
+                with spans.time('layer_construction'):
+                    layer = self.resources.track(QgsRasterLayer(path, name))
+                if not layer.isValid():
+                    log.warning("Failed to load %s: %s", role, path)
+                    continue
+                with spans.time('renderer_setup'):
+                    if role == 'image':
+                        self.renderers.style_image(layer, self.image_stretch(path))
+                    else:
+                        self.renderers.style_mask(layer)
+                with spans.time('add_map_layer'):
+                    project.addMapLayer(layer)
+                layer_tree_layer = project.layerTreeRoot().findLayer(layer.id())
+                if layer_tree_layer:
+                    # Only the mask_veg overlay starts visible
+                    layer_tree_layer.setItemVisibilityChecked(role != 'mask')
+            self.layer_slots[role] = layer
+                    
+        self.current_triplet_layers = list(self.layer_slots.values())
+        
+        image_layer = self.layer_slots.get('image')
+        if image_layer is not None and image_layer.isValid():
+            self.image_layer = image_layer
+            with spans.time('zoom'):
+                self.zoom_to_pair(pair, image_layer)
         else:
-            print(f"Failed to load mask_veg: {mask_veg_path}")
+            self.render_started = None
+        spans.record()
             
-        # Zoom to image layer
-        if image_layer.isValid():
-            self.iface.setActiveLayer(image_layer)
-            self.iface.zoomToActiveLayer()
+    def zoom_to_pair(self, pair, image_layer):
+        """Zoom to the current chip in chip mode, otherwise to the mask / mask_veg
+        disagreement when known, otherwise to the whole image.
+        
+        The canvas is left alone when the target is the one the previous tile
+        was zoomed to (tiles sharing a grid, or images without georeferencing),
+        which keeps the reviewer's view and saves a render.
+        """
+        self.iface.setActiveLayer(image_layer)
+        chip = self.current_chip()
+        bbox = self.pair_stat(pair, 'bbox') if self.zoom_disagreement_cb.isChecked() else None
+        layer_extent = image_layer.extent()
+        if chip is not None:
+            extent = QgsRectangle(*chip['extent'])
+        elif bbox:
+            extent = QgsRectangle(*bbox)
+            # Keep some context around the disagreement, and never zoom in below ~5% of the tile
+            extent.grow(max(extent.width(), extent.height(),
+                            0.05 * max(layer_extent.width(), layer_extent.height())) * 0.25)
+        else:
+            extent = QgsRectangle(layer_extent)
+        canvas = self.iface.mapCanvas()
+        destination_crs = canvas.mapSettings().destinationCrs()
+        if image_layer.crs().isValid() and image_layer.crs() != destination_crs:
+            transform = QgsCoordinateTransform(image_layer.crs(), destination_crs,
+                                               QgsProject.instance())
+            extent = transform.transformBoundingBox(extent)
+        target = (extent, destination_crs)
+        if self.zoom_target is not None and self.zoom_target == target:
+            return
+        self.zoom_target = target
+        # The frozen canvas renders once when the swap is done
+        canvas.setExtent(extent)
             
+    def current_chips(self):
+        """Chips of the current tile's image, or an empty list outside chip mode."""
+        if not self.chip_cb.isChecked() or not self.filtered_pairs:
+            return []
+        path = self.filtered_pairs[self.current_index]['image_path']
+        chips = self.chip_grids.get(path)
+        if chips is None:
+            try:
+                chips = chip_grid(path, self.chip_size_spinbox.value())
+            except Exception as e:
+                log.warning("Could not read the raster size of %s: %s", path, e)
+                chips = []
+            self.chip_grids[path] = chips
+        return chips
+        
+    def current_chip(self):
+        chips = self.current_chips()
+        if not chips:
+            return None
+        if self.chip_index < 0:
+            self.chip_index += len(chips)
+        self.chip_index = min(max(self.chip_index, 0), len(chips) - 1)
+        return chips[self.chip_index]
+        
+    def move_chip(self, step):
+        """Move within the current tile's chips; returns False past either end."""
+        if self.current_chip() is None:
+            return False
+        index = self.chip_index + step
+        if not 0 <= index < len(self.current_chips()):
+            return False
+        self.chip_index = index
+        self.show_chip()
+        return True
+        
+    def show_chip(self):
+        """Pan the canvas to the current chip; the tile's layers stay loaded."""
+        # While a tile load is queued the canvas still shows the previous tile,
+        # and the load zooms to the chip itself
+        if not self.navigation_pending and self.image_layer is not None:
+            self.render_counts.swap()
+            self.render_started = time.perf_counter()
+            with self.frozen_canvas(), self.timings.time('zoom'):
+                self.zoom_to_pair(self.filtered_pairs[self.current_index], self.image_layer)
+        self.update_ui()
+        
+    def chip_mode_changed(self):
+        self.chip_grids.clear()
+        self.chip_index = 0
+        if self.filtered_pairs:
+            self.show_chip()
+            
+    def image_slot_renderer_fits(self, image_layer):
+        """Check the restored image renderer against the new tile's band count.
+        
+        A 4-3-2 slot gets the new tile's stretch, or the template when it
+        lost the 4-3-2 renderer.
+        """
+        uses_432 = self.renderers.uses_template(image_layer)
+        if image_layer.bandCount() >= 4:
+            stretch = self.image_stretch(image_layer.source())
+            if not uses_432 or stretch is not None:
+                self.renderers.style_image(image_layer, stretch)
+            return True
+        return not uses_432
+        
+    def prepare_triplet(self, layers):
+        """Take ownership of a prefetched triplet and style it."""
+        self.resources.track_triplet(layers)
+        self.style_triplet(layers)
+        
+    def style_triplet(self, layers):
+        """Apply the renderer templates, with the image's cached stretch."""
+        stretch = self.image_stretch(layers['image'].source()) if layers['image'].isValid() else None
+        self.renderers.style_triplet(layers, stretch)
+        
+    def file_stretch(self, path):
+        """Return the cached stretch of an image, or None while it is being sampled."""
+        if self.band_stretch is None:
+            return None
+        if self.band_stretch.is_fresh(path):
+            return self.band_stretch.get(path)
+        self.request_stretches([path])
+        return None
+        
+    def image_stretch(self, path):
+        """Return the stretch for an image in the selected contrast mode, or None."""
+        mode = self.stretch_combo.currentData()
+        if mode == 'none':
+            return None
+        if mode == 'tile':
+            return self.file_stretch(path)
+        if self.dataset_sample is None and self.all_pairs and self.band_stretch is not None:
+            step = max(len(self.all_pairs) // DATASET_SAMPLE_TILES, 1)
+            self.dataset_sample = [pair['image_path']
+                                   for pair in self.all_pairs[::step][:DATASET_SAMPLE_TILES]]
+            self.request_stretches(self.dataset_sample)
+            self.combine_dataset_stretch()
+        return self.dataset_stretch
+        
+    def combine_dataset_stretch(self):
+        """Combine the sampled tiles into the dataset stretch once none is pending."""
+        if any(path in self.stretch_pending for path in self.dataset_sample):
+            return False
+        self.dataset_stretch = combine_stretches(
+            self.band_stretch.get(path) for path in self.dataset_sample
+            if path not in self.stretch_failed)
+        return self.dataset_stretch is not None
+        
+    def request_stretches(self, paths):
+        """Queue images without a fresh cached stretch for the background pass."""
+        for path in paths:
+            if (path in self.stretch_pending or path in self.stretch_failed
+                    or self.band_stretch.is_fresh(path)):
+                continue
+            self.stretch_pending.add(path)
+            self.stretch_queue.append(path)
+        if self.stretch_queue and self.stretch_task is None:
+            self.start_stretch_pass()
+            
+    def start_stretch_pass(self):
+        cache = self.band_stretch
+        self.stretch_task = StretchTask(self.stretch_queue, self.stretch_pass_finished)
+        self.stretch_queue = []
+        # Results belong to this cache even if triplets are reloaded meanwhile
+        self.stretch_task.cache = cache
+        self.stretch_task.stretchReady.connect(
+            lambda path, result: self.stretch_ready(cache, path, result))
+        QgsApplication.taskManager().addTask(self.stretch_task)
+        
+    def stretch_ready(self, cache, path, result):
+        if cache is not self.band_stretch:
+            return
+        self.stretch_pending.discard(path)
+        if isinstance(result, Exception):
+            self.stretch_failed.add(path)
+            log.warning("Could not sample %s for the contrast stretch: %s", path, result)
+            return
+        cache.update(path, *result)
+        if self.stretch_combo.currentData() == 'dataset':
+            if self.dataset_stretch is None and self.dataset_sample is not None:
+                if self.combine_dataset_stretch():
+                    self.restyle_images()
+        else:
+            self.restyle_images({path})
+            
+    def stretch_pass_finished(self, task, result):
+        if self.stretch_task is not task:
+            return  # Cancelled by a reload
+        self.stretch_task = None
+        if time.monotonic() - self.stretch_saved > STRETCH_SAVE_INTERVAL:
+            self.save_band_stretch()
+        if self.stretch_queue:
+            self.start_stretch_pass()
+            
+    def restyle_images(self, paths=None):
+        """Give the image on the canvas and the prefetched ones their newly sampled stretch."""
+        layers = [self.image_layer] + [triplet['image'] for triplet in self.prefetcher.cache.values()]
+        for layer in layers:
+            try:
+                if layer is None or not layer.isValid():
+                    continue
+                path = layer.source()
+                if paths is not None and path not in paths:
+                    continue
+                stretch = self.image_stretch(path)
+                if stretch is not None:
+                    self.renderers.style_image(layer, stretch)
+                    layer.triggerRepaint()
+            except RuntimeError:
+                pass  # Removed by the user
+        
+    def stretch_mode_changed(self):
+        """Restyle the current tile; prefetched triplets carry the old stretch."""
+        self.prefetcher.clear()
+        if self.slots_cb.isChecked():
+            self.clear_current_triplet()  # Slots only restyle on a band count change
+        if self.filtered_pairs:
+            self.load_current_pair()
+            
+    def save_band_stretch(self):
+        if self.band_stretch is None:
+            return
+        self.stretch_saved = time.monotonic()
+        try:
+            self.band_stretch.save()
+        except OSError as e:
+            log.warning("Could not write contrast stretch cache: %s", e)
+            
+    def update_prefetch_window(self):
+        """Apply the prefetch ahead/behind settings."""
+        self.prefetcher.ahead = self.prefetch_ahead_spinbox.value()
+        self.prefetcher.behind = self.prefetch_behind_spinbox.value()
+        if not self.prefetcher.enabled:
+            self.prefetcher.clear()
+        elif self.filtered_pairs and not self.slots_cb.isChecked():
+            self.prefetcher.prefetch(self.filtered_pairs, self.current_index)
+        self.prefetch_label.setText(self.prefetcher.stats_text())
+        
+    def queue_from_current(self, path_key):
+        """Return every pair for a background pass, starting at the current tile.
+        
+        The queue from the current tile onwards comes first (then wrapping
+        around), so the tiles the reviewer sees next are ready first, followed
+        by the pairs filtered out of the queue, deduplicated on path_key.
+        """
+        ordered = self.filtered_pairs[self.current_index:] + self.filtered_pairs[:self.current_index]
+        seen = {pair[path_key] for pair in ordered}
+        return ordered + [pair for pair in self.all_pairs if pair[path_key] not in seen]
+        
+    def toggle_overview_build(self):
+        """Start the background overview pass, or cancel it if it is running."""
+        if self.overview_task is not None:
+            self.overview_task.cancel()
+            return
+            
+        ordered = self.queue_from_current('image_path')
+        jobs = [job for job in overview_jobs(ordered, self.internal_overviews_cb.isChecked())
+                if job[0] not in self.overview_done]
+        if not jobs:
+            self.overview_label.setText(f"Overviews: all {len(self.overview_done)} rasters done")
+            return
+            
+        self.overview_counts = {'built': 0, 'skipped': 0, 'small': 0, 'failed': 0, 'total': len(jobs)}
+        self.overview_task = ProcessPoolTask("Building overviews", build_overviews, jobs,
+                                             on_finished=self.overview_build_finished)
+        self.overview_task.itemFinished.connect(self.overview_item_finished)
+        QgsApplication.taskManager().addTask(self.overview_task)
+        self.overview_btn.setText("Cancel Overviews")
+        self.update_overview_label()
+        
+    def overview_item_finished(self, job, result):
+        if isinstance(result, Exception):
+            self.overview_counts['failed'] += 1
+            log.warning("Failed to build overviews for %s: %s", job[0], result)
+        else:
+            self.overview_counts[result] += 1
+            self.overview_done.add(job[0])
+        self.update_overview_label()
+        
+    def overview_build_finished(self, task, result):
+        self.overview_task = None
+        self.overview_btn.setText("Build Overviews")
+        self.update_overview_label()
+        if task.error is not None:
+            self.overview_label.setText(f"Overview build failed: {task.error}")
+        elif result:
+            self.iface.messageBar().pushMessage(
+                "Success", f"Overviews ready for {self.overview_counts['total']} rasters",
+                level=Qgis.Success, duration=3)
+                
+    def update_overview_label(self):
+        counts = self.overview_counts
+        processed = counts['built'] + counts['skipped'] + counts['small'] + counts['failed']
+        state = " (stopped)" if self.overview_task is None and processed < counts['total'] else ""
+        self.overview_label.setText(
+            f"Overviews: {processed} / {counts['total']}{state} | built {counts['built']}, "
+            f"existing {counts['skipped']}, failed {counts['failed']}")
+        
+    def toggle_stats_pass(self):
+        """Start the background mask statistics pass, or cancel it if it is running."""
+        if self.stats_task is not None:
+            self.stats_task.cancel()
+            return
+            
+        ordered = self.queue_from_current('mask_path')
+        jobs = pair_jobs(ordered)
+        caches = (self.mask_stats, self.agreement_stats)
+        self.stats_counts = {'computed': 0, 'failed': 0}
+        # The freshness check stats every mask, so it runs on the task thread
+        self.stats_task = ProcessPoolTask(
+            "Computing mask statistics", compute_pair_stats,
+            lambda is_canceled: stale_pair_jobs(jobs, *caches, is_canceled=is_canceled),
+            on_finished=self.stats_pass_finished)
+        # Results belong to these caches even if triplets are reloaded meanwhile
+        self.stats_task.caches = caches
+        self.stats_task.itemFinished.connect(
+            lambda job, result: self.stats_item_finished(caches, job, result))
+        QgsApplication.taskManager().addTask(self.stats_task)
+        self.stats_btn.setText("Cancel Mask Stats")
+        self.stats_label.setText("Mask stats: checking cache...")
+        
+    def stats_item_finished(self, caches, job, result):
+        if isinstance(result, Exception):
+            self.stats_counts['failed'] += 1
+            log.warning("Failed to compute mask statistics for %s: %s", job[0], result)
+        else:
+            stats, agreement = caches
+            stats.update(job[0], *result['mask'])
+            stats.update(job[1], *result['mask_veg'])
+            agreement.update(job, *result['agreement'])
+            self.stats_counts['computed'] += 1
+        self.update_stats_label()
+        
+    def stats_pass_finished(self, task, result):
+        self.stats_task = None
+        self.stats_btn.setText("Compute Mask Stats")
+        try:
+            for cache in task.caches:
+                cache.save()
+        except OSError as e:
+            log.warning("Could not write mask statistics cache: %s", e)
+        self.update_stats_label()
+        if task.error is not None:
+            self.stats_label.setText(f"Mask stats failed: {task.error}")
+        if self.stats_counts['computed'] and self.queue_stats_active():
+            self.refresh_queue()
+            
+    def update_stats_label(self):
+        if self.mask_stats is None:
+            return
+        if self.stats_task is not None and not callable(self.stats_task.items):
+            counts = self.stats_counts
+            self.stats_label.setText(
+                f"Mask stats: {counts['computed'] + counts['failed']} / {len(self.stats_task.items)}"
+                f" | failed {counts['failed']}")
+        else:
+            self.stats_label.setText(f"Mask stats: {len(self.mask_stats)} masks, "
+                                     f"{len(self.agreement_stats)} pairs cached")
+            
+    def toggle_grid(self, visible):
+        self.grid_view.setVisible(visible)
+        self.sync_grid()
+        
+    def sync_grid(self):
+        """Point the grid at the current queue; only done while it is shown."""
+        if not self.grid_view.isVisible():
+            return
+        self.grid_view.thumbnail_model.set_pairs(self.filtered_pairs)
+        if self.filtered_pairs:
+            self.grid_view.show_row(self.current_index)
+            
+    def grid_pair_activated(self, row):
+        if 0 <= row < len(self.filtered_pairs) and row != self.current_index:
+            self.navigate_to(row)
+            
+    def toggle_thumbnail_build(self):
+        """Start the background thumbnail pass, or cancel it if it is running."""
+        if self.thumbnail_task is not None:
+            self.thumbnail_task.cancel()
+            return
+            
+        ordered = self.queue_from_current('image_path')
+        jobs = thumbnail_jobs(ordered, self.thumbnails.size)
+        cache = self.thumbnails
+        self.thumbnail_counts = {'rendered': 0, 'failed': 0}
+        self.thumbnail_task = ProcessPoolTask(
+            "Rendering thumbnails", render_thumbnail,
+            lambda is_canceled: cache.stale_jobs(jobs, is_canceled),
+            on_finished=self.thumbnail_build_finished)
+        self.thumbnail_task.cache = cache
+        self.thumbnail_task.itemFinished.connect(
+            lambda job, result: self.thumbnail_item_finished(cache, job, result))
+        QgsApplication.taskManager().addTask(self.thumbnail_task)
+        self.thumbnail_btn.setText("Cancel Thumbnails")
+        self.thumbnail_label.setText("Thumbnails: checking cache...")
+        
+    def thumbnail_item_finished(self, cache, job, result):
+        if isinstance(result, Exception):
+            self.thumbnail_counts['failed'] += 1
+            log.warning("Failed to render thumbnail for %s: %s", job[0], result)
+        else:
+            cache.put(job[0], *result)
+            self.thumbnail_counts['rendered'] += 1
+            if cache is self.thumbnails:
+                self.grid_view.thumbnail_model.thumbnail_updated(job[0])
+                self.grid_view.viewport().update()
+        self.update_thumbnail_label()
+        
+    def thumbnail_build_finished(self, task, result):
+        self.thumbnail_task = None
+        self.thumbnail_btn.setText("Build Thumbnails")
+        try:
+            task.cache.save()
+        except OSError as e:
+            log.warning("Could not write thumbnail index: %s", e)
+        if task.cache is not self.thumbnails:
+            task.cache.close()  # Triplets were reloaded while the pass was running
+        self.update_thumbnail_label()
+        if task.error is not None:
+            self.thumbnail_label.setText(f"Thumbnails failed: {task.error}")
+            
+    def update_thumbnail_label(self):
+        if self.thumbnails is None:
+            return
+        if self.thumbnail_task is not None and not callable(self.thumbnail_task.items):
+            counts = self.thumbnail_counts
+            self.thumbnail_label.setText(
+                f"Thumbnails: {counts['rendered'] + counts['failed']} / "
+                f"{len(self.thumbnail_task.items)} | failed {counts['failed']}")
+        else:
+            self.thumbnail_label.setText(f"Thumbnails: {len(self.thumbnails)} cached")
+            
+    def sync_reviewers(self):
+        """Merge decisions other reviewers made in the shared output directory.
+        
+        Also runs the journal compaction record_many() defers, so a large
+        bulk review never rewrites the snapshot while it is being recorded.
+        """
+        store = self.review_store
+        if store is None or self.scan_task is not None:
+            return
+        changed = store.refresh()
+        if store.snapshot_changed() and self.snapshot_task is None:
+            # Another reviewer compacted; re-read the snapshot off the GUI thread
+            self.snapshot_task = QgsTask.fromFunction(
+                "Merging review log", lambda task: store.read_snapshot(),
+                on_finished=lambda exception, result=None: self.snapshot_read(store, exception, result))
+            QgsApplication.taskManager().addTask(self.snapshot_task)
+        if changed:
+            self.apply_review_changes(changed)
+        store.compact_if_due()
+            
+    def snapshot_read(self, store, exception, result):
+        self.snapshot_task = None
+        if exception is not None:
+            log.warning("Error reading review log: %s", exception)
+            return
+        if store is not self.review_store:
+            return  # Triplets were reloaded in the meantime
+        changed = store.merge_snapshot(*result)
+        if changed:
+            self.apply_review_changes(changed)
+            
+    def apply_review_changes(self, changed):
+        """Update pair statuses for review keys that other reviewers changed."""
+        log.info("Merged %d review records from other reviewers", len(changed))
+        current_pair = self.filtered_pairs[self.current_index] if self.filtered_pairs else None
+        for key in {key[:3] for key in changed}:
+            status = review_status(key, self.review_data)
+            if status is not None:
+                self.status_index.set_status(key, status)
+                
+        if not self.show_reviewed_cb.isChecked():
+            # Drop pairs reviewed elsewhere, but never the one on screen
+            self.filtered_pairs = [p for p in self.filtered_pairs
+                                   if p is current_pair or p['status'] == 'not_reviewed']
+            self.current_index = next((i for i, pair in enumerate(self.filtered_pairs)
+                                       if pair is current_pair), 0)
+        self.update_status_counts()
+        if self.filtered_pairs:
+            self.update_ui()
+        self.update_goto_controls()
+        
+    def shutdown(self):
+        """Release background work and open files when the plugin unloads."""
+        self.sync_timer.stop()
+        self.navigation_timer.stop()
+        self.diagnostics_timer.stop()
+        try:
+            self.iface.mapCanvas().mapCanvasRefreshed.disconnect(self.canvas_refreshed)
+            self.iface.mapCanvas().renderStarting.disconnect(self.render_counts.render)
+        except TypeError:
+            pass
+        self.package_logger.removeHandler(self.log_handler)
+        self.prefetcher.clear()
+        if self.scan_task is not None:
+            self.scan_task.cancel()
+        if self.overview_task is not None:
+            self.overview_task.cancel()
+        if self.stats_task is not None:
+            self.stats_task.cancel()
+        if self.thumbnail_task is not None:
+            self.thumbnail_task.cancel()
+        if self.stretch_task is not None:
+            self.stretch_task.cancel()
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+        self.save_band_stretch()
+        self.resources.restore_gdal_settings()
+        if self.review_store is not None:
+            self.review_store.close()
+            
+    def apply_gdal_settings(self):
+        self.resources.apply_gdal_settings(self.gdal_cache_spinbox.value(),
+                                           self.gdal_threads_spinbox.value())
+        
+    def gdal_settings_changed(self):
+        # Settings belong to a review session; the first load applies them
+        if self.review_store is not None:
+            self.apply_gdal_settings()
+            
+    def check_memory(self):
+        """Sample memory after a navigation and warn once if it keeps growing."""
+        if not self.resources.record_navigation():
+            return
+        self.resources_label.setStyleSheet("QLabel { color: #f44336; }")
+        self.iface.messageBar().pushMessage(
+            "Warning", f"Memory grows by {self.resources.growth() / 1024:.0f} KB per tile; "
+            "see Diagnostics", level=Qgis.Warning, duration=10)
+            
+    def canvas_refreshed(self):
+        """Record the time from a tile swap to the end of its canvas render."""
+        if self.render_started is not None:
+            self.timings.record('canvas_render', time.perf_counter() - self.render_started)
+            self.render_started = None
+            
+    def toggle_diagnostics(self, expanded):
+        self.diagnostics_widget.setVisible(expanded)
+        if expanded:
+            self.update_diagnostics()
+            self.diagnostics_timer.start()
+        else:
+            self.diagnostics_timer.stop()
+            
+    def update_diagnostics(self):
+        """Show layer and memory counters, rolling p50 / p95 per stage and renders per tile."""
+        self.resources_label.setText(self.resources.stats_text())
+        labels = dict(STAGES)
+        rows = self.timings.summary()
+        if not rows:
+            self.timings_label.setText("No timings yet")
+            return
+        lines = [f"{'stage':<19}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}"]
+        for row in rows:
+            lines.append(f"{labels.get(row['stage'], row['stage']):<19}{row['count']:>6}"
+                         f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}")
+        lines.append(self.render_counts.stats_text())
+        self.timings_label.setText("\n".join(lines))
+        
+    def log_level_changed(self):
+        self.package_logger.setLevel(self.log_level_combo.currentData())
+        
+    def export_timings(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export Stage Timings", os.path.join(self.output_dir, 'stage_timings.json'),
+            "JSON (*.json);;CSV (*.csv)")
+        if not path:
+            return
+        try:
+            self.timings.export(path, extra={'renders_per_tile': self.render_counts.summary()})
+        except OSError as e:
+            QMessageBox.warning(self, "Warning", f"Could not export timings: {e}")
+            
+    def reset_timings(self):
+        self.timings.reset()
+        self.render_counts.reset()
+        self.resources.reset_memory()
+        self.resources_label.setStyleSheet("")
+        self.update_diagnostics()
+        
     def update_ui(self):
         if not self.filtered_pairs:
             self.clear_display()
@@ -564,8 +1717,19 @@ class ImageMaskDock(QDockWidget):
         mask_name = current_pair['mask_file']
         mask_veg_name = current_pair['mask_veg_file']
         status = current_pair['status']
-        
-        self.current_file_label.setText(f"Image: {image_name}\nMask: {mask_name}\nMask Veg: {mask_veg_name}")
+        chips = self.current_chips()
+        chip = self.current_chip()
+        if chip is not None:
+            status = review_status(chip_key(pair_key(current_pair), chip['window']),
+                                   self.review_data) or 'not_reviewed'
+        
+        file_text = f"Image: {image_name}\nMask: {mask_name}\nMask Veg: {mask_veg_name}"
+        foreground = self.pair_stat(current_pair, 'foreground')
+        if foreground is not None:
+            file_text += (f"\nForeground: {foreground:.1%} | Components: "
+                          f"{self.pair_stat(current_pair, 'components')} | "
+                          f"Nodata: {self.pair_stat(current_pair, 'nodata'):.1%}")
+        self.current_file_label.setText(file_text)
         
         # Update status indicator
         if status == 'correct':
@@ -580,13 +1744,20 @@ class ImageMaskDock(QDockWidget):
         
         # Update progress
         show_type = "All" if self.show_reviewed_cb.isChecked() else "Unreviewed"
-        self.progress_label.setText(f"{self.current_index + 1} / {len(self.filtered_pairs)} ({show_type})")
+        progress_text = f"{self.current_index + 1} / {len(self.filtered_pairs)} ({show_type})"
+        if chip is not None:
+            key = pair_key(current_pair)
+            reviewed = sum(1 for c in chips
+                           if review_status(chip_key(key, c['window']), self.review_data))
+            progress_text += f" | Chip {self.chip_index + 1} / {len(chips)} ({reviewed} reviewed)"
+        self.progress_label.setText(progress_text)
         self.progress_bar.setMaximum(len(self.filtered_pairs))
         self.progress_bar.setValue(self.current_index + 1)
         
         # Update navigation buttons
-        self.prev_btn.setEnabled(self.current_index > 0)
-        self.next_btn.setEnabled(self.current_index < len(self.filtered_pairs) - 1)
+        self.prev_btn.setEnabled(self.current_index > 0 or self.chip_index > 0)
+        self.next_btn.setEnabled(self.current_index < len(self.filtered_pairs) - 1
+                                 or self.chip_index < len(chips) - 1)
         
         # Update review buttons
         self.correct_btn.setEnabled(True)
@@ -594,7 +1765,45 @@ class ImageMaskDock(QDockWidget):
         self.unreview_btn.setEnabled(status != 'not_reviewed')
         
         # Update go to spinbox to current position
+        self.goto_spinbox.blockSignals(True)
         self.goto_spinbox.setValue(self.current_index + 1)
+        self.goto_spinbox.blockSignals(False)
+        if self.grid_view.isVisible():
+            self.grid_view.show_row(self.current_index)
+        
+    def show_current_pair(self):
+        """Load the current tile, coalescing requests that arrive in quick succession.
+        
+        The first request after a pause loads at once.  Requests within
+        NAVIGATION_SETTLE_MS of the previous one only move current_index
+        and the labels; the tile the reviewer ends up on is loaded once
+        they stop, and a render of a tile they already left is cancelled.
+        """
+        if self.navigation_timer.isActive():
+            if self.navigation_pending:
+                self.navigation_skipped += 1
+            self.navigation_pending = True
+            canvas = self.iface.mapCanvas()
+            if canvas.isDrawing():
+                canvas.stopRendering()
+        else:
+            self.load_current_pair()
+        self.navigation_timer.start()
+        self.update_ui()
+        
+    def navigate_to(self, index, chip_index=0):
+        if 0 <= index < len(self.filtered_pairs):
+            self.current_index = index
+            self.chip_index = chip_index
+            self.show_current_pair()
+            
+    def navigation_settled(self):
+        if self.navigation_pending and self.filtered_pairs:
+            self.load_current_pair()
+            log.debug("Navigation settled on %d; %d intermediate loads skipped",
+                      self.current_index + 1, self.navigation_skipped)
+        self.navigation_pending = False
+        self.navigation_skipped = 0
         
     def goto_index(self):
         """Jump to specified index in filtered pairs."""
@@ -604,80 +1813,76 @@ class ImageMaskDock(QDockWidget):
         target_index = self.goto_spinbox.value() - 1  # Convert to 0-based index
         
         if 0 <= target_index < len(self.filtered_pairs):
-            self.current_index = target_index
-            self.load_current_pair()
-            self.update_ui()
+            self.navigate_to(target_index)
         else:
             QMessageBox.warning(self, "Invalid Index", 
                               f"Index must be between 1 and {len(self.filtered_pairs)}")
-            self.goto_spinbox.setValue(self.current_index + 1)  # Reset to current
+            self.update_goto_controls()  # Reset to current
+            
+    def goto_value_changed(self, value):
+        """Follow the spinbox arrows and wheel; each step goes through the coalescing queue."""
+        if value - 1 != self.current_index:
+            self.navigate_to(value - 1)
         
     def previous_pair(self):
+        if self.move_chip(-1):
+            return
         if self.current_index > 0:
-            self.current_index -= 1
-            self.load_current_pair()
-            self.update_ui()
+            # Enter the previous tile at its last chip
+            self.navigate_to(self.current_index - 1, chip_index=-1)
             
     def next_pair(self):
-        if self.current_index < len(self.filtered_pairs) - 1:
-            self.current_index += 1
-            self.load_current_pair()
-            self.update_ui()
-            
-    def goto_index(self):
-        """Jump to specified index in filtered pairs."""
-        if not self.filtered_pairs:
+        if self.move_chip(1):
             return
+        if self.current_index < len(self.filtered_pairs) - 1:
+            self.navigate_to(self.current_index + 1)
             
-        target_index = self.goto_spinbox.value() - 1  # Convert to 0-based index
-        
-        if 0 <= target_index < len(self.filtered_pairs):
-            self.current_index = target_index
-            self.load_current_pair()
-            self.update_ui()
+    def toggle_mask_type(self):
+        """Switch the mask the next decision is saved for (M shortcut)."""
+        if self.mask_veg_radio.isChecked():
+            self.mask_radio.setChecked(True)
         else:
-            QMessageBox.warning(self, "Invalid Index", 
-                              f"Index must be between 1 and {len(self.filtered_pairs)}")
-            self.goto_spinbox.setValue(self.current_index + 1)  # Reset to current
+            self.mask_veg_radio.setChecked(True)
             
     def review_current(self, decision):
         if not self.filtered_pairs or self.current_index >= len(self.filtered_pairs):
             return
+        if self.navigation_pending:
+            # current_index has moved on but its layers are not loaded yet;
+            # don't record a decision on a tile the reviewer has not seen
+            log.debug("Ignoring '%s' on %d: tile not loaded yet", decision, self.current_index + 1)
+            return
             
         current_pair = self.filtered_pairs[self.current_index]
-        image_file = current_pair['image_file']
-        mask_file = current_pair['mask_file']
-        mask_veg_file = current_pair['mask_veg_file']
         
         # Get selected mask type
         mask_type = 'mask_veg' if self.mask_veg_radio.isChecked() else 'mask'
         
-        # Create key for the selected mask type
-        key = (image_file, mask_file, mask_veg_file, mask_type)
+        # Create key for the selected mask type (and chip, in chip mode)
+        chip = self.current_chip()
+        key = pair_key(current_pair)
+        if chip is not None:
+            key = chip_key(key, chip['window'])
+        key += (mask_type,)
         
-        # Update review data in memory
-        self.review_data[key] = {
+        # Update review data in memory and persist it
+        self.review_store.record(key, {
             'status': decision,
             'timestamp': datetime.now().isoformat(),
             'mask_type': mask_type,
             'notes': ''
-        }
+        })
         
-        # Save to CSV
-        self.save_review_data()
-        
-        # Update pair status
-        current_pair['status'] = decision
-        
-        # Update all_pairs as well
-        for pair in self.all_pairs:
-            if (pair['image_file'] == image_file and 
-                pair['mask_file'] == mask_file and 
-                pair['mask_veg_file'] == mask_veg_file):
-                pair['status'] = decision
-                break
-        
-        self.status_label.setText(f"Marked {mask_type} as {decision}")
+        if chip is not None:
+            # A chip decision leaves the tile's status alone and moves on to the next chip
+            if decision != 'not_reviewed':
+                self.next_pair()
+            self.update_ui()
+            return
+            
+        # Update pair status (filtered_pairs and all_pairs share the pair dict)
+        self.status_index.set_status(pair_key(current_pair), decision)
+        self.update_status_counts()
         
         # If not showing reviewed and current is now reviewed, re-filter
         if not self.show_reviewed_cb.isChecked() and decision != 'not_reviewed':
@@ -690,8 +1895,7 @@ class ImageMaskDock(QDockWidget):
                 
             # Load next pair or finish
             if self.filtered_pairs:
-                self.load_current_pair()
-                self.update_ui()
+                self.show_current_pair()
             else:
                 self.clear_display()
                 self.status_label.setText("All pairs reviewed! Toggle 'Show Reviewed' to see them.")
@@ -699,67 +1903,106 @@ class ImageMaskDock(QDockWidget):
             # Just update UI to reflect new status
             self.update_ui()
             
-        # Update counts in status
-        self.filter_pairs()
+        self.update_goto_controls()
         
-    def save_review_data(self):
-        """Save all review data to CSV, avoiding duplicates."""
-        with open(self.csv_path, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['timestamp', 'image_file', 'mask_file', 'mask_veg_file', 'mask_type', 'status', 'notes'])
-            
-            for (image_file, mask_file, mask_veg_file, mask_type), data in self.review_data.items():
-                writer.writerow([
-                    data['timestamp'],
-                    image_file,
-                    mask_file,
-                    mask_veg_file,
-                    mask_type,
-                    data['status'],
-                    data.get('notes', '')
-                ])
-        
-    def configure_image_bands(self, image_layer):
-        """Configure image layer to use 4-3-2 band order for multi-band images."""
-        if image_layer.bandCount() >= 4:
-            try:
-                # Create multi-band color renderer with 4-3-2 band order
-                renderer = QgsMultiBandColorRenderer(
-                    image_layer.dataProvider(), 
-                    4,  # Red band
-                    3,  # Green band  
-                    2   # Blue band
-                )
-                image_layer.setRenderer(renderer)
-                image_layer.triggerRepaint()
-            except Exception as e:
-                print(f"Error setting band order: {e}")
-                # Fallback to default if error occurs
-                
-    def configure_mask_symbology(self, mask_layer):
-        """Configure mask layer to display value 1 as white."""
-        try:
-            # Create a pseudocolor renderer
-            renderer = QgsSingleBandPseudoColorRenderer(mask_layer.dataProvider(), 1)
+    def bulk_scope_changed(self):
+        is_range = self.bulk_scope_combo.currentData() == 'range'
+        self.bulk_from_spinbox.setEnabled(is_range)
+        self.bulk_to_spinbox.setEnabled(is_range)
+        
+    def apply_bulk_decision(self):
+        """Apply the bulk decision to the grid selection or the chosen queue range."""
+        if not self.filtered_pairs:
+            return
+        if self.bulk_scope_combo.currentData() == 'selection':
+            if not self.grid_view.isVisible():
+                QMessageBox.warning(self, "Warning", "Show the grid and select tiles first!")
+                return
+            rows = self.grid_view.selected_rows()
+        else:
+            first, last = sorted((self.bulk_from_spinbox.value(), self.bulk_to_spinbox.value()))
+            rows = range(first - 1, min(last, len(self.filtered_pairs)))
+        pairs = [self.filtered_pairs[row] for row in rows if row < len(self.filtered_pairs)]
+        if not pairs:
+            QMessageBox.warning(self, "Warning", "No tiles selected!")
+            return
             
-            # Create color ramp shader
-            shader = QgsRasterShader()
-            ramp_shader = QgsColorRampShader()
-            ramp_shader.setColorRampType(QgsColorRampShader.Discrete)
+        decision = self.bulk_decision_combo.currentData()
+        mask_type = 'mask_veg' if self.mask_veg_radio.isChecked() else 'mask'
+        answer = QMessageBox.question(
+            self, "Bulk Decision",
+            f"Mark {len(pairs)} tiles as {self.bulk_decision_combo.currentText().lower()} "
+            f"for {mask_type}?")
+        if answer != QMessageBox.Yes:
+            return
+        self.review_pairs(pairs, decision)
+        self.grid_view.clearSelection()
+        
+    def review_pairs(self, pairs, decision):
+        """Record one decision for many pairs with one store batch and one UI refresh."""
+        mask_type = 'mask_veg' if self.mask_veg_radio.isChecked() else 'mask'
+        timestamp = datetime.now().isoformat()
+        self.review_store.record_many([
+            (pair_key(pair) + (mask_type,),
+             {'status': decision, 'timestamp': timestamp, 'mask_type': mask_type, 'notes': ''})
+            for pair in pairs
+        ])
+        for pair in pairs:
+            self.status_index.set_status(pair_key(pair), decision)
+            
+        current_pair = self.filtered_pairs[self.current_index] if self.filtered_pairs else None
+        if not self.show_reviewed_cb.isChecked() and decision != 'not_reviewed':
+            # Drop the reviewed pairs in one pass and continue at the first remaining
+            # tile at or after the current position
+            reviewed = {id(pair) for pair in pairs}
+            remaining = []
+            next_index = None
+            for i, pair in enumerate(self.filtered_pairs):
+                if id(pair) in reviewed:
+                    continue
+                if next_index is None and i >= self.current_index:
+                    next_index = len(remaining)
+                remaining.append(pair)
+            self.filtered_pairs = remaining
+            self.current_index = next_index if next_index is not None else max(len(remaining) - 1, 0)
             
-            # Define color map: value 0 = transparent, value 1 = white
-            color_list = [
-                QgsColorRampShader.ColorRampItem(0, QtCore.Qt.transparent, '0'),
-                QgsColorRampShader.ColorRampItem(1, QtCore.Qt.white, '1')
-            ]
+        self.update_status_counts()
+        if self.filtered_pairs:
+            if self.filtered_pairs[self.current_index] is not current_pair:
+                self.load_current_pair()
+            self.update_ui()
+        else:
+            self.clear_display()
+            self.status_label.setText("All pairs reviewed! Toggle 'Show Reviewed' to see them.")
+        self.update_goto_controls()
+        log.info("Recorded %s for %d tiles (%s)", decision, len(pairs), mask_type)
+        
+    def save_review_data(self):
+        """Bring review_log.csv up to date with every decision in the store."""
+        self.review_store.compact()
             
-            ramp_shader.setColorRampItemList(color_list)
-            shader.setRasterShaderFunction(ramp_shader)
-            renderer.setShader(shader)
+    def compact_review_log(self):
+        """Explicitly fold the journal (CSV) or export the database (SQLite) to review_log.csv."""
+        if self.review_store is None:
+            return
+        try:
+            self.save_review_data()
+        except TimeoutError as e:
+            self.iface.messageBar().pushMessage(
+                "Warning", f"Review log not compacted: {e}", level=Qgis.Warning, duration=5)
+            return
+        self.iface.messageBar().pushMessage(
+            "Success", f"Wrote review_log.csv ({len(self.review_data)} records)",
+            level=Qgis.Success, duration=3)
             
-            # Apply renderer to layer
-            mask_layer.setRenderer(renderer)
-            mask_layer.triggerRepaint()
+    def store_backend_changed(self):
+        """Sync the journal/compact controls with the selected backend."""
+        is_csv = self.store_combo.currentData() == 'csv'
+        self.journal_cb.setEnabled(is_csv)
+        self.compact_btn.setText("Compact Log" if is_csv else "Export CSV")
+        if self.review_store is not None:
+            self.status_label.setText("Reload triplets to switch the review store")
             
-        except Exception as e:
-            print(f"Error setting mask symbology: {e}")
\ No newline at end of file
+    def journal_mode_changed(self, enabled):
+        if isinstance(self.review_store, CsvReviewStore):
+            self.review_store.use_journal = enabled
@@ -57,6 +57,7 @@ class ImageMaskViewer:
         del self.toolbar
         
         if self.dock:
+            self.dock.shutdown()
             self.iface.removeDockWidget(self.dock)
 
     def run(self):
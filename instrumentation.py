@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Per-stage wall time for the review hot paths.
+
+StageTimings keeps the last TIMING_WINDOW durations of each stage and
+reports rolling p50 / p95 for the dock's Diagnostics panel, or exports
+them to JSON / CSV.  Stages are recorded from the GUI thread and from
+the scan task's worker, so recording takes a lock.  RenderCounter counts
+canvas renders per tile swap, which should be one.
+
+Logging goes through ``logging.getLogger(__name__)`` in every module;
+the package logger has a NullHandler (see __init__.py), so nothing is
+printed unless the dock or the command line attaches a handler.
+"""
+
+import csv
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+log = logging.getLogger(__name__)
+
+# (key, label) in the order the dock shows them
+STAGES = [
+    ('scan', "Scan"),
+    ('csv_load', "Review log load"),
+    ('status_merge', "Status merge"),
+    ('layer_construction', "Layer construction"),
+    ('renderer_setup', "Renderer setup"),
+    ('add_map_layer', "addMapLayer"),
+    ('zoom', "Zoom"),
+    ('canvas_render', "Canvas render"),
+]
+
+# Durations kept per stage for the rolling percentiles
+TIMING_WINDOW = 200
+
+SUMMARY_FIELDS = ['stage', 'count', 'last_ms', 'p50_ms', 'p95_ms', 'max_ms']
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted, non-empty sequence."""
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+class StageSpans:
+    """Sum several spans of the same stages and record each total once.
+
+    Used where one tile touches a stage several times (three layers,
+    streamed chunks) but should count as one sample.
+    """
+
+    def __init__(self, timings):
+        self.timings = timings
+        self.totals = {}
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[stage] = self.totals.get(stage, 0.0) + time.perf_counter() - start
+
+    def record(self):
+        for stage, seconds in self.totals.items():
+            self.timings.record(stage, seconds)
+        self.totals = {}
+
+
+class StageTimings:
+
+    def __init__(self, window=TIMING_WINDOW):
+        self.window = window
+        self.samples = {}  # stage -> deque of seconds
+        self.counts = {}  # stage -> samples recorded since the last reset
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self.lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+        log.debug("%s took %.1f ms", stage, seconds * 1000)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def spans(self):
+        return StageSpans(self)
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.counts = {}
+
+    def summary(self):
+        """Return one SUMMARY_FIELDS dict per recorded stage, in STAGES order."""
+        with self.lock:
+            snapshot = {stage: (sorted(samples), samples[-1], self.counts[stage])
+                        for stage, samples in self.samples.items() if samples}
+        order = [key for key, _ in STAGES]
+        rows = []
+        for stage in sorted(snapshot, key=lambda s: (order.index(s) if s in order else len(order), s)):
+            values, last, count = snapshot[stage]
+            rows.append({
+                'stage': stage,
+                'count': count,
+                'last_ms': last * 1000,
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000,
+                'max_ms': values[-1] * 1000,
+            })
+        return rows
+
+    def export(self, path, extra=None):
+        """Write the summary and the raw window to a .json file, or the summary to .csv.
+
+        ``extra`` is a dict of further top-level entries for the JSON file.
+        """
+        rows = self.summary()
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+                writer.writeheader()
+                writer.writerows(rows)
+            return
+        with self.lock:
+            samples = {stage: [round(s * 1000, 3) for s in values]
+                       for stage, values in self.samples.items()}
+        data = {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'window': self.window,
+                'stages': rows, 'samples_ms': samples}
+        data.update(extra or {})
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+class RenderCounter:
+    """Canvas renders between one tile swap and the next (GUI thread only).
+
+    Renders the reviewer causes by panning or zooming count towards the
+    tile they happen on, so the maximum is only meaningful for runs of
+    plain navigation.
+    """
+
+    def __init__(self, window=TIMING_WINDOW):
+        self.per_swap = deque(maxlen=window)
+        self.current = None  # renders since the last swap; None before the first
+        self.total = 0
+
+    def swap(self):
+        if self.current is not None:
+            self.per_swap.append(self.current)
+        self.current = 0
+
+    def render(self):
+        self.total += 1
+        if self.current is not None:
+            self.current += 1
+
+    def reset(self):
+        self.per_swap.clear()
+        self.current = None
+        self.total = 0
+
+    def summary(self):
+        counts = list(self.per_swap)
+        return {
+            'swaps': len(counts),
+            'renders': self.total,
+            'mean': sum(counts) / len(counts) if counts else None,
+            'max': max(counts) if counts else None,
+            'last': counts[-1] if counts else None,
+        }
+
+    def stats_text(self):
+        summary = self.summary()
+        if not summary['swaps']:
+            return "Renders per tile: n/a"
+        return (f"Renders per tile: last {summary['last']}, mean {summary['mean']:.2f}, "
+                f"max {summary['max']} over {summary['swaps']} tiles")
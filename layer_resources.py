@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Layer lifecycle, GDAL cache settings and memory tracking for the dock.
+
+LayerResources tracks every layer the dock creates until Qt destroys it,
+so the Diagnostics panel can show whether removed layers are really
+released.  It applies a GDAL block cache budget and decoding thread count
+for the session (restoring the previous values on shutdown) and samples
+the resident set size after each navigation; a rising trend over a long
+run is reported as a probable leak.
+
+RSS comes from psutil when it is installed, otherwise from
+/proc/self/statm (Linux); elsewhere it is not available.
+"""
+
+import logging
+import os
+from collections import deque
+
+from osgeo import gdal
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_GDAL_CACHE_MB = 256
+
+# 0 leaves GDAL_NUM_THREADS unset; QGIS renders layers in parallel already
+DEFAULT_GDAL_THREADS = 2
+
+# Navigations kept for the memory trend, and how many are needed before judging it
+MEMORY_WINDOW = 500
+MEMORY_MIN_SAMPLES = 200
+
+# Growth per navigation above which memory is not considered flat
+LEAK_BYTES_PER_NAVIGATION = 256 * 1024
+
+
+def current_rss():
+    """Return the resident set size of this process in bytes, or None."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def slope(points):
+    """Least-squares slope of ``(x, y)`` points."""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+class LayerResources:
+
+    def __init__(self):
+        self.live = {}  # layer id -> layer name, until the layer is destroyed
+        self.created = 0
+        self.navigations = 0
+        self.memory = deque(maxlen=MEMORY_WINDOW)  # (navigation, rss bytes)
+        self.leak_reported = False
+        self.saved_gdal = None  # (cache bytes, GDAL_NUM_THREADS) before apply_gdal_settings
+
+    def track(self, layer):
+        """Own a layer the dock created; it counts as live until Qt destroys it."""
+        layer_id = layer.id()
+        if layer_id in self.live:
+            return layer
+        self.live[layer_id] = layer.name()
+        self.created += 1
+        layer.destroyed.connect(lambda _=None, layer_id=layer_id: self.live.pop(layer_id, None))
+        return layer
+
+    def track_triplet(self, layers):
+        for layer in layers.values():
+            self.track(layer)
+        return layers
+
+    def release(self, project, layers):
+        """Remove layers from the project, which deletes the layers it owns."""
+        for layer in layers:
+            try:
+                if layer is not None and project.mapLayer(layer.id()):
+                    project.removeMapLayer(layer.id())
+            except RuntimeError:
+                pass  # Already deleted
+
+    def apply_gdal_settings(self, cache_mb, threads):
+        """Set the GDAL block cache budget and decoding threads for this session."""
+        if self.saved_gdal is None:
+            self.saved_gdal = (gdal.GetCacheMax(), gdal.GetConfigOption('GDAL_NUM_THREADS'))
+        gdal.SetCacheMax(cache_mb * 1024 * 1024)
+        gdal.SetConfigOption('GDAL_NUM_THREADS', str(threads) if threads else None)
+        log.info("GDAL block cache %d MB, %s decoding threads", cache_mb, threads or "default")
+
+    def restore_gdal_settings(self):
+        if self.saved_gdal is None:
+            return
+        cache_max, threads = self.saved_gdal
+        gdal.SetCacheMax(cache_max)
+        gdal.SetConfigOption('GDAL_NUM_THREADS', threads)
+        self.saved_gdal = None
+
+    def record_navigation(self):
+        """Sample RSS after a navigation; returns True once when growth looks like a leak."""
+        self.navigations += 1
+        rss = current_rss()
+        if rss is None:
+            return False
+        self.memory.append((self.navigations, rss))
+        if self.leak_reported or len(self.memory) < MEMORY_MIN_SAMPLES:
+            return False
+        if self.growth() > LEAK_BYTES_PER_NAVIGATION:
+            self.leak_reported = True
+            log.warning("Memory grows by %.0f KB per navigation over the last %d tiles",
+                        self.growth() / 1024, len(self.memory))
+            return True
+        return False
+
+    def growth(self):
+        """Bytes of RSS growth per navigation over the sampled window."""
+        return slope(self.memory) if len(self.memory) > 1 else 0.0
+
+    def reset_memory(self):
+        self.memory.clear()
+        self.leak_reported = False
+
+    def stats_text(self):
+        rss = self.memory[-1][1] if self.memory else current_rss()
+        rss_text = f"{rss / 2 ** 20:.0f} MB" if rss is not None else "n/a"
+        text = (f"Layers: {len(self.live)} live / {self.created} created | RSS: {rss_text} | "
+                f"GDAL cache: {gdal.GetCacheUsed() / 2 ** 20:.0f} / {gdal.GetCacheMax() / 2 ** 20:.0f} MB")
+        if len(self.memory) >= MEMORY_MIN_SAMPLES:
+            text += f" | Growth: {self.growth() / 1024:+.0f} KB/navigation"
+        return text
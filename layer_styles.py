@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Renderer templates for the review layers.
+
+The mask pseudocolor stack (color ramp shader, raster shader, renderer)
+and the 4-3-2 image renderer are built once per session and cloned onto
+each new layer.  Renderers are applied before a layer is added to the
+project, so a tile is drawn once with its final style instead of being
+repainted after every change.  An image can be given a cached stretch
+(see band_stretch.py), which is set as the renderer's contrast
+enhancement so QGIS has no statistics to compute for it.
+"""
+
+import logging
+
+from qgis.PyQt.QtCore import Qt
+from qgis.core import (QgsColorRampShader, QgsContrastEnhancement, QgsMultiBandColorRenderer,
+                       QgsRasterShader, QgsSingleBandPseudoColorRenderer)
+
+
+log = logging.getLogger(__name__)
+
+# False color infrared for imagery with four or more bands
+IMAGE_BANDS = (4, 3, 2)
+
+MASK_OPACITY = 0.6
+
+
+class RendererTemplates:
+    """Session-wide renderers, cloned onto each layer by style_image / style_mask."""
+
+    def __init__(self, mask_opacity=MASK_OPACITY, image_bands=IMAGE_BANDS):
+        self.mask_opacity = mask_opacity
+        self.image_bands = image_bands
+        self.image_template = QgsMultiBandColorRenderer(None, *image_bands)
+        self.mask_template = self._build_mask_renderer()
+
+    @staticmethod
+    def _build_mask_renderer():
+        """Value 1 as white, value 0 transparent."""
+        ramp_shader = QgsColorRampShader()
+        ramp_shader.setColorRampType(QgsColorRampShader.Discrete)
+        ramp_shader.setColorRampItemList([
+            QgsColorRampShader.ColorRampItem(0, Qt.transparent, '0'),
+            QgsColorRampShader.ColorRampItem(1, Qt.white, '1')
+        ])
+        shader = QgsRasterShader()
+        shader.setRasterShaderFunction(ramp_shader)
+        renderer = QgsSingleBandPseudoColorRenderer(None, 1)
+        renderer.setShader(shader)
+        return renderer
+
+    def uses_template(self, image_layer):
+        """Return True when an image layer renders with the 4-3-2 template bands."""
+        renderer = image_layer.renderer()
+        return (isinstance(renderer, QgsMultiBandColorRenderer)
+                and renderer.redBand() == self.image_bands[0])
+
+    def style_image(self, image_layer, stretch=None):
+        """Switch images with enough bands to the 4-3-2 renderer.
+
+        ``stretch`` is a band_stretch dict for the template bands; its
+        low / high values become min-max contrast enhancements.
+        """
+        if image_layer.bandCount() < max(self.image_bands):
+            return
+        try:
+            renderer = self.image_template.clone()
+            if stretch is not None and stretch['bands'] == list(self.image_bands):
+                provider = image_layer.dataProvider()
+                setters = (renderer.setRedContrastEnhancement,
+                           renderer.setGreenContrastEnhancement,
+                           renderer.setBlueContrastEnhancement)
+                for setter, band, low, high in zip(setters, stretch['bands'],
+                                                   stretch['low'], stretch['high']):
+                    enhancement = QgsContrastEnhancement(provider.dataType(band))
+                    enhancement.setContrastEnhancementAlgorithm(
+                        QgsContrastEnhancement.StretchToMinimumMaximum)
+                    enhancement.setMinimumValue(low)
+                    enhancement.setMaximumValue(high)
+                    setter(enhancement)
+            # setRenderer connects the clone to this layer's provider
+            image_layer.setRenderer(renderer)
+        except Exception as e:
+            log.warning("Error setting band order: %s", e)
+
+    def style_mask(self, mask_layer):
+        try:
+            mask_layer.setRenderer(self.mask_template.clone())
+        except Exception as e:
+            log.warning("Error setting mask symbology: %s", e)
+        mask_layer.setOpacity(self.mask_opacity)
+
+    def style_triplet(self, layers, stretch=None):
+        """Style the valid layers of a ``{role: layer}`` triplet."""
+        if layers['image'].isValid():
+            self.style_image(layers['image'], stretch)
+        for role in ('mask', 'mask_veg'):
+            if layers[role].isValid():
+                self.style_mask(layers[role])
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Per-mask statistics and mask / mask_veg agreement used to order and
+filter the review queue.
+
+compute_mask_stats and compute_pair_stats run inside worker processes
+started by process_pool, so this module only depends on GDAL and NumPy
+(SciPy when available) and never on Qt or QGIS.  Rasters are read in
+strips of whole rows, which keeps memory bounded on large masks.
+
+Results are cached in ``mask_stats.json`` and ``mask_agreement.json`` in
+the output directory and invalidated by file mtime.
+"""
+
+import json
+import logging
+import math
+import os
+
+import numpy as np
+from osgeo import gdal, ogr
+
+log = logging.getLogger(__name__)
+
+try:
+    from scipy import ndimage
+except ImportError:
+    ndimage = None
+
+
+STATS_CACHE_NAME = 'mask_stats.json'
+AGREEMENT_CACHE_NAME = 'mask_agreement.json'
+STATS_CACHE_VERSION = 1
+
+# Stored per file after the mtime, in this order
+STATS_FIELDS = ['foreground', 'components', 'nodata']
+
+# Stored per mask / mask_veg pair after both mtimes; bbox is
+# [xmin, ymin, xmax, ymax] in raster coordinates or None
+AGREEMENT_FIELDS = ['iou', 'disagreement', 'disagreement_fraction', 'bbox']
+
+# Used by QGIS for rasters without a geotransform: pixel units from the top-left
+# corner, map y pointing up, so rows run down into negative y
+UNGEOREFERENCED_TRANSFORM = (0.0, 1.0, 0.0, 0.0, 0.0, -1.0)
+
+# Pixels read per strip; whole rows are always read
+STRIP_PIXELS = 16 * 1024 * 1024
+
+
+def strip_rows(band):
+    """Return the number of rows per strip, a multiple of the block height."""
+    block_rows = band.GetBlockSize()[1] or 1
+    # Read whole blocks per strip so GDAL does not decode a block twice
+    return max(STRIP_PIXELS // max(band.XSize, 1) // block_rows, 1) * block_rows
+
+
+def iter_strips(band, rows=None):
+    """Yield ``(row, array)`` strips of whole rows covering the band."""
+    width, height = band.XSize, band.YSize
+    rows = rows or strip_rows(band)
+    for row in range(0, height, rows):
+        yield row, band.ReadAsArray(0, row, width, min(rows, height - row))
+
+
+class ComponentCounter:
+    """Count 4-connected foreground components strip by strip.
+
+    Each strip is labelled with scipy.ndimage; labels touching across a
+    strip boundary are merged with a union-find, so only one strip and
+    the last row of the previous one are held in memory.
+    """
+
+    def __init__(self):
+        self.labels = 0
+        self.merges = 0
+        self.parent = {}
+        self.last_row = None
+
+    def _find(self, label):
+        parent = self.parent
+        while parent.get(label, label) != label:
+            parent[label] = parent.get(parent[label], parent[label])
+            label = parent[label]
+        return label
+
+    def add_strip(self, foreground):
+        labels, count = ndimage.label(foreground)
+        if count and self.last_row is not None:
+            touching = (self.last_row > 0) & (labels[0] > 0)
+            if touching.any():
+                pairs = np.unique(np.stack([self.last_row[touching],
+                                            labels[0][touching] + self.labels], axis=1), axis=0)
+                for above, below in pairs.tolist():
+                    above, below = self._find(above), self._find(below)
+                    if above != below:
+                        self.parent[below] = above
+                        self.merges += 1
+        last = labels[-1]
+        self.last_row = np.where(last > 0, last + self.labels, 0)
+        self.labels += count
+
+    @property
+    def count(self):
+        return self.labels - self.merges
+
+
+def polygonize_components(band):
+    """Count foreground components with GDAL when SciPy is not available."""
+    source = ogr.GetDriverByName('Memory').CreateDataSource('')
+    layer = source.CreateLayer('components')
+    layer.CreateField(ogr.FieldDefn('value', ogr.OFTInteger))
+    # The mask band leaves nodata pixels out; remaining polygons of value 0 are background
+    gdal.Polygonize(band, band.GetMaskBand(), layer, 0)
+    return sum(1 for feature in layer if feature.GetField(0) != 0)
+
+
+class MaskAccumulator:
+    """Accumulate the statistics of one mask band over its strips."""
+
+    def __init__(self, band):
+        self.band = band
+        self.nodata = band.GetNoDataValue()
+        self.total = band.XSize * band.YSize
+        self.foreground = 0
+        self.nodata_count = 0
+        self.counter = ComponentCounter() if ndimage is not None else None
+
+    def add(self, strip):
+        """Account for one strip and return its foreground (valid, non-zero) pixels."""
+        mask = strip != 0
+        if self.nodata is not None:
+            invalid = np.isnan(strip) if math.isnan(self.nodata) else strip == self.nodata
+            self.nodata_count += int(np.count_nonzero(invalid))
+            mask &= ~invalid
+        self.foreground += int(np.count_nonzero(mask))
+        if self.counter is not None:
+            self.counter.add_strip(mask)
+        return mask
+
+    def stats(self):
+        components = (self.counter.count if self.counter is not None
+                      else polygonize_components(self.band))
+        valid = self.total - self.nodata_count
+        return {
+            'foreground': self.foreground / valid if valid else 0.0,
+            'components': components,
+            'nodata': self.nodata_count / self.total if self.total else 0.0,
+        }
+
+
+def compute_mask_stats(path):
+    """Compute statistics for one mask raster (band 1).
+
+    Returns ``(mtime_ns, stats)`` where stats holds the foreground
+    fraction of valid pixels (non-zero values), the number of
+    4-connected foreground components and the nodata fraction.
+    """
+    gdal.UseExceptions()
+    mtime_ns = os.stat(path).st_mtime_ns
+    dataset = gdal.Open(path, gdal.GA_ReadOnly)
+    accumulator = MaskAccumulator(dataset.GetRasterBand(1))
+    for _, strip in iter_strips(accumulator.band):
+        accumulator.add(strip)
+    return mtime_ns, accumulator.stats()
+
+
+def pixel_bbox_to_raster(dataset, bbox):
+    """Convert a ``(col_min, row_min, col_max, row_max)`` pixel box to raster coordinates."""
+    transform = dataset.GetGeoTransform(can_return_null=True) or UNGEOREFERENCED_TRANSFORM
+    col_min, row_min, col_max, row_max = bbox
+    xs, ys = [], []
+    for col, row in ((col_min, row_min), (col_max + 1, row_min),
+                     (col_min, row_max + 1), (col_max + 1, row_max + 1)):
+        xs.append(transform[0] + col * transform[1] + row * transform[2])
+        ys.append(transform[3] + col * transform[4] + row * transform[5])
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def compute_pair_stats(job):
+    """Compute both masks' statistics and their agreement in one read pass.
+
+    ``job`` is ``(mask_path, mask_veg_path)``; the rasters must have the
+    same size.  Both are read in the same strips, so memory stays bounded
+    on 10k x 10k rasters.  Returns a dict with ``'mask'`` and
+    ``'mask_veg'`` set to ``(mtime_ns, stats)`` like compute_mask_stats,
+    and ``'agreement'`` set to ``([mask_mtime_ns, mask_veg_mtime_ns],
+    metrics)``: the IoU of the foregrounds (1.0 when both are empty), the
+    number and fraction of pixels where exactly one mask is foreground,
+    and the bounding box of those pixels in raster coordinates.
+    """
+    gdal.UseExceptions()
+    mask_path, mask_veg_path = job
+    mtimes = [os.stat(mask_path).st_mtime_ns, os.stat(mask_veg_path).st_mtime_ns]
+    mask_dataset = gdal.Open(mask_path, gdal.GA_ReadOnly)
+    veg_dataset = gdal.Open(mask_veg_path, gdal.GA_ReadOnly)
+    size = (mask_dataset.RasterXSize, mask_dataset.RasterYSize)
+    if size != (veg_dataset.RasterXSize, veg_dataset.RasterYSize):
+        raise ValueError(f"mask is {size[0]}x{size[1]} but mask_veg is "
+                         f"{veg_dataset.RasterXSize}x{veg_dataset.RasterYSize}")
+
+    mask = MaskAccumulator(mask_dataset.GetRasterBand(1))
+    veg = MaskAccumulator(veg_dataset.GetRasterBand(1))
+    rows = strip_rows(mask.band)
+    intersection = union = 0
+    col_min = row_min = None
+    col_max = row_max = -1
+    for (row, mask_strip), (_, veg_strip) in zip(iter_strips(mask.band, rows),
+                                                 iter_strips(veg.band, rows)):
+        mask_fg = mask.add(mask_strip)
+        veg_fg = veg.add(veg_strip)
+        intersection += int(np.count_nonzero(mask_fg & veg_fg))
+        union += int(np.count_nonzero(mask_fg | veg_fg))
+        differs = mask_fg ^ veg_fg
+        differing_rows = np.flatnonzero(differs.any(axis=1))
+        if differing_rows.size:
+            differing_cols = np.flatnonzero(differs.any(axis=0))
+            if row_min is None:
+                row_min = row + int(differing_rows[0])
+            row_max = row + int(differing_rows[-1])
+            col_min = int(differing_cols[0]) if col_min is None else min(col_min, int(differing_cols[0]))
+            col_max = max(col_max, int(differing_cols[-1]))
+
+    disagreement = union - intersection
+    bbox = None
+    if row_min is not None:
+        bbox = pixel_bbox_to_raster(mask_dataset, (col_min, row_min, col_max, row_max))
+    total = size[0] * size[1]
+    return {
+        'mask': (mtimes[0], mask.stats()),
+        'mask_veg': (mtimes[1], veg.stats()),
+        'agreement': (mtimes, {
+            'iou': intersection / union if union else 1.0,
+            'disagreement': disagreement,
+            'disagreement_fraction': disagreement / total if total else 0.0,
+            'bbox': bbox,
+        }),
+    }
+
+
+def pair_jobs(pairs):
+    """Expand pairs into compute_pair_stats jobs."""
+    return [(pair['mask_path'], pair['mask_veg_path']) for pair in pairs]
+
+
+def stale_pair_jobs(jobs, stats_cache, agreement_cache, is_canceled=None):
+    """Return the jobs whose mask, mask_veg or agreement entry is out of date."""
+    stale = []
+    for job in jobs:
+        if is_canceled is not None and is_canceled():
+            break
+        if not (stats_cache.is_fresh(job[0]) and stats_cache.is_fresh(job[1])
+                and agreement_cache.is_fresh(job)):
+            stale.append(job)
+    return stale
+
+
+def file_stamp(item):
+    """Return the mtime of a path, or the list of mtimes of a tuple of paths."""
+    if isinstance(item, str):
+        return os.stat(item).st_mtime_ns
+    return [os.stat(path).st_mtime_ns for path in item]
+
+
+class MaskStatsCache:
+    """mtime-validated statistics per raster path, persisted as JSON.
+
+    Entries are keyed by the first path of their item: a mask path for
+    per-file statistics, or the mask path of a ``(mask_path,
+    mask_veg_path)`` job for agreement metrics, stamped with both mtimes.
+    They are grouped by directory on disk so millions of tiles do not
+    repeat their directory path.
+    """
+
+    def __init__(self, output_dir, name=STATS_CACHE_NAME, fields=STATS_FIELDS):
+        self.path = os.path.join(output_dir, name)
+        self.fields = fields
+        self.entries = {}  # path -> [stamp, *values of fields]
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        self.entries = {}
+        self.dirty = False
+        if not os.path.exists(self.path):
+            return self
+        try:
+            with open(self.path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable mask statistics cache: %s", e)
+            return self
+        if cache.get('version') != STATS_CACHE_VERSION or cache.get('fields') != self.fields:
+            return self
+        for directory, files in cache['files'].items():
+            prefix = os.path.join(directory, '')
+            for name, entry in files.items():
+                self.entries[prefix + name] = entry
+        return self
+
+    def save(self):
+        if not self.dirty:
+            return
+        files = {}
+        for path, entry in self.entries.items():
+            directory, name = os.path.split(path)
+            files.setdefault(directory, {})[name] = entry
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': STATS_CACHE_VERSION, 'fields': self.fields, 'files': files},
+                      f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def get(self, path):
+        """Return the cached stats dict for a path, or None."""
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        return dict(zip(self.fields, entry[1:]))
+
+    def value(self, path, field):
+        """Return one cached statistic for a path, or None."""
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        return entry[self.fields.index(field) + 1]
+
+    def update(self, item, stamp, stats):
+        key = item if isinstance(item, str) else item[0]
+        self.entries[key] = [stamp] + [stats[field] for field in self.fields]
+        self.dirty = True
+
+    def is_fresh(self, item):
+        """Return True if the item has an entry for its current mtime(s)."""
+        entry = self.entries.get(item if isinstance(item, str) else item[0])
+        try:
+            return entry is not None and entry[0] == file_stamp(item)
+        except FileNotFoundError:
+            return True  # Nothing to compute for a file that is gone
+
+    def stale_items(self, items, is_canceled=None):
+        """Return the paths or path tuples without an entry for their current mtime."""
+        stale = []
+        for item in items:
+            if is_canceled is not None and is_canceled():
+                break
+            if not self.is_fresh(item):
+                stale.append(item)
+        return stale
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Overview (pyramid) building for image and mask rasters.
+
+The functions here run inside worker processes started by process_pool,
+so they only depend on GDAL and never on Qt or QGIS.
+"""
+
+import os
+
+from osgeo import gdal
+
+
+# Stop adding levels once the smallest overview side drops below this
+MIN_OVERVIEW_SIZE = 256
+
+# Marker next to a raster while its overviews are written; a worker killed
+# half way leaves it behind, so the raster is built again next time
+BUILDING_SUFFIX = '.ovr.building'
+
+
+def overview_levels(width, height):
+    """Return decimation factors 2, 4, 8, ... down to MIN_OVERVIEW_SIZE."""
+    levels = []
+    factor = 2
+    while min(width, height) // factor >= MIN_OVERVIEW_SIZE:
+        levels.append(factor)
+        factor *= 2
+    return levels
+
+
+def has_overviews(path):
+    """Return True if the raster already has complete external or internal overviews."""
+    if os.path.exists(path + BUILDING_SUFFIX):
+        return False
+    if os.path.exists(path + '.ovr'):
+        return True
+    dataset = gdal.Open(path, gdal.GA_ReadOnly)
+    if dataset is None:
+        return False
+    return dataset.RasterCount > 0 and dataset.GetRasterBand(1).GetOverviewCount() > 0
+
+
+def build_overviews(job):
+    """Build overviews for one raster.
+
+    ``job`` is ``(path, internal, categorical)``.  Masks are categorical and
+    use nearest neighbour resampling; images use averaging.  Returns
+    ``'skipped'`` when overviews already exist, ``'built'`` or ``'small'``
+    when the raster does not need any.
+    """
+    path, internal, categorical = job
+    gdal.UseExceptions()
+    if has_overviews(path):
+        return 'skipped'
+    marker = path + BUILDING_SUFFIX
+    if os.path.exists(marker) and os.path.exists(path + '.ovr'):
+        os.remove(path + '.ovr')  # Half written by an interrupted build
+    gdal.SetConfigOption('COMPRESS_OVERVIEW', 'DEFLATE')
+    # Read-only datasets get an external .ovr; update mode writes into the file
+    dataset = gdal.Open(path, gdal.GA_Update if internal else gdal.GA_ReadOnly)
+    levels = overview_levels(dataset.RasterXSize, dataset.RasterYSize)
+    if not levels:
+        return 'small'
+    open(marker, 'w').close()
+    dataset.BuildOverviews('NEAREST' if categorical else 'AVERAGE', levels)
+    dataset = None  # Flush to disk
+    os.remove(marker)
+    return 'built'
+
+
+def overview_jobs(pairs, internal=False):
+    """Expand pairs into build_overviews jobs, images first within each pair."""
+    jobs = []
+    for pair in pairs:
+        jobs.append((pair['image_path'], internal, False))
+        jobs.append((pair['mask_path'], internal, True))
+        jobs.append((pair['mask_veg_path'], internal, True))
+    return jobs
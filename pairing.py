@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Image / mask / mask_veg triplet matching.
+
+Each directory is listed exactly once with ``os.scandir`` and indexed by
+base name and extension, so matching is a hash join over the listings
+and never touches individual files.
+
+In recursive mode (walk_trees) the three trees are listed by a bounded
+thread pool, one scandir per directory, and files are named by their
+``/``-separated path relative to the tree root.  Images and masks in
+mirrored trees (``region/zoom/x/y.tif`` and
+``region/zoom/x/y_rf_classified.tif``) then match on relative path plus
+suffix with the same join.  On network filesystems a directory listing
+is mostly waiting for the server, so several listings in flight walk a
+deep tree much faster than one after the other.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+log = logging.getLogger(__name__)
+
+
+IMAGE_EXTENSIONS = ['.tif', '.tiff', '.jpg', '.jpeg', '.png', '.bmp']
+
+# Mask extensions tried after the image's own extension, in order of preference
+FALLBACK_MASK_EXTENSIONS = ['.tif', '.png']
+
+# Directories listed concurrently by walk_trees
+DEFAULT_WALK_WORKERS = 8
+
+
+def iter_directory(directory):
+    """Yield the names of all non-directory entries as the directory is read."""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # d_type answers is_dir() without a stat call on local and most network filesystems
+            if not entry.is_dir(follow_symlinks=False):
+                yield entry.name
+
+
+def list_directory(directory):
+    """Return the names of all non-directory entries in a directory."""
+    return list(iter_directory(directory))
+
+
+def scan_entries(directory, prefix):
+    """List one directory of a walk as ``(file paths, subdirectory paths)``.
+
+    Paths are relative to the walk root, built by prepending prefix.
+    Symlinked directories are not followed.
+    """
+    files = []
+    subdirectories = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(prefix + entry.name + '/')
+            else:
+                files.append(prefix + entry.name)
+    return files, subdirectories
+
+
+def walk_trees(roots, workers=DEFAULT_WALK_WORKERS, stats=None, is_canceled=None):
+    """List the files under several directory trees with a bounded thread pool.
+
+    Returns one list per root of ``/``-separated paths relative to it,
+    in no particular order.  A root that cannot be listed raises;
+    unreadable subdirectories are logged and skipped.  When stats is a
+    dict it receives ``directories``, ``files`` and ``seconds``.
+    """
+    start = time.perf_counter()
+    listings = [[] for _ in roots]
+    directories = 0
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        pending = {}  # future -> (root index, relative directory)
+        for i, root in enumerate(roots):
+            pending[pool.submit(scan_entries, root, '')] = (i, '')
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, relative = pending.pop(future)
+                try:
+                    files, subdirectories = future.result()
+                except OSError as e:
+                    if not relative:
+                        raise
+                    log.warning("Skipping %s: %s", os.path.join(roots[i], relative), e)
+                    continue
+                directories += 1
+                listings[i].extend(files)
+                for subdirectory in subdirectories:
+                    child = pool.submit(scan_entries, os.path.join(roots[i], subdirectory),
+                                        subdirectory)
+                    pending[child] = (i, subdirectory)
+            if is_canceled is not None and is_canceled():
+                for future in pending:
+                    future.cancel()
+                break
+
+    seconds = time.perf_counter() - start
+    files = sum(len(listing) for listing in listings)
+    log.info("Walked %d directories (%d files) in %.2f s, %.0f directories/s with %d workers",
+             directories, files, seconds, directories / seconds if seconds else 0.0, workers)
+    if stats is not None:
+        stats.update({'directories': directories, 'files': files, 'seconds': seconds})
+    return listings
+
+
+def is_image_file(name, mask_suffix, mask_veg_suffix):
+    """Return True for image files that are not masks themselves.
+
+    name may be a relative path from a recursive walk; only its final
+    component is checked for the mask suffixes.
+    """
+    lower = name.lower()
+    base = os.path.basename(name)
+    return (any(lower.endswith(ext) for ext in IMAGE_EXTENSIONS)
+            and mask_suffix not in base
+            and mask_veg_suffix not in base)
+
+
+def index_masks(names, suffix):
+    """Index mask file names as {base_name: {lower-case extension: file_name}}."""
+    index = {}
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if stem.endswith(suffix):
+            base_name = stem[:len(stem) - len(suffix)]
+            index.setdefault(base_name, {})[ext.lower()] = name
+    return index
+
+
+def match_mask(index, base_name, ext):
+    """Return the preferred mask file for an image: same extension, then .tif, then .png.
+
+    Extensions compare case-insensitively, so ``tile.TIF`` pairs with
+    ``tile_rf_classified.tif`` as it does on Windows and macOS.
+    """
+    candidates = index.get(base_name)
+    if not candidates:
+        return None
+    for candidate_ext in [ext.lower()] + FALLBACK_MASK_EXTENSIONS:
+        if candidate_ext in candidates:
+            return candidates[candidate_ext]
+    return None
+
+
+def mask_base_name(name, suffix):
+    """Return the image base name a mask file belongs to, or None."""
+    stem = os.path.splitext(name)[0]
+    if not stem.endswith(suffix):
+        return None
+    return stem[:len(stem) - len(suffix)]
+
+
+def match_triplets(image_names, mask_names, mask_veg_names, mask_suffix, mask_veg_suffix,
+                   on_chunk=None, chunk_size=1000, is_canceled=None):
+    """Join three directory listings into triplets of file names.
+
+    Returns ``(triplets, incomplete)``: ``(image_file, mask_file,
+    mask_veg_file)`` tuples sorted by image file, and the image files that
+    are missing a mask or mask_veg.
+
+    image_names may be a lazy iterable such as iter_directory().  When
+    on_chunk is given it receives lists of up to chunk_size triplets in
+    discovery order while the images are still being read; is_canceled is
+    polled between chunks and stops the join early.
+    """
+    mask_index = index_masks(mask_names, mask_suffix)
+    mask_veg_index = index_masks(mask_veg_names, mask_veg_suffix)
+
+    triplets = []
+    incomplete = []
+    chunk = []
+    for image_file in image_names:
+        if not is_image_file(image_file, mask_suffix, mask_veg_suffix):
+            continue
+        base_name, ext = os.path.splitext(image_file)
+        mask_file = match_mask(mask_index, base_name, ext)
+        mask_veg_file = match_mask(mask_veg_index, base_name, ext)
+
+        # Only add if we have both mask and mask_veg
+        if mask_file and mask_veg_file:
+            triplet = (image_file, mask_file, mask_veg_file)
+            triplets.append(triplet)
+            if on_chunk is not None:
+                chunk.append(triplet)
+                if len(chunk) >= chunk_size:
+                    on_chunk(chunk)
+                    chunk = []
+                    if is_canceled is not None and is_canceled():
+                        break
+        else:
+            incomplete.append(image_file)
+    if chunk:
+        on_chunk(chunk)
+
+    triplets.sort()
+    incomplete.sort()
+    return triplets, incomplete
+
+
+def match_pairs(image_names, mask_names, mask_suffix):
+    """Join an image and a mask listing into ``(image_file, mask_file)`` tuples.
+
+    Used by the single-mask dialog; mask_file is None for images without a
+    mask.  Files containing the mask suffix are not treated as images.
+    """
+    mask_index = index_masks(mask_names, mask_suffix)
+    pairs = []
+    for image_file in image_names:
+        lower = image_file.lower()
+        if not any(lower.endswith(ext) for ext in IMAGE_EXTENSIONS):
+            continue
+        if mask_suffix and mask_suffix in os.path.basename(image_file):
+            continue
+        base_name, ext = os.path.splitext(image_file)
+        pairs.append((image_file, match_mask(mask_index, base_name, ext)))
+    pairs.sort()
+    return pairs
+
+
+def make_pairs(image_dir, mask_dir, mask_veg_dir, triplets):
+    """Build the dock's pair dicts from triplets of file names."""
+    image_prefix = os.path.join(image_dir, '')
+    mask_prefix = os.path.join(mask_dir, '')
+    mask_veg_prefix = os.path.join(mask_veg_dir, '')
+    return [{
+        'image_path': image_prefix + image_file,
+        'mask_path': mask_prefix + mask_file,
+        'mask_veg_path': mask_veg_prefix + mask_veg_file,
+        'image_file': image_file,
+        'mask_file': mask_file,
+        'mask_veg_file': mask_veg_file,
+        'status': 'not_reviewed'  # Will be updated later
+    } for image_file, mask_file, mask_veg_file in triplets]
+
+
+def find_triplets(image_dir, mask_dir, mask_veg_dir, mask_suffix, mask_veg_suffix,
+                  on_chunk=None, is_canceled=None, recursive=False,
+                  workers=DEFAULT_WALK_WORKERS, walk_stats=None):
+    """Match images with their mask and mask_veg files.
+
+    Returns ``(pairs, incomplete)`` where pairs is a list of pair dicts
+    sorted by image file name and incomplete lists the image files that
+    are missing a mask or mask_veg.  The mask directories are indexed
+    first; the image directory is then streamed through match_triplets.
+    With recursive, the three trees are walked by walk_trees first and
+    file names are paths relative to each tree.
+    """
+    if recursive:
+        image_names, mask_names, mask_veg_names = walk_trees(
+            [image_dir, mask_dir, mask_veg_dir], workers, walk_stats, is_canceled)
+    else:
+        image_names = iter_directory(image_dir)
+        mask_names = list_directory(mask_dir)
+        mask_veg_names = list_directory(mask_veg_dir)
+    triplets, incomplete = match_triplets(
+        image_names, mask_names, mask_veg_names, mask_suffix, mask_veg_suffix,
+        on_chunk=on_chunk, is_canceled=is_canceled)
+    return make_pairs(image_dir, mask_dir, mask_veg_dir, triplets), incomplete
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+QgsTask that drives a process pool over a list of work items.
+"""
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsTask
+
+from .process_pool import map_unordered
+
+
+class ProcessPoolTask(QgsTask):
+    """Run ``func(item)`` for every item in worker processes.
+
+    ``itemFinished(item, result)`` is emitted as each item completes and is
+    delivered on the GUI thread, so the dock can use results while the pass
+    is still running.
+
+    ``items`` may also be a callable taking ``is_canceled`` and returning
+    the items; it is called on the task thread, which suits freshness
+    checks that stat every file.
+    """
+
+    itemFinished = pyqtSignal(object, object)
+
+    def __init__(self, description, func, items, max_workers=None, on_finished=None):
+        super(ProcessPoolTask, self).__init__(description, QgsTask.CanCancel)
+        self.func = func
+        self.items = items if callable(items) else list(items)
+        self.max_workers = max_workers
+        self.on_finished = on_finished
+        self.completed = 0
+        self.error = None
+
+    def run(self):
+        if callable(self.items):
+            self.items = list(self.items(self.isCanceled))
+        total = len(self.items)
+        if not total:
+            return True
+        try:
+            for item, result in map_unordered(self.func, self.items, self.max_workers,
+                                              is_canceled=self.isCanceled):
+                self.completed += 1
+                self.itemFinished.emit(item, result)
+                self.setProgress(100.0 * self.completed / total)
+        except Exception as e:
+            self.error = e
+            return False
+        return not self.isCanceled()
+
+    def finished(self, result):
+        if self.on_finished is not None:
+            self.on_finished(self, result)
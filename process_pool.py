@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Process pool helpers for CPU/IO heavy passes over the dataset.
+
+Inside QGIS ``sys.executable`` is the QGIS binary, so worker processes are
+spawned with an explicit Python interpreter.  Worker functions must live
+in Qt-free modules of this package so the children can import them.
+"""
+
+import multiprocessing
+import os
+import shutil
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+def default_workers():
+    """Leave one core for QGIS itself."""
+    return max((os.cpu_count() or 2) - 1, 1)
+
+
+def python_executable():
+    """Return a Python interpreter suitable for spawning worker processes."""
+    executable = sys.executable or ''
+    if os.path.basename(executable).lower().startswith('python'):
+        return executable
+    names = ['python.exe', 'python3.exe'] if os.name == 'nt' else ['python3', 'python']
+    for folder in [sys.exec_prefix, os.path.join(sys.exec_prefix, 'bin')]:
+        for name in names:
+            candidate = os.path.join(folder, name)
+            if os.path.isfile(candidate):
+                return candidate
+    return shutil.which('python3') or shutil.which('python') or executable
+
+
+def create_process_pool(max_workers=None):
+    """Create a spawn-based ProcessPoolExecutor that works from inside QGIS."""
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(python_executable())
+    return ProcessPoolExecutor(max_workers=max_workers or default_workers(), mp_context=context)
+
+
+def map_unordered(func, items, max_workers=None, is_canceled=None):
+    """Yield ``(item, result)`` as workers finish, keeping a bounded number in flight.
+
+    ``is_canceled`` is polled between completions; once it returns True the
+    queued work is dropped and iteration stops.  Exceptions raised by func
+    are yielded as the result so one bad file does not stop the pass.
+    """
+    workers = max_workers or default_workers()
+    items = iter(items)
+    pending = {}
+    with create_process_pool(workers) as pool:
+        try:
+            for item in items:
+                pending[pool.submit(func, item)] = item
+                if len(pending) >= workers * 4:
+                    break
+            while pending:
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                if is_canceled is not None and is_canceled():
+                    return
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = e
+                    yield item, result
+                    next_item = next(items, None)
+                    if next_item is not None:
+                        pending[pool.submit(func, next_item)] = next_item
+        finally:
+            for future in pending:
+                future.cancel()
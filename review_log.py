@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+Review log persistence for the Image Mask Reviewer.
+
+Decisions live in two files inside the output directory:
+
+* ``review_log.csv`` - the snapshot, one row per reviewed key.
+* ``review_log.journal.<reviewer>.<host>.csv`` - one append-only journal
+  per reviewer and machine with the same columns, one row per decision in
+  the order they were made.  ``review_log.journal.csv`` and
+  ``review_log.journal.<reviewer>.csv``, written by earlier versions, are
+  still read.
+
+Loading merges the journals over the snapshot by timestamp (latest
+decision wins), and compaction folds a reviewer's journal back into the
+snapshot under a lock file, so several reviewers can share one output
+directory.
+"""
+
+import csv
+import glob
+import io
+import logging
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+
+REVIEW_LOG_COLUMNS = ['timestamp', 'image_file', 'mask_file', 'mask_veg_file',
+                      'mask_type', 'status', 'notes', 'reviewer']
+
+# Number of journal records after which the journal is folded into the snapshot
+DEFAULT_COMPACT_THRESHOLD = 5000
+
+# A compaction lock older than this is assumed to belong to a crashed session
+STALE_LOCK_SECONDS = 120
+
+# Seconds to wait for another session's compaction to finish
+DEFAULT_LOCK_TIMEOUT = 10.0
+
+
+def reviewer_id(name):
+    """Normalise a reviewer name for use in a journal file name."""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name or '').strip('._') or 'default'
+
+
+def journal_path_for(csv_path, reviewer=None, host=None):
+    """Return the journal path of a reviewer on a host, or a legacy journal path.
+
+    Without host this is the per-reviewer journal of earlier versions,
+    without reviewer the single shared journal before that.
+    """
+    root, ext = os.path.splitext(csv_path)
+    if reviewer and host:
+        return f"{root}.journal.{reviewer_id(reviewer)}.{reviewer_id(host)}{ext or '.csv'}"
+    if reviewer:
+        return f"{root}.journal.{reviewer_id(reviewer)}{ext or '.csv'}"
+    return f"{root}.journal{ext or '.csv'}"
+
+
+def journal_paths(csv_path):
+    """Return every journal next to a snapshot, the legacy journal included."""
+    root, ext = os.path.splitext(csv_path)
+    ext = ext or '.csv'
+    legacy = f"{root}.journal{ext}"
+    paths = sorted(glob.glob(f"{glob.escape(root)}.journal.*{ext}"))
+    if os.path.exists(legacy):
+        paths.insert(0, legacy)
+    return paths
+
+
+def record_row(key, data):
+    """Convert a review_data item into a CSV row."""
+    image_file, mask_file, mask_veg_file, mask_type = key
+    return [
+        data['timestamp'],
+        image_file,
+        mask_file,
+        mask_veg_file,
+        mask_type,
+        data['status'],
+        data.get('notes', ''),
+        data.get('reviewer', '')
+    ]
+
+
+def write_snapshot(csv_path, review_data):
+    """Rewrite the snapshot from review_data, replacing the old file atomically."""
+    tmp_path = csv_path + '.tmp'
+    with open(tmp_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(REVIEW_LOG_COLUMNS)
+        for key, data in review_data.items():
+            writer.writerow(record_row(key, data))
+    os.replace(tmp_path, csv_path)
+
+
+def _read_log_frame(path):
+    """Read a snapshot or journal CSV and normalise it to the current column layout.
+
+    Old logs have a ``decision`` column instead of ``status`` and no
+    ``mask_type``; their entries are treated as regular mask reviews with
+    an empty mask_veg_file, exactly as before.
+    """
+    if not path or not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    if 'image_file' not in df.columns:
+        log.warning("%s is missing required columns", os.path.basename(path))
+        return None
+    if df.empty:
+        return None
+    if 'status' not in df.columns:
+        if 'decision' not in df.columns:
+            log.warning("%s has no status column", os.path.basename(path))
+            return None
+        df = df.rename(columns={'decision': 'status'})
+    if 'mask_type' not in df.columns:
+        df['mask_veg_file'] = ''
+        df['mask_type'] = 'mask'
+    for column in REVIEW_LOG_COLUMNS:
+        if column not in df.columns:
+            df[column] = ''
+    return df[REVIEW_LOG_COLUMNS]
+
+
+def _timestamp_order(timestamps):
+    """Return a stable ordering of rows by timestamp, oldest first, or None if already ordered.
+
+    Sorts by _timestamp_key, the same text ordering merge_records uses,
+    so a full load and an incremental merge agree on the latest decision
+    whatever the pandas version or timestamp format.
+    """
+    keys = timestamps.str.replace('T', ' ', regex=False).to_numpy(dtype=str)
+    if (keys[:-1] <= keys[1:]).all():
+        return None
+    return np.argsort(keys, kind='stable')
+
+
+def load_review_records(csv_path, journal_path=None):
+    """Load the snapshot plus journal into a review_data dict.
+
+    Rows are ordered column-wise by timestamp and folded into the dict in
+    bulk, so for every 4-tuple key the row with the latest timestamp wins;
+    rows with equal timestamps keep file order, journal after snapshot.
+    journal_path may also be a list of journal paths.
+    """
+    if journal_path is None or isinstance(journal_path, str):
+        journal_path = [journal_path]
+    frames = [df for df in map(_read_log_frame, [csv_path] + list(journal_path))
+              if df is not None]
+    if not frames:
+        return {}
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    order = _timestamp_order(df['timestamp'])
+    if order is not None:
+        df = df.iloc[order]
+
+    columns = {column: df[column].tolist() for column in REVIEW_LOG_COLUMNS}
+    keys = zip(columns['image_file'], columns['mask_file'],
+               columns['mask_veg_file'], columns['mask_type'])
+    values = [
+        {'status': status, 'timestamp': timestamp, 'mask_type': mask_type, 'notes': notes,
+         'reviewer': reviewer}
+        for status, timestamp, mask_type, notes, reviewer
+        in zip(columns['status'], columns['timestamp'], columns['mask_type'], columns['notes'],
+               columns['reviewer'])
+    ]
+    # dict() keeps the last value per key, which after ordering is the latest decision
+    return dict(zip(keys, values))
+
+
+def merge_records(review_data, items):
+    """Merge ``(key, data)`` items into review_data, keeping the latest timestamp per key.
+
+    Items with the same timestamp as the stored record replace it, so
+    replaying rows in file order matches load_review_records.  Returns the
+    set of keys whose record changed.
+    """
+    changed = set()
+    for key, data in items:
+        current = review_data.get(key)
+        if current is None or _timestamp_key(data['timestamp']) >= _timestamp_key(current['timestamp']):
+            if current != data:
+                review_data[key] = data
+                changed.add(key)
+    return changed
+
+
+def _timestamp_key(timestamp):
+    # datetime.isoformat() output compares correctly as text once 'T' is normalised;
+    # _timestamp_order applies the same normalisation column-wise
+    return timestamp.replace('T', ' ')
+
+
+def rows_to_items(rows):
+    """Convert journal row dicts (as read by JournalReader) into review_data items."""
+    for row in rows:
+        status = row.get('status') or row.get('decision')
+        if not status or 'image_file' not in row:
+            continue
+        mask_type = row.get('mask_type') or 'mask'
+        key = (row['image_file'], row.get('mask_file', ''), row.get('mask_veg_file', ''), mask_type)
+        yield key, {'status': status, 'timestamp': row.get('timestamp', ''),
+                    'mask_type': mask_type, 'notes': row.get('notes', ''),
+                    'reviewer': row.get('reviewer', '')}
+
+
+class JournalReader:
+    """Incremental reader for one journal file.
+
+    Remembers the byte offset of the last complete line it read, so each
+    read_new() call only parses what other sessions appended since.  A
+    journal that shrank or was replaced (compacted by its owner and
+    started again) is read from the beginning.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.header = None
+        self.identity = None
+
+    def read_new(self):
+        """Return the rows appended since the last call as dicts."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.offset, self.header, self.identity = 0, None, None
+            return []
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self.identity or stat.st_size < self.offset:
+            self.offset, self.header, self.identity = 0, None, identity
+        if stat.st_size == self.offset:
+            return []
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(stat.st_size - self.offset)
+        except FileNotFoundError:
+            return []
+        # A writer may be half way through a line; leave it for the next read
+        end = data.rfind(b'\n')
+        if end < 0:
+            return []
+        self.offset += end + 1
+        reader = csv.reader(io.StringIO(data[:end + 1].decode('utf-8'), newline=''))
+        if self.header is None:
+            self.header = next(reader, None)
+            if self.header is None:
+                return []
+        return [dict(zip(self.header, row)) for row in reader if row]
+
+
+class SnapshotLock:
+    """Exclusive lock file guarding compaction of a shared snapshot.
+
+    Uses O_CREAT | O_EXCL, which is atomic on local disks and on the
+    network filesystems reviewers share output directories on.
+    """
+
+    def __init__(self, csv_path, timeout=DEFAULT_LOCK_TIMEOUT):
+        self.path = csv_path + '.lock'
+        self.timeout = timeout
+        self.fd = None
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self.fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(self.fd, str(os.getpid()).encode())
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > STALE_LOCK_SECONDS:
+                        log.warning("Removing stale lock %s", os.path.basename(self.path))
+                        os.remove(self.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{os.path.basename(self.path)} is held by another session")
+                time.sleep(0.1)
+
+    def __exit__(self, *exc_info):
+        os.close(self.fd)
+        self.fd = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ReviewJournal:
+    """Append-only decision journal stored next to the snapshot CSV."""
+
+    def __init__(self, path, compact_threshold=DEFAULT_COMPACT_THRESHOLD):
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self.record_count = self._count_records()
+        self._file = None
+        self._writer = None
+
+    def _count_records(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, newline='') as f:
+            return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+    def _open(self):
+        if self._file is None:
+            needs_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self._file = open(self.path, 'a', newline='')
+            self._writer = csv.writer(self._file)
+            if needs_header:
+                self._writer.writerow(REVIEW_LOG_COLUMNS)
+
+    def append(self, key, data):
+        """Append one decision and flush it to disk."""
+        self.append_many([(key, data)])
+
+    def append_many(self, items):
+        """Append several decisions with a single flush."""
+        self._open()
+        rows = [record_row(key, data) for key, data in items]
+        self._writer.writerows(rows)
+        self._file.flush()
+        self.record_count += len(rows)
+
+    def needs_compaction(self):
+        return bool(self.compact_threshold) and self.record_count >= self.compact_threshold
+
+    def reset(self):
+        """Truncate the journal after its records were folded into the snapshot."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.record_count = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
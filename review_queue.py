@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Ordering and filtering of the review queue by per-mask statistics.
+
+The dock passes ``stats_for(pair, field)``, which returns a cached
+statistic of the pair's selected mask (or the mask / mask_veg agreement
+of the pair) or None when it is not known yet.  Pairs without statistics
+keep their file name order after the others.
+"""
+
+
+# (key, label, statistic, descending)
+QUEUE_ORDERS = [
+    ('name', "File name", None, False),
+    ('empty_first', "Empty masks first", 'foreground', False),
+    ('full_first', "Full masks first", 'foreground', True),
+    ('components', "Most components first", 'components', True),
+    ('nodata', "Most nodata first", 'nodata', True),
+    ('worst_agreement', "Worst agreement first", 'iou', False),
+    ('most_disagreement', "Most pixels disagreeing first", 'disagreement', True),
+]
+
+
+def order_pairs(pairs, order, stats_for):
+    """Return pairs sorted by a QUEUE_ORDERS key; the sort is stable."""
+    for key, _, field, descending in QUEUE_ORDERS:
+        if key == order:
+            break
+    else:
+        raise ValueError(f"Unknown queue order: {order}")
+    if field is None:
+        return list(pairs)
+
+    known, unknown = [], []
+    values = {}
+    for pair in pairs:
+        value = stats_for(pair, field)
+        if value is None:
+            unknown.append(pair)
+        else:
+            values[id(pair)] = value
+            known.append(pair)
+    known.sort(key=lambda pair: values[id(pair)], reverse=descending)
+    return known + unknown
+
+
+def filter_by_foreground(pairs, stats_for, max_foreground=None, hide_empty=False):
+    """Drop pairs above max_foreground (a fraction) and, optionally, empty masks."""
+    if max_foreground is None and not hide_empty:
+        return pairs
+    kept = []
+    for pair in pairs:
+        value = stats_for(pair, 'foreground')
+        if value is not None:
+            if max_foreground is not None and value > max_foreground:
+                continue
+            if hide_empty and value == 0:
+                continue
+        kept.append(pair)
+    return kept
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+Pluggable review stores.
+
+A store loads the review_data dict, persists single decisions and can
+import/export the ``review_log.csv`` layout.  Two backends exist:
+
+* ``CsvReviewStore`` - review_log.csv plus one append-only journal per
+  reviewer; other reviewers' decisions are merged in incrementally.
+* ``SqliteReviewStore`` - review_log.sqlite in WAL mode, one upsert per
+  decision.
+
+The dict returned by ``load()`` is kept as ``store.records`` and updated
+by ``record()``, so the dock and the store share one view of the data.
+"""
+
+import csv
+import logging
+import os
+import socket
+import sqlite3
+
+from .review_log import (DEFAULT_LOCK_TIMEOUT, REVIEW_LOG_COLUMNS, JournalReader, ReviewJournal,
+                         SnapshotLock, journal_path_for, journal_paths, load_review_records,
+                         merge_records, reviewer_id, rows_to_items, write_snapshot)
+
+log = logging.getLogger(__name__)
+
+
+CSV_NAME = 'review_log.csv'
+SQLITE_NAME = 'review_log.sqlite'
+
+STORE_BACKENDS = ['csv', 'sqlite']
+
+
+class ReviewStore:
+    """Base class; subclasses implement load and the persistence hooks."""
+
+    description = ''
+
+    def __init__(self, output_dir, reviewer=''):
+        self.output_dir = output_dir
+        self.csv_path = os.path.join(output_dir, CSV_NAME)
+        self.reviewer = reviewer_id(reviewer)
+        self.records = {}
+
+    def load(self):
+        raise NotImplementedError
+
+    def record(self, key, data):
+        """Store one decision."""
+        raise NotImplementedError
+
+    def record_many(self, items):
+        """Store several ``(key, data)`` decisions as one batch."""
+        for key, data in items:
+            self.record(key, data)
+
+    def refresh(self):
+        """Merge decisions other sessions made since the last load or refresh.
+
+        Returns the set of keys whose record changed.
+        """
+        return set()
+
+    def snapshot_changed(self):
+        """Return True when another session rewrote the snapshot since it was read."""
+        return False
+
+    def compact_if_due(self):
+        """Run a compaction that record_many() deferred; returns True when one ran."""
+        return False
+
+    def compact(self):
+        """Bring review_log.csv up to date with every decision in the store."""
+        raise NotImplementedError
+
+    def export_csv(self, path=None):
+        write_snapshot(path or self.csv_path, self.records)
+
+    def close(self):
+        pass
+
+
+class CsvReviewStore(ReviewStore):
+    """review_log.csv snapshot with per-reviewer append-only journals.
+
+    Each session appends only to the journal of its reviewer on its host,
+    so the same login on two machines writes two journals.  The other
+    journals are tailed with JournalReader, so refresh() parses just the
+    bytes appended since the previous call.
+    """
+
+    description = 'CSV'
+
+    def __init__(self, output_dir, use_journal=True, reviewer=''):
+        super(CsvReviewStore, self).__init__(output_dir, reviewer)
+        self.use_journal = use_journal
+        if not os.path.exists(self.csv_path):
+            with open(self.csv_path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(REVIEW_LOG_COLUMNS)
+        self.journal = ReviewJournal(journal_path_for(self.csv_path, self.reviewer,
+                                                      socket.gethostname()))
+        self.readers = {}
+        self.snapshot_state = None
+
+    def _snapshot_stat(self):
+        try:
+            stat = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def load(self):
+        self.snapshot_state, self.records = self.read_snapshot()
+        self.readers = {}
+        # Journals are bounded by compaction, so reading them row by row is cheap
+        self._read_journals(include_own=True)
+        if self.journal.needs_compaction():
+            self._try_compact()
+        return self.records
+
+    def _read_journals(self, include_own=False):
+        changed = set()
+        paths = journal_paths(self.csv_path)
+        for path in paths:
+            if path == self.journal.path and not include_own:
+                continue
+            reader = self.readers.get(path)
+            if reader is None:
+                reader = self.readers[path] = JournalReader(path)
+            changed |= merge_records(self.records, rows_to_items(reader.read_new()))
+        for path in set(self.readers) - set(paths):
+            del self.readers[path]
+        return changed
+
+    def refresh(self):
+        return self._read_journals()
+
+    def snapshot_changed(self):
+        return self._snapshot_stat() != self.snapshot_state
+
+    def read_snapshot(self):
+        """Return ``(state, records)`` for the snapshot; safe to call off the GUI thread."""
+        state = self._snapshot_stat()
+        return state, load_review_records(self.csv_path)
+
+    def merge_snapshot(self, state, records):
+        """Merge a snapshot returned by read_snapshot(); returns the changed keys."""
+        self.snapshot_state = state
+        return merge_records(self.records, records.items())
+
+    def record(self, key, data):
+        self.record_many([(key, data)])
+
+    def record_many(self, items):
+        """Store decisions with one journal write, or one snapshot rewrite without a journal.
+
+        A journal past its compaction threshold is left for compact_if_due(),
+        so recording never waits for a snapshot rewrite.
+        """
+        items = list(items)
+        for key, data in items:
+            data.setdefault('reviewer', self.reviewer)
+            self.records[key] = data
+        if self.use_journal:
+            self.journal.append_many(items)
+            return
+        if not self._try_compact():
+            # Keep the decisions on disk until the snapshot lock is free again
+            self.journal.append_many(items)
+
+    def compact_if_due(self):
+        """Compact once the journal reaches its threshold, without waiting for the lock."""
+        if not self.journal.needs_compaction():
+            return False
+        log.info("Journal reached %d records, compacting", self.journal.record_count)
+        return self._try_compact(timeout=0)
+
+    def _try_compact(self, timeout=DEFAULT_LOCK_TIMEOUT):
+        try:
+            self.compact(timeout)
+        except TimeoutError as e:
+            log.warning("Compaction postponed: %s", e)
+            return False
+        return True
+
+    def compact(self, timeout=DEFAULT_LOCK_TIMEOUT):
+        """Rewrite review_log.csv and fold this reviewer's journal into it.
+
+        Runs under the snapshot lock and first merges whatever other
+        sessions wrote, this reviewer's own journal included in case a
+        second session on the same host appended to it, so no decisions
+        are lost.  Other reviewers' journals are left alone; their owners
+        compact them.
+        """
+        with SnapshotLock(self.csv_path, timeout):
+            self._read_journals(include_own=True)
+            if self.snapshot_changed():
+                self.merge_snapshot(*self.read_snapshot())
+            write_snapshot(self.csv_path, self.records)
+            self.journal.reset()
+            for legacy_path in (journal_path_for(self.csv_path),
+                                journal_path_for(self.csv_path, self.reviewer)):
+                if legacy_path in self.readers and os.path.exists(legacy_path):
+                    # Journal of an earlier layout; it is in the snapshot now
+                    os.remove(legacy_path)
+            self.snapshot_state = self._snapshot_stat()
+
+    def close(self):
+        self.journal.close()
+
+
+class SqliteReviewStore(ReviewStore):
+    """SQLite backend in WAL mode.
+
+    WAL needs shared memory, so the database should live on a local disk
+    rather than a network share; output directories shared by several
+    reviewers should use the CSV store.
+    """
+
+    description = 'SQLite'
+
+    UPSERT = (
+        "INSERT INTO reviews (image_file, mask_file, mask_veg_file, mask_type, status, timestamp, "
+        "notes, reviewer) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (image_file, mask_file, mask_veg_file, mask_type) DO UPDATE SET "
+        "status = excluded.status, timestamp = excluded.timestamp, notes = excluded.notes, "
+        "reviewer = excluded.reviewer"
+    )
+
+    def __init__(self, output_dir, reviewer=''):
+        super(SqliteReviewStore, self).__init__(output_dir, reviewer)
+        self.db_path = os.path.join(output_dir, SQLITE_NAME)
+        is_new = not os.path.exists(self.db_path)
+        # Loaded on the scan task's worker, then written from the GUI thread
+        self.connection = sqlite3.connect(self.db_path, isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            "image_file TEXT NOT NULL, mask_file TEXT NOT NULL, mask_veg_file TEXT NOT NULL, "
+            "mask_type TEXT NOT NULL, status TEXT NOT NULL, timestamp TEXT NOT NULL, "
+            "notes TEXT NOT NULL DEFAULT '', reviewer TEXT NOT NULL DEFAULT '', "
+            "PRIMARY KEY (image_file, mask_file, mask_veg_file, mask_type))")
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(reviews)")]
+        if 'reviewer' not in columns:
+            self.connection.execute("ALTER TABLE reviews ADD COLUMN reviewer TEXT NOT NULL DEFAULT ''")
+        # The primary key already indexes image_file; status queries get their own index
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_reviews_status ON reviews (status, mask_type, timestamp)")
+        # A new database starts from the existing CSV log on first load
+        self.needs_import = is_new and os.path.exists(self.csv_path)
+
+    @staticmethod
+    def _row(key, data):
+        return tuple(key) + (data['status'], data['timestamp'], data.get('notes', '') or '',
+                             data.get('reviewer', '') or '')
+
+    def load(self):
+        if self.needs_import:
+            imported = self.import_csv(self.csv_path, journal_paths(self.csv_path))
+            self.needs_import = False
+            log.info("Imported %d review records from %s", imported, CSV_NAME)
+        self.records = {
+            (image_file, mask_file, mask_veg_file, mask_type):
+                {'status': status, 'timestamp': timestamp, 'mask_type': mask_type, 'notes': notes,
+                 'reviewer': reviewer}
+            for image_file, mask_file, mask_veg_file, mask_type, status, timestamp, notes, reviewer
+            in self.connection.execute(
+                "SELECT image_file, mask_file, mask_veg_file, mask_type, status, timestamp, notes, "
+                "reviewer FROM reviews")
+        }
+        return self.records
+
+    def record(self, key, data):
+        data.setdefault('reviewer', self.reviewer)
+        self.records[key] = data
+        self.connection.execute(self.UPSERT, self._row(key, data))
+
+    def record_many(self, items):
+        """Upsert several decisions in one transaction."""
+        items = list(items)
+        for key, data in items:
+            data.setdefault('reviewer', self.reviewer)
+            self.records[key] = data
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.executemany(self.UPSERT, (self._row(k, v) for k, v in items))
+
+    def import_csv(self, csv_path, journal_path=None):
+        """Upsert every record of a review_log.csv (and journal) in one transaction."""
+        records = load_review_records(csv_path, journal_path)
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.executemany(self.UPSERT, (self._row(k, v) for k, v in records.items()))
+        self.records.update(records)
+        return len(records)
+
+    def query(self, status=None, mask_type=None, since=None, reviewer=None):
+        """Return ``(timestamp, image_file, mask_file, mask_veg_file, mask_type, status, notes, reviewer)`` rows."""
+        clauses, params = [], []
+        for column, value in (('status', status), ('mask_type', mask_type), ('reviewer', reviewer)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.connection.execute(
+            "SELECT timestamp, image_file, mask_file, mask_veg_file, mask_type, status, notes, reviewer "
+            f"FROM reviews{where} ORDER BY timestamp", params).fetchall()
+
+    def compact(self):
+        """Export to review_log.csv so CSV tooling sees the latest decisions."""
+        self.export_csv()
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        self.connection.close()
+
+
+def open_review_store(backend, output_dir, use_journal=True, reviewer=''):
+    """Create the review store for a backend name from STORE_BACKENDS."""
+    if backend == 'sqlite':
+        return SqliteReviewStore(output_dir, reviewer=reviewer)
+    return CsvReviewStore(output_dir, use_journal=use_journal, reviewer=reviewer)
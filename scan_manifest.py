@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent scan manifest for ``load_pairs``.
+
+The manifest stores the matched triplets, the unmatched entries of each
+directory and the directory mtimes.  On the next load, directories whose
+mtime did not change are not listed again; changed directories are listed
+once and only the base names touched by added or removed entries are
+re-matched.
+"""
+
+import json
+import logging
+import os
+import time
+
+from .pairing import (is_image_file, iter_directory, list_directory, make_pairs,
+                      mask_base_name, match_triplets)
+
+log = logging.getLogger(__name__)
+
+
+MANIFEST_NAME = 'scan_manifest.json'
+MANIFEST_VERSION = 1
+
+# Directories modified this close to the scan may change again within the
+# same mtime tick, so they are always listed again on the next load
+RACY_MTIME_WINDOW_NS = 2 * 10 ** 9
+
+ROLES = ['image', 'mask', 'mask_veg']
+
+
+def _settings(dirs, mask_suffix, mask_veg_suffix):
+    settings = {role: os.path.abspath(dirs[role]) for role in ROLES}
+    settings['mask_suffix'] = mask_suffix
+    settings['mask_veg_suffix'] = mask_veg_suffix
+    return settings
+
+
+def _read_manifest(path, settings):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning("Ignoring unreadable scan manifest: %s", e)
+        return None
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('settings') != settings:
+        return None
+    return manifest
+
+
+def _write_manifest(path, settings, directories, triplets, listings):
+    used = [set(), set(), set()]
+    for triplet in triplets:
+        for i, name in enumerate(triplet):
+            used[i].add(name)
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'settings': settings,
+        'directories': {
+            role: {
+                'mtime_ns': directories[role]['mtime_ns'],
+                'scanned_ns': directories[role]['scanned_ns'],
+                'entry_count': len(listings[role]),
+                'unmatched': sorted(set(listings[role]) - used[i]),
+            }
+            for i, role in enumerate(ROLES)
+        },
+        'triplets': triplets,
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _manifest_listing(manifest, role):
+    """Rebuild a directory's entry set from the manifest."""
+    i = ROLES.index(role)
+    names = {triplet[i] for triplet in manifest['triplets']}
+    names.update(manifest['directories'][role]['unmatched'])
+    return names
+
+
+def _is_unchanged(entry, mtime_ns):
+    return (entry['mtime_ns'] == mtime_ns
+            and entry['scanned_ns'] - mtime_ns > RACY_MTIME_WINDOW_NS)
+
+
+def _delta_triplets(triplets, listings, changed, mask_suffix, mask_veg_suffix):
+    """Re-match only the base names touched by added or removed entries."""
+    suffixes = {'mask': mask_suffix, 'mask_veg': mask_veg_suffix}
+    affected = set()
+    for role, names in changed.items():
+        for name in names:
+            if role == 'image':
+                affected.add(os.path.splitext(name)[0])
+            else:
+                base_name = mask_base_name(name, suffixes[role])
+                if base_name is not None:
+                    affected.add(base_name)
+
+    kept = [tuple(t) for t in triplets if os.path.splitext(t[0])[0] not in affected]
+    rematched, _ = match_triplets(
+        [n for n in listings['image'] if os.path.splitext(n)[0] in affected],
+        [n for n in listings['mask'] if mask_base_name(n, mask_suffix) in affected],
+        [n for n in listings['mask_veg'] if mask_base_name(n, mask_veg_suffix) in affected],
+        mask_suffix, mask_veg_suffix)
+    return sorted(kept + rematched), len(affected)
+
+
+def scan_with_manifest(output_dir, image_dir, mask_dir, mask_veg_dir,
+                       mask_suffix, mask_veg_suffix, on_chunk=None, is_canceled=None):
+    """Find triplets, reusing the manifest in output_dir when possible.
+
+    Returns ``(pairs, incomplete, mode)`` where mode is ``'cached'`` (no
+    directory changed), ``'delta'`` or ``'full'``.  on_chunk and
+    is_canceled are passed to match_triplets for full scans; a cancelled
+    scan does not write the manifest.
+    """
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    dirs = {'image': image_dir, 'mask': mask_dir, 'mask_veg': mask_veg_dir}
+    settings = _settings(dirs, mask_suffix, mask_veg_suffix)
+    manifest = _read_manifest(path, settings)
+
+    directories = {}
+    for role in ROLES:
+        directories[role] = {'mtime_ns': os.stat(dirs[role]).st_mtime_ns,
+                             'scanned_ns': time.time_ns()}
+
+    if manifest is None:
+        listings = {role: list_directory(dirs[role]) for role in ['mask', 'mask_veg']}
+        listings['image'] = []
+
+        def image_names():
+            for name in iter_directory(image_dir):
+                listings['image'].append(name)
+                yield name
+
+        triplets, incomplete = match_triplets(image_names(), listings['mask'], listings['mask_veg'],
+                                              mask_suffix, mask_veg_suffix,
+                                              on_chunk=on_chunk, is_canceled=is_canceled)
+        if is_canceled is not None and is_canceled():
+            return make_pairs(image_dir, mask_dir, mask_veg_dir, triplets), incomplete, 'full'
+        mode = 'full'
+    else:
+        triplets = manifest['triplets']
+        listings = {}
+        changed = {}
+        for role in ROLES:
+            entry = manifest['directories'][role]
+            if _is_unchanged(entry, directories[role]['mtime_ns']):
+                directories[role]['scanned_ns'] = entry['scanned_ns']
+                continue
+            current = set(list_directory(dirs[role]))
+            difference = current.symmetric_difference(_manifest_listing(manifest, role))
+            listings[role] = current
+            if difference:
+                changed[role] = difference
+                
+        if not listings:
+            # Nothing was listed: the manifest is the scan result
+            incomplete = [name for name in manifest['directories']['image']['unmatched']
+                          if is_image_file(name, mask_suffix, mask_veg_suffix)]
+            return make_pairs(image_dir, mask_dir, mask_veg_dir, triplets), incomplete, 'cached'
+            
+        for role in ROLES:
+            if role not in listings:
+                listings[role] = _manifest_listing(manifest, role)
+        if changed:
+            triplets, affected = _delta_triplets(triplets, listings, changed,
+                                                 mask_suffix, mask_veg_suffix)
+            log.info("Scan manifest: re-matched %d base names", affected)
+            mode = 'delta'
+        else:
+            mode = 'cached'
+        paired = {triplet[0] for triplet in triplets}
+        incomplete = sorted(name for name in listings['image']
+                            if name not in paired and is_image_file(name, mask_suffix, mask_veg_suffix))
+
+    try:
+        _write_manifest(path, settings, directories, triplets, listings)
+    except OSError as e:
+        log.warning("Could not write scan manifest: %s", e)
+    return make_pairs(image_dir, mask_dir, mask_veg_dir, triplets), incomplete, mode
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Background loading of a dataset for the review dock.
+
+The review log load, the directory scan and the status merge run on a
+QgsTask worker.  Triplets are streamed to the dock in chunks so review can
+start before the scan has finished.  The three stages are recorded in
+``settings['timings']`` when given.  Recursive scans walk the trees in
+full every time; the scan manifest only covers flat directories.
+"""
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsTask
+
+from .instrumentation import StageTimings
+from .pairing import DEFAULT_WALK_WORKERS, find_triplets, make_pairs
+from .scan_manifest import scan_with_manifest
+from .status_index import merge_review_statuses
+
+
+CHUNK_SIZE = 1000
+
+
+class ScanTask(QgsTask):
+    """Load review data, then stream status-merged pairs to the dock.
+
+    ``reviewDataLoaded(dict)`` is emitted once before any pairs, then
+    ``pairsFound(list)`` for every chunk.  Chunks arrive in discovery
+    order; the dock sorts ``all_pairs`` when the task finishes.
+    """
+
+    reviewDataLoaded = pyqtSignal(object)
+    pairsFound = pyqtSignal(object)
+
+    def __init__(self, settings, on_finished):
+        super(ScanTask, self).__init__("Scanning image triplets", QgsTask.CanCancel)
+        self.settings = settings
+        self.on_finished = on_finished
+        self.review_data = {}
+        self.pair_count = 0
+        self.incomplete = []
+        self.mode = None
+        self.walk_stats = {}  # directories / files / seconds of a recursive walk
+        self.error = None
+        self.timings = settings.get('timings') or StageTimings()
+        # Status merges of the streamed chunks add up to one sample
+        self.merge_spans = self.timings.spans()
+
+    def _emit_chunk(self, triplets):
+        s = self.settings
+        pairs = make_pairs(s['image_dir'], s['mask_dir'], s['mask_veg_dir'], triplets)
+        with self.merge_spans.time('status_merge'):
+            merge_review_statuses(pairs, self.review_data)
+        self.pair_count += len(pairs)
+        self.pairsFound.emit(pairs)
+
+    def run(self):
+        s = self.settings
+        try:
+            with self.timings.time('csv_load'):
+                self.review_data = s['review_store'].load()
+            self.reviewDataLoaded.emit(self.review_data)
+            for cache in s.get('caches', ()):
+                cache.load()
+            if self.isCanceled():
+                return False
+
+            dirs = (s['image_dir'], s['mask_dir'], s['mask_veg_dir'],
+                    s['mask_suffix'], s['mask_veg_suffix'])
+            # Includes the streamed chunks' status merges, which are also timed on their own
+            with self.timings.time('scan'):
+                recursive = s.get('recursive', False)
+                if s['use_manifest'] and not recursive:
+                    pairs, self.incomplete, self.mode = scan_with_manifest(
+                        s['output_dir'], *dirs, on_chunk=self._emit_chunk,
+                        is_canceled=self.isCanceled)
+                else:
+                    pairs, self.incomplete = find_triplets(
+                        *dirs, on_chunk=self._emit_chunk, is_canceled=self.isCanceled,
+                        recursive=recursive,
+                        workers=s.get('walk_workers', DEFAULT_WALK_WORKERS),
+                        walk_stats=self.walk_stats)
+                    self.mode = 'recursive' if recursive else 'full'
+
+            if not self.pair_count:
+                # Cached and delta results were not streamed; hand them over in chunks
+                with self.merge_spans.time('status_merge'):
+                    merge_review_statuses(pairs, self.review_data)
+                for start in range(0, len(pairs), CHUNK_SIZE):
+                    if self.isCanceled():
+                        break
+                    chunk = pairs[start:start + CHUNK_SIZE]
+                    self.pair_count += len(chunk)
+                    self.pairsFound.emit(chunk)
+            self.merge_spans.record()
+        except Exception as e:
+            self.error = e
+            return False
+        return not self.isCanceled()
+
+    def finished(self, result):
+        self.on_finished(self, result)
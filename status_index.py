@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Incrementally maintained review status index.
+
+Maps each triplet key to its pair dict and keeps one membership set per
+status, so lookups, status changes and counts are O(1) instead of scans
+over ``all_pairs``.
+"""
+
+
+STATUSES = ['not_reviewed', 'correct', 'incorrect']
+
+
+def pair_key(pair):
+    """Key identifying a triplet, shared by both mask types."""
+    return (pair['image_file'], pair['mask_file'], pair['mask_veg_file'])
+
+
+# Separates the image file from the chip window in chip review keys
+CHIP_SEPARATOR = '#'
+
+
+def chip_key(key, window):
+    """Key of one ``(xoff, yoff, xsize, ysize)`` chip of a triplet.
+
+    The window is appended to the image file (``scene.tif#0,0,2048,2048``),
+    so chip decisions fit the review_log.csv columns and never match a
+    whole-tile key.
+    """
+    return (f"{key[0]}{CHIP_SEPARATOR}{','.join(str(v) for v in window)}",) + tuple(key[1:])
+
+
+def split_chip_key(key):
+    """Return ``(triplet key, window)``; window is None for whole-tile keys."""
+    image_file, separator, window = key[0].rpartition(CHIP_SEPARATOR)
+    try:
+        values = tuple(int(v) for v in window.split(','))
+    except ValueError:
+        return key, None
+    if not separator or len(values) != 4:
+        return key, None
+    return (image_file,) + tuple(key[1:]), values
+
+
+def review_status(key, review_data):
+    """Return the recorded status of a triplet key, preferring the mask_veg decision."""
+    record = review_data.get(key + ('mask_veg',)) or review_data.get(key + ('mask',))
+    return record['status'] if record is not None else None
+
+
+def merge_review_statuses(pairs, review_data):
+    """Set pair statuses from review_data, preferring the mask_veg decision.
+
+    Returns the number of pairs that had a recorded decision.
+    """
+    updated = 0
+    for pair in pairs:
+        status = review_status(pair_key(pair), review_data)
+        if status is not None:
+            pair['status'] = status
+            updated += 1
+    return updated
+
+
+class StatusIndex:
+
+    def __init__(self, pairs=()):
+        self.rebuild(pairs)
+
+    def rebuild(self, pairs):
+        self.pairs = {}
+        self.members = {status: set() for status in STATUSES}
+        for pair in pairs:
+            self.add(pair)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def add(self, pair):
+        key = pair_key(pair)
+        self.pairs[key] = pair
+        self.members.setdefault(pair['status'], set()).add(key)
+
+    def get(self, key):
+        return self.pairs.get(key)
+
+    def count(self, status):
+        return len(self.members.get(status, ()))
+
+    def set_status(self, key, status):
+        """Move a pair to a new status and return it (None for unknown keys)."""
+        pair = self.pairs.get(key)
+        if pair is None:
+            return None
+        self.members.get(pair['status'], set()).discard(key)
+        self.members.setdefault(status, set()).add(key)
+        pair['status'] = status
+        return pair
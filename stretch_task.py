@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Background sampling of contrast stretches for the review dock.
+
+compute_band_stretch reads a decimated copy of three bands, which is
+too slow for the GUI thread on large or remote rasters.  StretchTask
+runs it for a list of images on a QgsTask worker thread and emits each
+result as it is ready; the dock stores it in the band_stretch cache and
+restyles the layers showing that image.
+"""
+
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import QgsTask
+
+from .band_stretch import compute_band_stretch
+
+
+class StretchTask(QgsTask):
+    """Sample the stretch of each image path.
+
+    ``stretchReady(path, result)`` is emitted per path, with result
+    ``(stamp, stats)`` or the exception that was raised.
+    """
+
+    stretchReady = pyqtSignal(object, object)
+
+    def __init__(self, paths, on_finished):
+        super(StretchTask, self).__init__("Sampling contrast stretch",
+                                          QgsTask.CanCancel | QgsTask.Silent)
+        self.paths = list(paths)
+        self.on_finished = on_finished
+
+    def run(self):
+        for i, path in enumerate(self.paths):
+            if self.isCanceled():
+                return False
+            try:
+                result = compute_band_stretch(path)
+            except Exception as e:
+                result = e
+            self.stretchReady.emit(path, result)
+            self.setProgress(100.0 * (i + 1) / len(self.paths))
+        return True
+
+    def finished(self, result):
+        self.on_finished(self, result)
@@ -0,0 +1,11 @@
+"""Import the plugin's Qt-free modules as the ``image_mask_viewer`` package."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'benchmarks'))
+
+from plugin_import import load_plugin_package  # noqa: E402
+
+load_plugin_package()
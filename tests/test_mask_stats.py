@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('osgeo')
+ndimage = pytest.importorskip('scipy.ndimage')
+
+from image_mask_viewer.mask_stats import ComponentCounter  # noqa: E402
+
+
+def count_in_strips(foreground, rows):
+    counter = ComponentCounter()
+    for start in range(0, foreground.shape[0], rows):
+        counter.add_strip(foreground[start:start + rows])
+    return counter.count
+
+
+def test_component_spanning_strips_is_counted_once():
+    # A U shape whose arms only join in the last strip
+    foreground = np.zeros((6, 5), dtype=bool)
+    foreground[:, 0] = foreground[:, 4] = True
+    foreground[5, :] = True
+
+    assert count_in_strips(foreground, 2) == 1
+
+
+def test_diagonal_neighbours_across_a_strip_boundary_stay_separate():
+    foreground = np.zeros((2, 2), dtype=bool)
+    foreground[0, 0] = foreground[1, 1] = True
+
+    assert count_in_strips(foreground, 1) == 2
+
+
+@pytest.mark.parametrize('rows', [1, 3, 7, 64])
+def test_strip_count_matches_whole_raster_labelling(rows):
+    foreground = np.random.default_rng(rows).random((64, 48)) < 0.45
+
+    assert count_in_strips(foreground, rows) == ndimage.label(foreground)[1]
@@ -0,0 +1,36 @@
+import os
+
+from image_mask_viewer.pairing import find_triplets, match_pairs
+
+MASK_SUFFIX = '_rf_classified'
+MASK_VEG_SUFFIX = '_vegmask_ndvi'
+
+
+def test_recursive_scan_ignores_suffixes_in_directory_names(tmp_path):
+    subdir = os.path.join('site' + MASK_SUFFIX, 'x' + MASK_VEG_SUFFIX)
+    for root, name in (('images', 't1.tif'), ('masks', 't1' + MASK_SUFFIX + '.tif'),
+                       ('veg', 't1' + MASK_VEG_SUFFIX + '.tif')):
+        directory = tmp_path / root / subdir
+        directory.mkdir(parents=True)
+        (directory / name).touch()
+
+    pairs, incomplete = find_triplets(str(tmp_path / 'images'), str(tmp_path / 'masks'),
+                                      str(tmp_path / 'veg'), MASK_SUFFIX, MASK_VEG_SUFFIX,
+                                      recursive=True)
+
+    assert [pair['image_file'] for pair in pairs] == [os.path.join(subdir, 't1.tif')]
+    assert incomplete == []
+
+
+def test_match_pairs_checks_suffix_on_file_name():
+    image = os.path.join('site' + MASK_SUFFIX, 't1.tif')
+    mask = os.path.join('site' + MASK_SUFFIX, 't1' + MASK_SUFFIX + '.tif')
+
+    assert match_pairs([image, mask], [mask], MASK_SUFFIX) == [(image, mask)]
+
+
+def test_mask_extension_case_is_ignored():
+    image = 'tile.TIF'
+    mask = 'tile' + MASK_SUFFIX + '.tif'
+
+    assert match_pairs([image], [mask], MASK_SUFFIX) == [(image, mask)]
@@ -0,0 +1,102 @@
+import csv
+
+from image_mask_viewer.review_log import (REVIEW_LOG_COLUMNS, JournalReader, ReviewJournal,
+                                          journal_path_for, journal_paths, load_review_records,
+                                          merge_records)
+
+KEY = ('a.tif', 'a_rf_classified.tif', 'a_vegmask_ndvi.tif', 'mask_veg')
+
+
+def write_log(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(REVIEW_LOG_COLUMNS)
+        for timestamp, status, reviewer in rows:
+            writer.writerow([timestamp, *KEY[:3], KEY[3], status, '', reviewer])
+
+
+def test_older_journal_row_does_not_override_newer_snapshot(tmp_path):
+    csv_path = str(tmp_path / 'review_log.csv')
+    write_log(csv_path, [('2025-01-02T00:00:00', 'correct', 'bob')])
+    write_log(journal_path_for(csv_path, 'alice'), [('2025-01-01T00:00:00', 'incorrect', 'alice')])
+
+    records = load_review_records(csv_path, journal_paths(csv_path))
+
+    assert records[KEY]['status'] == 'correct'
+
+
+def test_full_load_and_incremental_merge_agree(tmp_path):
+    csv_path = str(tmp_path / 'review_log.csv')
+    write_log(csv_path, [('2025-01-01 12:00:00', 'correct', 'bob')])
+    write_log(journal_path_for(csv_path, 'alice'), [('2025-01-01T11:00:00.5', 'incorrect', 'alice')])
+    write_log(journal_path_for(csv_path, 'carol'), [('2025-01-01T12:30:00', 'incorrect', 'carol')])
+
+    loaded = load_review_records(csv_path, journal_paths(csv_path))
+    merged = load_review_records(csv_path)
+    for path in journal_paths(csv_path):
+        merge_records(merged, load_review_records(path).items())
+
+    assert loaded[KEY]['reviewer'] == merged[KEY]['reviewer'] == 'carol'
+
+
+def test_mixed_timestamp_formats_are_ordered_on_full_load(tmp_path):
+    # The raw strings are monotonic ('1' < 'T'), the normalised keys are not
+    csv_path = str(tmp_path / 'review_log.csv')
+    write_log(csv_path, [('2025-01-01 13:00:00', 'correct', 'bob')])
+    write_log(journal_path_for(csv_path, 'alice'), [('2025-01-01T12:00:00', 'incorrect', 'alice')])
+
+    loaded = load_review_records(csv_path, journal_paths(csv_path))
+    merged = load_review_records(csv_path)
+    merge_records(merged, load_review_records(journal_path_for(csv_path, 'alice')).items())
+
+    assert loaded[KEY]['status'] == merged[KEY]['status'] == 'correct'
+
+
+def decision(status, timestamp):
+    return {'status': status, 'timestamp': timestamp, 'mask_type': KEY[3], 'notes': '',
+            'reviewer': 'alice'}
+
+
+def test_journal_reader_returns_only_appended_rows(tmp_path):
+    path = str(tmp_path / 'review_log.journal.alice.csv')
+    journal = ReviewJournal(path)
+    reader = JournalReader(path)
+    assert reader.read_new() == []
+
+    journal.append(KEY, decision('correct', '2025-01-01T12:00:00'))
+    assert [row['status'] for row in reader.read_new()] == ['correct']
+    assert reader.read_new() == []
+
+    journal.append(KEY, decision('incorrect', '2025-01-01T12:01:00'))
+    assert [row['status'] for row in reader.read_new()] == ['incorrect']
+    journal.close()
+
+
+def test_journal_reader_leaves_a_partial_line_for_the_next_read(tmp_path):
+    path = str(tmp_path / 'review_log.journal.alice.csv')
+    journal = ReviewJournal(path)
+    journal.append(KEY, decision('correct', '2025-01-01T12:00:00'))
+    journal.close()
+    reader = JournalReader(path)
+    reader.read_new()
+
+    with open(path, 'a', newline='') as f:
+        f.write('2025-01-01T12:01:00,a.tif')
+    assert reader.read_new() == []
+    with open(path, 'a', newline='') as f:
+        f.write(',a_rf_classified.tif,a_vegmask_ndvi.tif,mask_veg,incorrect,,alice\r\n')
+    assert [row['status'] for row in reader.read_new()] == ['incorrect']
+
+
+def test_journal_reader_rereads_a_journal_that_was_started_again(tmp_path):
+    path = str(tmp_path / 'review_log.journal.alice.csv')
+    journal = ReviewJournal(path)
+    journal.append_many([(KEY, decision('correct', '2025-01-01T12:00:00')),
+                         (KEY, decision('correct', '2025-01-01T12:01:00'))])
+    reader = JournalReader(path)
+    assert len(reader.read_new()) == 2
+
+    journal.reset()
+    journal.append(KEY, decision('incorrect', '2025-01-01T12:02:00'))
+    journal.close()
+    assert [row['status'] for row in reader.read_new()] == ['incorrect']
@@ -0,0 +1,36 @@
+import pytest
+
+from image_mask_viewer.review_queue import filter_by_foreground, order_pairs
+
+STATS = {'a.tif': 0.5, 'b.tif': 0.0, 'c.tif': None, 'd.tif': 0.5, 'e.tif': 1.0}
+PAIRS = [{'image_file': name} for name in STATS]
+
+
+def stats_for(pair, field):
+    return STATS[pair['image_file']]
+
+
+def names(pairs):
+    return [pair['image_file'] for pair in pairs]
+
+
+def test_file_name_order_keeps_the_pairs_as_given():
+    assert names(order_pairs(PAIRS, 'name', stats_for)) == names(PAIRS)
+
+
+def test_ties_keep_file_order_and_unknown_statistics_go_last():
+    assert names(order_pairs(PAIRS, 'empty_first', stats_for)) == [
+        'b.tif', 'a.tif', 'd.tif', 'e.tif', 'c.tif']
+    assert names(order_pairs(PAIRS, 'full_first', stats_for)) == [
+        'e.tif', 'a.tif', 'd.tif', 'b.tif', 'c.tif']
+
+
+def test_unknown_order_is_rejected():
+    with pytest.raises(ValueError):
+        order_pairs(PAIRS, 'random', stats_for)
+
+
+def test_filter_keeps_pairs_without_statistics():
+    kept = filter_by_foreground(PAIRS, stats_for, max_foreground=0.5, hide_empty=True)
+
+    assert names(kept) == ['a.tif', 'c.tif', 'd.tif']
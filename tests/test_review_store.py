@@ -0,0 +1,56 @@
+import socket
+
+from image_mask_viewer.review_log import load_review_records
+from image_mask_viewer.review_store import CsvReviewStore
+
+KEY = ('a.tif', 'a_rf_classified.tif', 'a_vegmask_ndvi.tif', 'mask')
+
+
+def decision(status, timestamp):
+    return {'status': status, 'timestamp': timestamp, 'mask_type': 'mask', 'notes': ''}
+
+
+def test_same_reviewer_on_two_hosts_keeps_both_journals(tmp_path, monkeypatch):
+    monkeypatch.setattr(socket, 'gethostname', lambda: 'laptop')
+    laptop = CsvReviewStore(str(tmp_path), reviewer='alice')
+    laptop.load()
+    monkeypatch.setattr(socket, 'gethostname', lambda: 'desktop')
+    desktop = CsvReviewStore(str(tmp_path), reviewer='alice')
+    desktop.load()
+    assert laptop.journal.path != desktop.journal.path
+
+    desktop.record(KEY, decision('incorrect', '2025-01-01T12:00:00'))
+    laptop.compact()
+    laptop.close()
+    desktop.close()
+
+    assert load_review_records(laptop.csv_path, [desktop.journal.path])[KEY]['status'] == 'incorrect'
+
+
+def test_compaction_keeps_rows_another_session_appended_to_own_journal(tmp_path):
+    first = CsvReviewStore(str(tmp_path), reviewer='alice')
+    first.load()
+    second = CsvReviewStore(str(tmp_path), reviewer='alice')
+    second.load()
+
+    second.record(KEY, decision('correct', '2025-01-01T12:00:00'))
+    first.compact()
+    first.close()
+    second.close()
+
+    assert load_review_records(first.csv_path)[KEY]['status'] == 'correct'
+
+
+def test_record_many_defers_compaction(tmp_path):
+    store = CsvReviewStore(str(tmp_path), reviewer='alice')
+    store.load()
+    store.journal.compact_threshold = 2
+    store.record_many([(KEY, decision('correct', '2025-01-01T12:00:00')),
+                       (KEY[:3] + ('mask_veg',), decision('correct', '2025-01-01T12:00:00'))])
+    assert store.journal.record_count == 2
+
+    assert store.compact_if_due()
+    assert store.journal.record_count == 0
+    assert not store.compact_if_due()
+    store.close()
+    assert load_review_records(store.csv_path)[KEY]['status'] == 'correct'
@@ -0,0 +1,85 @@
+import os
+import time
+
+from image_mask_viewer import scan_manifest
+from image_mask_viewer.scan_manifest import scan_with_manifest
+
+MASK_SUFFIX = '_rf_classified'
+MASK_VEG_SUFFIX = '_vegmask_ndvi'
+ROLES = {'image': '', 'mask': MASK_SUFFIX, 'mask_veg': MASK_VEG_SUFFIX}
+
+
+def make_tree(tmp_path, base_names):
+    dirs = {}
+    for role, suffix in ROLES.items():
+        directory = tmp_path / role
+        directory.mkdir()
+        for base_name in base_names:
+            (directory / f'{base_name}{suffix}.tif').touch()
+        dirs[role] = str(directory)
+    output_dir = tmp_path / 'output'
+    output_dir.mkdir()
+    return dirs, str(output_dir)
+
+
+def set_mtime(path, age):
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def scan(dirs, output_dir, monkeypatch):
+    listed = []
+    list_directory = scan_manifest.list_directory
+
+    def counting_list_directory(directory):
+        listed.append(directory)
+        return list_directory(directory)
+
+    monkeypatch.setattr(scan_manifest, 'list_directory', counting_list_directory)
+    pairs, incomplete, mode = scan_with_manifest(
+        output_dir, dirs['image'], dirs['mask'], dirs['mask_veg'], MASK_SUFFIX, MASK_VEG_SUFFIX)
+    return [pair['image_file'] for pair in pairs], incomplete, mode, listed
+
+
+def test_unchanged_directories_are_not_listed_again(tmp_path, monkeypatch):
+    dirs, output_dir = make_tree(tmp_path, ['t1', 't2'])
+    for directory in dirs.values():
+        set_mtime(directory, 60)
+
+    assert scan(dirs, output_dir, monkeypatch)[2] == 'full'
+    images, incomplete, mode, listed = scan(dirs, output_dir, monkeypatch)
+
+    assert (images, incomplete, mode, listed) == (['t1.tif', 't2.tif'], [], 'cached', [])
+
+
+def test_directories_modified_within_the_racy_window_are_listed_again(tmp_path, monkeypatch):
+    dirs, output_dir = make_tree(tmp_path, ['t1'])
+
+    scan(dirs, output_dir, monkeypatch)
+    images, _, mode, listed = scan(dirs, output_dir, monkeypatch)
+
+    assert images == ['t1.tif']
+    assert mode == 'cached'
+    assert sorted(listed) == sorted(dirs.values())
+
+
+def test_changed_directories_are_rematched_as_a_delta(tmp_path, monkeypatch):
+    dirs, output_dir = make_tree(tmp_path, ['t1', 't2'])
+    os.remove(os.path.join(dirs['mask_veg'], f't2{MASK_VEG_SUFFIX}.tif'))
+    for directory in dirs.values():
+        set_mtime(directory, 120)
+    _, incomplete, _, _ = scan(dirs, output_dir, monkeypatch)
+    assert incomplete == ['t2.tif']
+
+    # Drop t1's masks and complete t2; the image directory is left as it was
+    open(os.path.join(dirs['mask_veg'], f't2{MASK_VEG_SUFFIX}.tif'), 'w').close()
+    for role in ('mask', 'mask_veg'):
+        os.remove(os.path.join(dirs[role], f't1{ROLES[role]}.tif'))
+        set_mtime(dirs[role], 60)
+
+    images, incomplete, mode, listed = scan(dirs, output_dir, monkeypatch)
+
+    assert mode == 'delta'
+    assert sorted(listed) == sorted([dirs['mask'], dirs['mask_veg']])
+    assert images == ['t2.tif']
+    assert incomplete == ['t1.tif']
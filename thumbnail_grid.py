@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Virtualized contact-sheet grid over the review queue.
+
+The model exposes ``filtered_pairs`` to a QListView in icon mode with
+uniform item sizes, so Qt only asks for the thumbnails of the visible
+cells.  Thumbnails come from the ThumbnailCache and are decoded on
+demand; a small LRU keeps the decoded pixmaps of recently shown cells.
+"""
+
+import os
+from collections import OrderedDict
+
+from qgis.PyQt.QtCore import (QAbstractListModel, QItemSelectionModel, QModelIndex, QSize, Qt,
+                              pyqtSignal)
+from qgis.PyQt.QtGui import QColor, QPixmap
+from qgis.PyQt.QtWidgets import QAbstractItemView, QListView
+
+from .thumbnails import THUMBNAIL_SIZE
+
+
+STATUS_COLORS = {
+    'correct': QColor('#4CAF50'),
+    'incorrect': QColor('#f44336'),
+}
+
+# Decoded pixmaps kept for cells scrolled out of view
+PIXMAP_CACHE_SIZE = 512
+
+
+class ThumbnailModel(QAbstractListModel):
+
+    def __init__(self, parent=None):
+        super(ThumbnailModel, self).__init__(parent)
+        self.pairs = []
+        self.cache = None
+        self.pixmaps = OrderedDict()  # image path -> QPixmap
+        self.placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        self.placeholder.fill(QColor('#9E9E9E'))
+
+    def set_pairs(self, pairs):
+        self.beginResetModel()
+        self.pairs = pairs
+        self.endResetModel()
+
+    def set_cache(self, cache):
+        self.beginResetModel()
+        self.cache = cache
+        self.pixmaps.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.pairs)
+
+    def pixmap(self, key):
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+            return pixmap
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is None:
+            return self.placeholder  # Not cached, so it updates once the thumbnail exists
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(data):
+            return self.placeholder
+        self.pixmaps[key] = pixmap
+        if len(self.pixmaps) > PIXMAP_CACHE_SIZE:
+            self.pixmaps.popitem(last=False)
+        return pixmap
+
+    def thumbnail_updated(self, key):
+        self.pixmaps.pop(key, None)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.pairs):
+            return None
+        pair = self.pairs[index.row()]
+        if role == Qt.DecorationRole:
+            return self.pixmap(pair['image_path'])
+        if role == Qt.DisplayRole:
+            return os.path.splitext(pair['image_file'])[0]
+        if role == Qt.ToolTipRole:
+            return f"{pair['image_file']}\n{pair['status'].replace('_', ' ')}"
+        if role == Qt.BackgroundRole:
+            return STATUS_COLORS.get(pair['status'])
+        return None
+
+
+class ThumbnailGrid(QListView):
+    """Icon-mode list view; ``pairActivated(row)`` is emitted on double click or Enter.
+
+    Several tiles can be selected (Ctrl/Shift click, Ctrl+A) for bulk
+    decisions; following the current tile does not change the selection.
+    """
+
+    pairActivated = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super(ThumbnailGrid, self).__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setMovement(QListView.Static)
+        self.setResizeMode(QListView.Adjust)
+        # Uniform sizes let the view lay out a million cells without asking for each one
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(500)
+        self.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.setGridSize(QSize(THUMBNAIL_SIZE + 12, THUMBNAIL_SIZE + 28))
+        self.setSpacing(2)
+        self.setWordWrap(False)
+        self.setTextElideMode(Qt.ElideMiddle)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.thumbnail_model = ThumbnailModel(self)
+        self.setModel(self.thumbnail_model)
+        self.activated.connect(lambda index: self.pairActivated.emit(index.row()))
+
+    def show_row(self, row):
+        """Make a row current and scroll it into view, keeping the selection."""
+        index = self.thumbnail_model.index(row, 0)
+        if index.isValid():
+            self.selectionModel().setCurrentIndex(index, QItemSelectionModel.NoUpdate)
+            self.scrollTo(index)
+
+    def selected_rows(self):
+        """Return the selected rows in ascending order.
+
+        Reads the selection ranges instead of selectedIndexes(), which
+        would build one QModelIndex per selected tile.
+        """
+        rows = set()
+        for selection_range in self.selectionModel().selection():
+            rows.update(range(selection_range.top(), selection_range.bottom() + 1))
+        return sorted(rows)
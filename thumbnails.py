@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Thumbnail composites for the contact-sheet grid.
+
+render_thumbnail runs inside worker processes started by process_pool, so
+it only depends on GDAL and NumPy.  Downsampled reads go through GDAL's
+RasterIO, which uses existing overviews (see overviews.py) instead of
+decoding the full-resolution raster.
+
+Thumbnails are stored as JPEG (PNG when the JPEG driver is missing) in a
+single packed file, ``thumbnails.pack``, with a JSON offset index,
+``thumbnails.json``, in the output directory.  Updated thumbnails are
+appended and the index points at the newest copy; when saving the index
+finds more than COMPACT_DEAD_FRACTION of the pack orphaned, the pack is
+rewritten with the live thumbnails only, unless another session sharing
+the output directory has written to it.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+from osgeo import gdal
+
+from .mask_stats import file_stamp
+
+log = logging.getLogger(__name__)
+
+
+THUMBNAIL_PACK_NAME = 'thumbnails.pack'
+THUMBNAIL_INDEX_NAME = 'thumbnails.json'
+THUMBNAIL_INDEX_VERSION = 1
+
+# Longest side of a thumbnail in pixels
+THUMBNAIL_SIZE = 128
+
+JPEG_QUALITY = 85
+
+# Share of orphaned bytes (replaced thumbnails) above which save() rewrites the pack
+COMPACT_DEAD_FRACTION = 0.25
+COMPACT_MIN_BYTES = 1024 * 1024
+
+# Overlay colours: mask_veg foreground, and pixels where mask and mask_veg differ
+VEG_COLOR = np.array([60, 200, 60], dtype=np.float32)
+DISAGREEMENT_COLOR = np.array([230, 40, 40], dtype=np.float32)
+
+
+def thumbnail_shape(width, height, size=THUMBNAIL_SIZE):
+    """Return ``(width, height)`` scaled so the longest side is at most size."""
+    scale = min(size / max(width, 1), size / max(height, 1), 1.0)
+    return max(int(round(width * scale)), 1), max(int(round(height * scale)), 1)
+
+
+def stretch(array):
+    """Scale a band to 0-255 between its 2nd and 98th percentiles."""
+    values = array[np.isfinite(array)] if array.dtype.kind == 'f' else array
+    if values.size == 0:
+        return np.zeros(array.shape, dtype=np.uint8)
+    low, high = np.percentile(values, (2, 98))
+    if high <= low:
+        high = low + 1
+    scaled = (array.astype(np.float32) - low) * (255.0 / (high - low))
+    return np.clip(np.nan_to_num(scaled), 0, 255).astype(np.uint8)
+
+
+def read_foreground(path, width, height):
+    """Read band 1 of a mask at thumbnail size; valid non-zero pixels are foreground."""
+    dataset = gdal.Open(path, gdal.GA_ReadOnly)
+    band = dataset.GetRasterBand(1)
+    values = band.ReadAsArray(buf_xsize=width, buf_ysize=height,
+                              resample_alg=gdal.GRIORA_NearestNeighbour)
+    foreground = values != 0
+    nodata = band.GetNoDataValue()
+    if nodata is not None:
+        foreground &= values != nodata
+    return foreground
+
+
+def encode_image(rgb):
+    """Encode an RGB uint8 array as JPEG (or PNG) bytes through /vsimem/."""
+    height, width, _ = rgb.shape
+    source = gdal.GetDriverByName('MEM').Create('', width, height, 3, gdal.GDT_Byte)
+    for i in range(3):
+        source.GetRasterBand(i + 1).WriteArray(rgb[:, :, i])
+    driver = gdal.GetDriverByName('JPEG')
+    options = [f'QUALITY={JPEG_QUALITY}']
+    if driver is None:
+        driver, options = gdal.GetDriverByName('PNG'), []
+    path = f'/vsimem/thumbnail_{os.getpid()}'
+    driver.CreateCopy(path, source, options=options)
+    try:
+        handle = gdal.VSIFOpenL(path, 'rb')
+        gdal.VSIFSeekL(handle, 0, 2)
+        length = gdal.VSIFTellL(handle)
+        gdal.VSIFSeekL(handle, 0, 0)
+        data = gdal.VSIFReadL(1, length, handle)
+        gdal.VSIFCloseL(handle)
+    finally:
+        gdal.Unlink(path)
+    return bytes(data)
+
+
+def render_thumbnail(job):
+    """Render one image + mask composite.
+
+    ``job`` is ``(image_path, mask_path, mask_veg_path, size)``.  The image
+    uses bands 4-3-2 when it has four or more bands, like the review
+    canvas, with a 2-98% stretch.  mask_veg foreground is tinted green and
+    pixels where mask and mask_veg disagree red.  Returns ``(stamp,
+    data)`` with the mtimes of the three files and the encoded image.
+    """
+    image_path, mask_path, mask_veg_path, size = job
+    gdal.UseExceptions()
+    stamp = file_stamp((image_path, mask_path, mask_veg_path))
+    dataset = gdal.Open(image_path, gdal.GA_ReadOnly)
+    width, height = thumbnail_shape(dataset.RasterXSize, dataset.RasterYSize, size)
+
+    count = dataset.RasterCount
+    band_numbers = [4, 3, 2] if count >= 4 else [1, 2, 3] if count >= 3 else [1, 1, 1]
+    channels = {}
+    for number in set(band_numbers):
+        channels[number] = stretch(dataset.GetRasterBand(number).ReadAsArray(
+            buf_xsize=width, buf_ysize=height, resample_alg=gdal.GRIORA_Average))
+    rgb = np.dstack([channels[number] for number in band_numbers]).astype(np.float32)
+
+    veg = read_foreground(mask_veg_path, width, height)
+    differs = read_foreground(mask_path, width, height) ^ veg
+    rgb[veg] = rgb[veg] * 0.6 + VEG_COLOR * 0.4
+    rgb[differs] = rgb[differs] * 0.4 + DISAGREEMENT_COLOR * 0.6
+    return stamp, encode_image(rgb.astype(np.uint8))
+
+
+def thumbnail_jobs(pairs, size=THUMBNAIL_SIZE):
+    """Expand pairs into render_thumbnail jobs."""
+    return [(pair['image_path'], pair['mask_path'], pair['mask_veg_path'], size)
+            for pair in pairs]
+
+
+def index_stamp(path):
+    """Return ``(mtime_ns, size)`` of an index file, or None when it is missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def pack_identity(path):
+    """Return ``(device, inode)`` of a pack, which changes when it is replaced."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+class ThumbnailCache:
+    """Packed thumbnail file plus offset index, keyed by image path.
+
+    put() and get() are meant for the GUI thread; workers only return the
+    encoded bytes.  Sessions sharing an output directory share the pack:
+    one that finds the pack replaced (compacted by another session)
+    reloads the index before using its offsets.
+    """
+
+    def __init__(self, output_dir, size=THUMBNAIL_SIZE):
+        self.pack_path = os.path.join(output_dir, THUMBNAIL_PACK_NAME)
+        self.index_path = os.path.join(output_dir, THUMBNAIL_INDEX_NAME)
+        self.size = size
+        self.entries = {}  # image path -> [offset, length, stamp]
+        self.dirty = False
+        self.index_stamp = None  # (mtime_ns, size) of the index as last loaded or saved
+        self.pack_identity = None
+        self.pack_end = 0  # Pack size if only this session appended to it
+        self.shared = False  # Another session appended to the pack since load()
+        self._writer = None
+        self._reader = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        self.entries = {}
+        self.dirty = False
+        self.index_stamp = index_stamp(self.index_path)
+        self.pack_identity = pack_identity(self.pack_path)
+        self.pack_end = os.path.getsize(self.pack_path) if self.pack_identity else 0
+        self.shared = False
+        if not os.path.exists(self.index_path) or not os.path.exists(self.pack_path):
+            return self
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable thumbnail index: %s", e)
+            return self
+        if index.get('version') != THUMBNAIL_INDEX_VERSION or index.get('size') != self.size:
+            return self
+        pack_size = os.path.getsize(self.pack_path)
+        for directory, files in index['files'].items():
+            prefix = os.path.join(directory, '')
+            for name, entry in files.items():
+                # Entries past the end belong to writes that never reached the disk
+                if entry[0] + entry[1] <= pack_size:
+                    self.entries[prefix + name] = entry
+        return self
+
+    def dead_bytes(self):
+        """Bytes of the pack no index entry points at."""
+        if not os.path.exists(self.pack_path):
+            return 0
+        return os.path.getsize(self.pack_path) - sum(entry[1] for entry in self.entries.values())
+
+    def compact(self):
+        """Rewrite the pack with only the thumbnails the index points at.
+
+        The index is removed before the new pack replaces the old one, so
+        an interrupted compaction loses the cache instead of pointing the
+        old offsets into the new pack; save() writes the new index.  The
+        in-memory entries only move to the new offsets once the pack has
+        been replaced.
+        """
+        self.close()
+        tmp_path = self.pack_path + '.tmp'
+        entries = {}
+        try:
+            with open(self.pack_path, 'rb') as source, open(tmp_path, 'wb') as target:
+                for key, entry in sorted(self.entries.items(), key=lambda item: item[1][0]):
+                    source.seek(entry[0])
+                    data = source.read(entry[1])
+                    if len(data) != entry[1]:
+                        continue
+                    entries[key] = [target.tell(), entry[1], entry[2]]
+                    target.write(data)
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            os.replace(tmp_path, self.pack_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.entries = entries
+        self.pack_identity = pack_identity(self.pack_path)
+        self.pack_end = os.path.getsize(self.pack_path)
+        self.dirty = True
+
+    def compact_unshared(self):
+        """Compact the pack unless another session is writing to it.
+
+        Holds a lock on the pack, and skips compaction when another session
+        appended to the pack or saved the index since this cache loaded it.
+        Returns True when the pack was rewritten.
+        """
+        # Imported here: review_log needs pandas, the render workers don't
+        from .review_log import SnapshotLock
+
+        try:
+            with SnapshotLock(self.pack_path, timeout=0):
+                if (self.shared or index_stamp(self.index_path) != self.index_stamp
+                        or os.path.getsize(self.pack_path) != self.pack_end):
+                    log.info("Not compacting %s: another session writes to it", THUMBNAIL_PACK_NAME)
+                    return False
+                self.compact()
+                return True
+        except OSError as e:
+            log.warning("Could not compact %s: %s", THUMBNAIL_PACK_NAME, e)
+            return False
+
+    def reload_if_replaced(self):
+        """Reload the index when another session replaced the pack; returns True if it did.
+
+        Unsaved entries pointed into the old pack and are dropped.
+        """
+        if self.pack_identity is None or pack_identity(self.pack_path) == self.pack_identity:
+            return False
+        log.info("%s was compacted by another session; reloading the index", THUMBNAIL_PACK_NAME)
+        self.close()
+        self.load()
+        return True
+
+    def save(self):
+        if not self.dirty:
+            return
+        if self._writer is not None:
+            self._writer.flush()
+        if self.reload_if_replaced():
+            return
+        pack_size = os.path.getsize(self.pack_path) if os.path.exists(self.pack_path) else 0
+        dead = self.dead_bytes()
+        if dead > COMPACT_MIN_BYTES and dead > COMPACT_DEAD_FRACTION * pack_size:
+            log.info("Compacting %s: %d of %d bytes are replaced thumbnails",
+                     THUMBNAIL_PACK_NAME, dead, pack_size)
+            self.compact_unshared()
+        files = {}
+        for path, entry in self.entries.items():
+            directory, name = os.path.split(path)
+            files.setdefault(directory, {})[name] = entry
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': THUMBNAIL_INDEX_VERSION, 'size': self.size, 'files': files},
+                      f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+        self.index_stamp = index_stamp(self.index_path)
+        self.dirty = False
+
+    def get(self, key):
+        """Return the encoded thumbnail for an image path, or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self._reader is None:
+            if self.reload_if_replaced():
+                entry = self.entries.get(key)
+                if entry is None:
+                    return None
+            if not os.path.exists(self.pack_path):
+                return None
+            self._reader = open(self.pack_path, 'rb')
+        self._reader.seek(entry[0])
+        data = self._reader.read(entry[1])
+        return data if len(data) == entry[1] else None
+
+    def put(self, key, stamp, data):
+        if self._writer is None:
+            self.reload_if_replaced()
+            if not self.entries:
+                # Nothing points into the old pack (other size or lost index); start it over
+                open(self.pack_path, 'wb').close()
+                self.pack_end = 0
+            self._writer = open(self.pack_path, 'ab')
+            self.pack_identity = pack_identity(self.pack_path)
+        offset = self._writer.seek(0, os.SEEK_END)
+        if offset != self.pack_end:
+            self.shared = True
+        self._writer.write(data)
+        # Readers open their own handle, so make the bytes visible to them
+        self._writer.flush()
+        self.pack_end = offset + len(data)
+        self.entries[key] = [offset, len(data), stamp]
+        self.dirty = True
+
+    def is_fresh(self, job):
+        entry = self.entries.get(job[0])
+        try:
+            return entry is not None and entry[2] == file_stamp(job[:3])
+        except FileNotFoundError:
+            return True  # Nothing to render for a file that is gone
+
+    def stale_jobs(self, jobs, is_canceled=None):
+        """Return the jobs without a thumbnail for the current file mtimes."""
+        stale = []
+        for job in jobs:
+            if is_canceled is not None and is_canceled():
+                break
+            if not self.is_fresh(job):
+                stale.append(job)
+        return stale
+
+    def close(self):
+        for handle in (self._writer, self._reader):
+            if handle is not None:
+                handle.close()
+        self._writer = None
+        self._reader = None
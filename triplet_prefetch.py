@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Background prefetch of upcoming image/mask/mask_veg triplets.
+
+Layers for the pairs around the current index are opened on the QGIS task
+manager's worker threads and kept in a small LRU cache, so navigation can
+take a ready triplet instead of waiting on GDAL.
+"""
+
+import os
+from collections import OrderedDict
+
+from qgis.core import QgsApplication, QgsRasterLayer, QgsTask
+
+
+TRIPLET_ROLES = [('image', 'image_path'), ('mask', 'mask_path'), ('mask_veg', 'mask_veg_path')]
+
+
+def create_triplet_layers(pair):
+    """Open the three layers of a pair, returning {role: QgsRasterLayer}."""
+    base_name = os.path.splitext(pair['image_file'])[0]
+    return {role: QgsRasterLayer(pair[path_key], f"{base_name}_{role}")
+            for role, path_key in TRIPLET_ROLES}
+
+
+class TripletLoadTask(QgsTask):
+    """Open and validate one triplet off the GUI thread."""
+
+    def __init__(self, pair, on_finished):
+        super(TripletLoadTask, self).__init__(
+            f"Prefetch {pair['image_file']}", QgsTask.CanCancel | QgsTask.Silent)
+        self.pair = pair
+        self.layers = None
+        self.on_finished = on_finished
+
+    def run(self):
+        if self.isCanceled():
+            return False
+        layers = create_triplet_layers(self.pair)
+        # Layers are QObjects created on this worker; hand them to the GUI thread
+        main_thread = QgsApplication.instance().thread()
+        for layer in layers.values():
+            layer.moveToThread(main_thread)
+        self.layers = layers
+        return not self.isCanceled()
+
+    def finished(self, result):
+        self.on_finished(self, result)
+
+
+class TripletPrefetcher:
+    """Bounded LRU of prefetched triplets keyed by image path."""
+
+    def __init__(self, ahead=2, behind=1, prepare=None):
+        self.ahead = ahead
+        self.behind = behind
+        # Called with {role: layer} on the GUI thread when a triplet arrives (tracking, styling)
+        self.prepare = prepare
+        self.cache = OrderedDict()  # image_path -> {role: layer}
+        self.pending = {}  # image_path -> TripletLoadTask
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def capacity(self):
+        return self.ahead + self.behind + 2
+
+    @property
+    def enabled(self):
+        return self.ahead > 0 or self.behind > 0
+
+    def take(self, pair):
+        """Return the prefetched layers for a pair (removing them from the cache) or None."""
+        layers = self.cache.pop(pair['image_path'], None)
+        if layers is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return layers
+
+    def prefetch(self, pairs, index):
+        """Schedule loads for the window around index and drop work outside it."""
+        if not self.enabled or not pairs:
+            return
+        start = max(index - self.behind, 0)
+        stop = min(index + self.ahead + 1, len(pairs))
+        window = [pairs[i] for i in range(start, stop) if i != index]
+        wanted = {pair['image_path'] for pair in window}
+
+        for path, task in list(self.pending.items()):
+            if path not in wanted:
+                task.cancel()
+                del self.pending[path]
+
+        for pair in window:
+            path = pair['image_path']
+            if path in self.cache:
+                self.cache.move_to_end(path)
+            elif path not in self.pending:
+                task = TripletLoadTask(pair, self._task_finished)
+                self.pending[path] = task
+                QgsApplication.taskManager().addTask(task)
+
+    def _task_finished(self, task, result):
+        path = task.pair['image_path']
+        if self.pending.get(path) is not task:
+            return  # Superseded or cancelled
+        del self.pending[path]
+        if result and task.layers is not None:
+            if self.prepare is not None:
+                self.prepare(task.layers)
+            self.cache[path] = task.layers
+            self.cache.move_to_end(path)
+            while len(self.cache) > self.capacity:
+                self.cache.popitem(last=False)
+
+    def clear(self):
+        for task in self.pending.values():
+            task.cancel()
+        self.pending.clear()
+        self.cache.clear()
+
+    def stats_text(self):
+        total = self.hits + self.misses
+        rate = f"{100.0 * self.hits / total:.0f}%" if total else "-"
+        return (f"Prefetch: {self.hits} hits / {self.misses} misses ({rate}), "
+                f"{len(self.cache)} ready, {len(self.pending)} loading")